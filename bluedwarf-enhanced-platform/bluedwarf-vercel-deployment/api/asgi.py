@@ -0,0 +1,172 @@
+"""ASGI entry point: uvicorn api.asgi:app --workers 4
+
+A small WSGI-to-ASGI bridge around the Flask app. Each request runs on a
+thread from a shared pool, and every chunk the app yields is sent as its
+own ASGI body message, so streamed responses reach the client as they are
+produced instead of after the generator finishes.
+
+Routes with a coroutine view (src/routes/async_valuation.py) run on the
+event loop instead, inside a Flask request context.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+import asyncio
+import os
+import sys
+
+from flask import request
+
+from api.index import app as wsgi_app
+from src.routes.async_valuation import ASYNC_ROUTES, async_valuation_available
+
+# Requests served at once per worker process; Flask handlers block on I/O
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 16))
+# Request bodies larger than this are spooled to disk
+MAX_MEMORY_BODY = 1024 * 1024
+
+def build_environ(scope, body):
+    """WSGI environ for an ASGI http scope"""
+    script_name = scope.get('root_path', '')
+    path = scope['path']
+    if script_name and path.startswith(script_name):
+        path = path[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        value = value.decode('latin-1')
+        if name in environ:
+            value = f"{environ[name]}{'; ' if name == 'HTTP_COOKIE' else ','}{value}"
+        environ[name] = value
+    return environ
+
+class WsgiBridge:
+    """Serve a Flask application to an ASGI server
+
+    `async_routes` maps (method, path) to coroutine views that are awaited
+    on the event loop; every other request goes through WSGI on a thread.
+    """
+
+    def __init__(self, wsgi_application, async_routes=None, threads=ASGI_THREADS):
+        self.wsgi_application = wsgi_application
+        self.async_routes = async_routes or {}
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+        body = SpooledTemporaryFile(max_size=MAX_MEMORY_BODY)
+        try:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+            view = self.async_routes.get((scope['method'], scope['path']))
+            if view is not None:
+                return await self.run_async_view(view, scope, body, send)
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.executor, self.run_wsgi, scope, body, send, loop)
+        finally:
+            body.close()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def run_async_view(self, view, scope, body, send):
+        """Await a coroutine view with Flask's request hooks (CORS etc.) around it"""
+        flask_app = self.wsgi_application
+        # src/services/instrumentation.py times WSGI requests as middleware; this path bypasses it
+        instrumentation = flask_app.extensions.get('instrumentation')
+        with flask_app.request_context(build_environ(scope, body)):
+            timings = instrumentation.start(request.environ) if instrumentation else None
+            # As Flask.full_dispatch_request and wsgi_app do: HTTPExceptions and
+            # registered error handlers first, a 500 only for what they re-raise
+            try:
+                try:
+                    rv = flask_app.preprocess_request()
+                    if rv is None:
+                        rv = await view()
+                except Exception as e:
+                    rv = flask_app.handle_user_exception(e)
+                response = flask_app.finalize_request(rv)
+            except Exception as e:
+                response = flask_app.handle_exception(e)
+            if timings is not None:
+                response.headers.add('Server-Timing', instrumentation.finish(
+                    timings, scope['method'], response.status_code, request.url_rule))
+            await send({
+                'type': 'http.response.start',
+                'status': response.status_code,
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                            for name, value in response.headers.items()]
+            })
+            await send({'type': 'http.response.body', 'body': response.get_data()})
+
+    def run_wsgi(self, scope, body, send, loop):
+        """Run the app on a pool thread, handing each message back to the event loop"""
+        def sync_send(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        response_start = {}
+        started = False
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and started:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response_start.update({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                            for name, value in headers]
+            })
+
+        result = self.wsgi_application(build_environ(scope, body), start_response)
+        try:
+            for chunk in result:
+                if not chunk:
+                    continue
+                if not started:
+                    started = True
+                    sync_send(response_start)
+                sync_send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if not started:
+                sync_send(response_start)
+            sync_send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+app = WsgiBridge(wsgi_app, async_routes=ASYNC_ROUTES if async_valuation_available(wsgi_app) else None)
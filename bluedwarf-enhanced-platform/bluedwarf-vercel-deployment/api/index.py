@@ -6,7 +6,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from main import app
 
-# This is the entry point for Vercel
-def handler(request):
-    return app(request.environ, lambda status, headers: None)
-
+# WSGI entry point for Vercel and gunicorn (gunicorn api.index:app).
+# The server calls app(environ, start_response) itself, so the status,
+# headers and streamed body chunks reach the client as Flask produced them.
+application = app
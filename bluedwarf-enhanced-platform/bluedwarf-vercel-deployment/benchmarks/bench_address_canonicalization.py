@@ -0,0 +1,130 @@
+"""Address canonicalization throughput and key collapse on a synthetic corpus
+
+Builds a corpus of real-world style spellings of the same properties
+(abbreviated vs spelled-out suffixes, directionals and states, unit
+designators, ZIP+4, punctuation, casing) and reports how many distinct keys
+the old whitespace/title-case normalizer and the canonicalizer produce -
+the canonical key is what valuations are cached and stored under
+(properties.address_key) - and how fast the canonicalizer runs. Exits 1 if any regression case fails.
+
+    python benchmarks/bench_address_canonicalization.py --properties 5000 --variants 6
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import time
+
+import common  # adds the deployment root to sys.path
+from src.services.address import canonicalize_address
+
+STREETS = ['Main', 'Oak', 'Congress', 'Lamar', 'Cedar', 'Maple', 'Park', 'Lake', 'Hill', 'River']
+SUFFIXES = [('Street', 'St'), ('Avenue', 'Ave'), ('Boulevard', 'Blvd'), ('Drive', 'Dr'),
+            ('Road', 'Rd'), ('Lane', 'Ln'), ('Court', 'Ct'), ('Parkway', 'Pkwy')]
+DIRECTIONS = [('North', 'N'), ('South', 'S'), ('East', 'E'), ('West', 'W'), (None, None)]
+CITIES = [('Austin', 'Texas', 'TX', '787'), ('Denver', 'Colorado', 'CO', '802'),
+          ('Portland', 'Oregon', 'OR', '972'), ('Raleigh', 'North Carolina', 'NC', '276')]
+UNITS = [('Apartment', 'Apt'), ('Suite', 'Ste'), ('Unit', 'Unit'), ('#', '#')]
+
+# Inputs that once lost their street: (addresses that must keep distinct keys,
+# addresses whose canonical form must still start with the street)
+DISTINCT_CASES = [('123 Main St, 78701', '999 Oak Ave, 78701')]
+STREET_CASES = [('1 A St, USA', '1 A ST'), ('123 Main St, TX', '123 MAIN ST'),
+                ('123 Main St, 78701', '123 MAIN ST')]
+
+def legacy_normalize(address):
+    """The normalizer this replaced: collapse whitespace and title-case"""
+    return re.sub(r'\s+', ' ', address.strip()).title()
+
+def base_property(rng):
+    city = rng.choice(CITIES)
+    return {
+        'number': rng.randint(1, 9999),
+        'direction': rng.choice(DIRECTIONS),
+        'street': rng.choice(STREETS),
+        'suffix': rng.choice(SUFFIXES),
+        'unit': (rng.choice(UNITS), rng.randint(1, 40)) if rng.random() < 0.3 else None,
+        'city': city,
+        'zip': f'{city[3]}{rng.randint(0, 99):02d}',
+        'zip4': f'{rng.randint(0, 9999):04d}'
+    }
+
+def render(prop, rng):
+    """Spell one property the way a user or provider might"""
+    long_form = rng.random() < 0.5
+    parts = [str(prop['number'])]
+    direction = prop['direction'][0 if long_form else 1]
+    if direction:
+        parts.append(direction)
+    parts.append(prop['street'])
+    suffix = prop['suffix'][0 if rng.random() < 0.5 else 1]
+    parts.append(suffix + ('.' if rng.random() < 0.2 else ''))
+    if prop['unit']:
+        (long_name, short_name), number = prop['unit']
+        designator = rng.choice([long_name, short_name])
+        parts.append(f'#{number}' if designator == '#' else f'{designator} {number}')
+    street = ' '.join(parts)
+
+    city, state_name, state_code, _ = prop['city']
+    state = state_name if rng.random() < 0.3 else state_code
+    zip_code = prop['zip'] + (f"-{prop['zip4']}" if rng.random() < 0.3 else '')
+    sep = ', ' if rng.random() < 0.7 else ' '
+    text = f'{street}{sep}{city}{sep}{state} {zip_code}'
+    if rng.random() < 0.2:
+        text = text.replace(' ', '  ', 1)
+    return rng.choice([text, text.upper(), text.lower()])
+
+def regression_failures():
+    """Known-bad inputs that must canonicalize correctly"""
+    failures = []
+    for addresses in DISTINCT_CASES:
+        keys = {canonicalize_address(address).key for address in addresses}
+        if len(keys) != len(addresses):
+            failures.append(f'{list(addresses)} share a key')
+    for address, street in STREET_CASES:
+        canonical = canonicalize_address(address).canonical
+        if not canonical.startswith(street):
+            failures.append(f'{address!r} canonicalized to {canonical!r}, expected {street!r} first')
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--properties', type=int, default=5000)
+    parser.add_argument('--variants', type=int, default=6)
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    properties = [base_property(rng) for _ in range(args.properties)]
+    corpus = [render(prop, rng) for prop in properties for _ in range(args.variants)]
+    rng.shuffle(corpus)
+
+    start = time.perf_counter()
+    results = [canonicalize_address(address) for address in corpus]
+    elapsed = time.perf_counter() - start
+
+    legacy_start = time.perf_counter()
+    legacy = [legacy_normalize(address) for address in corpus]
+    legacy_elapsed = time.perf_counter() - legacy_start
+
+    failures = regression_failures()
+    true_distinct = len({(p['number'], p['direction'][1], p['street'], p['suffix'][1],
+                          p['unit'][1] if p['unit'] else None, p['zip']) for p in properties})
+    print(json.dumps({
+        'corpus_size': len(corpus),
+        'true_distinct_properties': true_distinct,
+        'distinct_raw_strings': len(set(corpus)),
+        'distinct_legacy_keys': len(set(legacy)),
+        'distinct_canonical_strings': len({r.canonical for r in results}),
+        'distinct_canonical_keys': len({r.key for r in results}),
+        'canonicalize_us_per_address': round(elapsed / len(corpus) * 1e6, 2),
+        'canonicalize_addresses_per_sec': round(len(corpus) / elapsed),
+        'legacy_us_per_address': round(legacy_elapsed / len(corpus) * 1e6, 2),
+        'failures': failures
+    }, indent=2))
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
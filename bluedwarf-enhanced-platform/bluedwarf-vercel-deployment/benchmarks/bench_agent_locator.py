@@ -0,0 +1,118 @@
+"""Agent lookup latency by location as the agent table grows
+
+Seeds agents scattered over the continental US (each with a service radius)
+into a fresh SQLite database per size, then times "eligible agents serving
+this point, best rated first" through the geohash coverage index and through
+a full scan that filters every eligible agent by distance.
+
+    python benchmarks/bench_agent_locator.py --sizes 1000 10000 100000 --queries 500
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import common  # adds the deployment root to sys.path
+
+def seed(db, count, rng):
+    from src.models.property import Agent, AgentCoverageCell
+    from src.services.agent_locator import coverage_rows
+
+    agents = []
+    for i in range(1, count + 1):
+        agents.append({
+            'id': i, 'name': f'Agent {i}', 'email': f'agent{i}@example.com',
+            'license_number': f'{i:08d}', 'license_state': 'TX',
+            'latitude': rng.uniform(25.0, 49.0), 'longitude': rng.uniform(-124.0, -67.0),
+            'service_radius_miles': rng.uniform(10.0, 40.0),
+            'rating': round(rng.uniform(3.0, 5.0), 2),
+            'subscription_active': rng.random() < 0.8,
+            'license_verified': True, 'identity_verified': True
+        })
+    connection = db.session.connection()
+    connection.execute(Agent.__table__.insert(), agents)
+    cells = []
+    for row in agents:
+        cells.extend(coverage_rows(Agent(**row)))
+    connection.execute(AgentCoverageCell.__table__.insert(), cells)
+    db.session.commit()
+    return agents, len(cells)
+
+def full_scan(latitude, longitude, limit=5):
+    """Every eligible agent, filtered by distance in Python"""
+    from src.models.property import Agent
+    from src.services.geo import haversine_miles
+
+    matches = []
+    for agent in Agent.query.filter(
+        Agent.subscription_active == True,
+        Agent.license_verified == True,
+        Agent.identity_verified == True
+    ).order_by(Agent.rating.desc()):
+        distance = haversine_miles(latitude, longitude, agent.latitude, agent.longitude)
+        if distance <= agent.service_radius_miles:
+            matches.append((agent, distance))
+            if len(matches) == limit:
+                break
+    return matches
+
+def run_size(count, queries, scan_queries, seed_value):
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'agents.db')}"
+    from flask import Flask
+    from src.models.user import db
+    from src.services.agent_locator import find_agents_near
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ['DATABASE_URL']
+    db.init_app(app)
+    rng = random.Random(seed_value)
+    with app.app_context():
+        db.create_all()
+        agents, cell_rows = seed(db, count, rng)
+
+        # Query near real agents so lookups find matches, like real traffic
+        points = []
+        for _ in range(queries):
+            anchor = rng.choice(agents)
+            points.append((anchor['latitude'] + rng.uniform(-0.1, 0.1),
+                           anchor['longitude'] + rng.uniform(-0.1, 0.1)))
+
+        indexed, found = [], 0
+        for latitude, longitude in points:
+            db.session.expunge_all()
+            start = time.perf_counter()
+            found += len(find_agents_near(latitude, longitude))
+            indexed.append((time.perf_counter() - start) * 1000)
+
+        scanned = []
+        for latitude, longitude in points[:scan_queries]:
+            db.session.expunge_all()
+            start = time.perf_counter()
+            full_scan(latitude, longitude)
+            scanned.append((time.perf_counter() - start) * 1000)
+
+        db.session.remove()
+    return {
+        'agents': count,
+        'coverage_rows': cell_rows,
+        'avg_agents_found': round(found / len(points), 2),
+        'geohash_index': common.summarize(indexed),
+        'full_scan': common.summarize(scanned)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--scan-queries', type=int, default=20,
+                        help='the full scan is slow at large sizes, so sample fewer')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    results = [run_size(size, args.queries, args.scan_queries, args.seed) for size in args.sizes]
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
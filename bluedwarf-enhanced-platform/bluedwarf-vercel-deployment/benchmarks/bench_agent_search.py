@@ -0,0 +1,306 @@
+"""Agent search through the agent_search_terms index against LIKE filters
+
+Seeds --agents agents (names, brokerages, specialties and service areas
+drawn from fixed lists over the datagen markets) into a scratch SQLite
+database and builds the indexes with rebuild_service_area_index and
+rebuild_search_index. Then, for each
+search below, times:
+
+  - legacy: the LIKE filters the search route used before the index (a
+    LIKE per word over the name, brokerage and the JSON specialties and
+    service areas), best rated 20 plus a count for paging
+  - index: search_agent_index - ranked page, total and the state, tier and
+    specialty facets - and the whole GET /api/agents/search request, with
+    and without facets
+
+Checks, exiting non-zero on a mismatch:
+
+  - total, facets and the first page of every search match a brute force
+    evaluation over the seeded rows
+  - walking every page of a search returns each match once
+  - registering, editing and deleting an agent through the ORM is
+    reflected in the next search (the mapper events keep the index in sync)
+  - an agent with accented letters in their name is found by the accented
+    and the unaccented words
+
+    python benchmarks/bench_agent_search.py --agents 100000 --repeat 20
+"""
+from collections import Counter
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+import common  # adds the deployment root to sys.path
+from datagen import MARKETS, TIERS
+
+FIRST_NAMES = ['James', 'Maria', 'Robert', 'Linda', 'Michael', 'Patricia', 'David', 'Jennifer', 'Carlos',
+               'Elizabeth', 'Daniel', 'Susan', 'Matthew', 'Jessica', 'Anthony', 'Sarah', 'Mark', 'Karen',
+               'Jose', 'Nancy', 'Kevin', 'Lisa', 'Brian', 'Betty', 'Martin', 'Sandra', 'Tyler', 'Ashley',
+               'Marcus', 'Kimberly']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez',
+              'Martinez', 'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore',
+              'Jackson', 'Martin', 'Lee', 'Perez', 'Thompson', 'White', 'Harris', 'Sanchez', 'Clark',
+              'Ramirez', 'Lewis', 'Robinson', 'Walker', 'Young', 'Allen', 'King', 'Wright', 'Scott', 'Torres',
+              'Nguyen', 'Hill', 'Flores']
+BROKERAGES = ['Keller Williams Realty', 'Compass', 'Coldwell Banker', 'RE/MAX Capital', 'eXp Realty',
+              'Redfin', "Sotheby's International Realty", 'Century 21 Alliance', 'Berkshire Hathaway HomeServices',
+              'Douglas Elliman', 'Realty ONE Group', 'Better Homes and Gardens Real Estate', None]
+SPECIALTIES = ['Luxury', 'First-time buyers', 'Investment', 'Relocation', 'Condos', 'New construction',
+               'Military relocation', 'Luxury condos', 'Short sales', 'Farm and ranch']
+WEIGHTS = {'name': 4, 'specialty': 3, 'area': 2, 'brokerage': 1}
+
+# (label, search parameters, the legacy filters for the same search, or None)
+SEARCHES = [
+    ('every agent', {}, {'words': []}),
+    ('specialty in state', {'specialty': 'Luxury', 'state': 'TX'}, {'words': [], 'specialty': 'Luxury', 'state': 'TX'}),
+    ('state, min rating', {'state': 'TX', 'min_rating': 4.5}, {'words': [], 'state': 'TX', 'min_rating': 4.5}),
+    ('name', {'q': 'garcia'}, {'words': ['garcia']}),
+    ('full name', {'q': 'maria garcia'}, {'words': ['maria', 'garcia']}),
+    ('specialty and city words', {'q': 'luxury austin'}, {'words': ['luxury', 'austin']}),
+    ('partly typed', {'q': 'keller wil'}, {'words': ['keller', 'wil']}),
+    ('city and tier', {'city': 'San Antonio', 'tier': 'premium'}, None),
+    ('text, filters, page 5', {'q': 'compass', 'state': 'CO', 'min_rating': 3.5, 'page': 5},
+     {'words': ['compass'], 'state': 'CO', 'min_rating': 3.5}),
+]
+
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+def seed(db, count, rng):
+    """Insert the agents and return their rows"""
+    from src.models.property import Agent
+
+    markets = MARKETS + [('San Antonio', 'TX', '782', 29.4241, -98.4936)]
+    rows = []
+    for i in range(1, count + 1):
+        city, state, zip_prefix = rng.choice(markets)[:3]
+        areas = [f'{city}, {state}'] + [f'{zip_prefix}{rng.randint(1, 40):02d}' for _ in range(rng.randint(0, 3))]
+        rows.append({
+            'id': i, 'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}', 'email': f'agent{i}@example.com',
+            'license_number': f'{i:08d}', 'license_state': state, 'brokerage': rng.choice(BROKERAGES),
+            'specialties': json.dumps(rng.sample(SPECIALTIES, rng.randint(0, 3))),
+            'service_areas': json.dumps(areas), 'subscription_tier': rng.choice(TIERS),
+            'subscription_active': rng.random() < 0.9, 'license_verified': rng.random() < 0.95,
+            'identity_verified': True, 'rating': round(rng.uniform(3.0, 5.0), 2)
+        })
+    connection = db.session.connection()
+    for start in range(0, len(rows), 10000):
+        connection.execute(Agent.__table__.insert(), rows[start:start + 10000])
+    db.session.commit()
+    return rows
+
+def brute_force(rows, params, per_page=20):
+    """(total, facets, first page ids) for a search, evaluated row by row"""
+    from src.services.address import service_area_key
+
+    words = WORD_RE.findall(params.get('q', '').lower())
+    city = service_area_key(params['city']) if params.get('city') else None
+    specialty = ' '.join(params.get('specialty', '').lower().split())
+    matches = []
+    for row in rows:
+        if not (row['subscription_active'] and row['license_verified'] and row['identity_verified']):
+            continue
+        if row['rating'] < params.get('min_rating', 0):
+            continue
+        if params.get('state', row['license_state']) != row['license_state']:
+            continue
+        if params.get('tier', row['subscription_tier']) != row['subscription_tier']:
+            continue
+        specialties = json.loads(row['specialties'])
+        if specialty and specialty not in [' '.join(s.lower().split()) for s in specialties]:
+            continue
+        areas = json.loads(row['service_areas'])
+        if city and not any(key == city or key[:-3] == city for key in map(service_area_key, areas)):
+            continue
+        fields = {
+            'name': set(WORD_RE.findall(row['name'].lower())),
+            'brokerage': set(WORD_RE.findall((row['brokerage'] or '').lower())),
+            'specialty': set(WORD_RE.findall(' '.join(specialties).lower())),
+            'area': set(WORD_RE.findall(' '.join(areas).lower()))
+        }
+        score = 0
+        for position, word in enumerate(words):
+            best = 0
+            for field, terms in fields.items():
+                if word in terms:
+                    best = max(best, WEIGHTS[field] * 2)
+                elif position == len(words) - 1 and any(term.startswith(word) for term in terms):
+                    best = max(best, WEIGHTS[field])
+            if not best:
+                break
+            score += best
+        else:
+            matches.append((row, score, specialties))
+    matches.sort(key=lambda match: (-match[1], -match[0]['rating'], match[0]['id']))
+    page = params.get('page', 1)
+    facets = {
+        'state': Counter(match[0]['license_state'] for match in matches),
+        'tier': Counter(match[0]['subscription_tier'] for match in matches),
+        'specialty': Counter(' '.join(s.lower().split()) for match in matches for s in match[2])
+    }
+    ids = [match[0]['id'] for match in matches[(page - 1) * per_page:page * per_page]]
+    return len(matches), {name: dict(counts) for name, counts in facets.items()}, ids
+
+def legacy_search(words=(), state=None, specialty=None, min_rating=0):
+    """The pre-index query: LIKE filters, best rated 20 and a count for paging"""
+    from sqlalchemy import or_
+    from src.models.property import Agent
+
+    query = Agent.query.filter(
+        Agent.subscription_active == True,
+        Agent.license_verified == True,
+        Agent.identity_verified == True,
+        Agent.rating >= min_rating
+    )
+    if state:
+        query = query.filter_by(license_state=state)
+    if specialty:
+        query = query.filter(Agent.specialties.contains(specialty))
+    for word in words:
+        pattern = f'%{word}%'
+        query = query.filter(or_(Agent.name.ilike(pattern), Agent.brokerage.ilike(pattern),
+                                 Agent.specialties.ilike(pattern), Agent.service_areas.ilike(pattern)))
+    agents = query.order_by(Agent.rating.desc()).limit(20).all()
+    return [agent.to_dict() for agent in agents], query.count()
+
+def timed(function, repeat):
+    """Latency samples in milliseconds and the last result"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples, result
+
+def check_sync(db, client, failures):
+    """Insert, edit and delete an agent through the ORM and search after each"""
+    from src.models.property import Agent
+
+    def search(query):
+        return client.get(f'/api/agents/search?{query}').get_json()
+
+    agent = Agent(name='Quentin Zabriskie', email='sync@example.com', license_number='99999999',
+                  license_state='WY', brokerage='Prairie Homes', specialties=json.dumps(['Farm and ranch']),
+                  service_areas=json.dumps(['Cheyenne, WY']), subscription_active=True, license_verified=True,
+                  identity_verified=True, rating=4.9, subscription_tier='basic')
+    db.session.add(agent)
+    db.session.commit()
+    agent_id = agent.id
+    if [found['id'] for found in search('q=zabriskie')['agents']] != [agent_id]:
+        failures.append('a newly inserted agent is not found by name')
+    if search('city=cheyenne&specialty=farm+and+ranch')['total'] != 1:
+        failures.append('a newly inserted agent is not found by city and specialty')
+
+    agent.specialties = json.dumps(['Luxury'])
+    agent.brokerage = 'Summit Peaks Realty'
+    db.session.commit()
+    body = search('q=summit+peaks&state=WY')
+    if body['total'] != 1 or body['facets']['specialty'] != {'luxury': 1}:
+        failures.append('an edited agent is not found by its new brokerage and specialty')
+    if search('q=prairie')['total'] or search('specialty=farm+and+ranch&state=WY')['total']:
+        failures.append("an edited agent is still found by its old brokerage or specialty")
+
+    db.session.delete(agent)
+    db.session.commit()
+    if search('q=zabriskie')['total']:
+        failures.append('a deleted agent is still found')
+
+    # Accented names are indexed whole, and found with or without the accents
+    agent = Agent(name='José Peña', email='accents@example.com', license_number='99999998',
+                  license_state='NM', brokerage='Casa Señora Realty', specialties=json.dumps(['Residential']),
+                  service_areas=json.dumps(['Española, NM']), subscription_active=True, license_verified=True,
+                  identity_verified=True, rating=4.8, subscription_tier='basic')
+    db.session.add(agent)
+    db.session.commit()
+    for query in ('q=jos%C3%A9+pe%C3%B1a', 'q=jose+pena', 'q=JOSE+pen', 'q=se%C3%B1ora', 'q=espanola'):
+        if [found['id'] for found in search(query)['agents']] != [agent.id]:
+            failures.append(f'an agent with an accented name is not found by {query}')
+    if search('q=jos+pe')['total']:
+        failures.append('an accented name is split at its accented letter')
+    db.session.delete(agent)
+    db.session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--agents', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'search.db')}"
+    os.environ['AUTO_CREATE_SCHEMA'] = '1'  # scratch database
+    os.environ['INSTRUMENTATION'] = '0'
+    from urllib.parse import urlencode
+    from src.main import app
+    from src.models.property import AgentSearchTerm
+    from src.models.user import db
+    from src.services.agent_locator import rebuild_service_area_index
+    from src.services.agent_search import rebuild_search_index, search_agent_index
+
+    failures = []
+    results = {'agents': args.agents, 'searches': {}}
+    client = app.test_client()
+    with app.app_context():
+        rows = seed(db, args.agents, random.Random(args.seed))
+        rebuild_service_area_index()
+        start = time.perf_counter()
+        rebuild_search_index()
+        results['index_build_seconds'] = round(time.perf_counter() - start, 2)
+        db.session.execute(db.text('ANALYZE'))  # as manage.py migrate does after rebuilding the index
+        db.session.commit()
+        results['index_rows'] = AgentSearchTerm.query.count()
+
+        for label, params, legacy in SEARCHES:
+            stats = {}
+            if legacy:
+                samples, _ = timed(lambda: legacy_search(**legacy), args.repeat)
+                stats['legacy'] = common.summarize(samples)
+            search = {'text': params.get('q'), 'state': params.get('state'), 'city': params.get('city'),
+                      'specialty': params.get('specialty'), 'tier': params.get('tier'),
+                      'min_rating': params.get('min_rating', 0), 'page': params.get('page', 1)}
+            samples, (agents, scores, total, facets) = timed(lambda: search_agent_index(**search), args.repeat)
+            stats['index'] = common.summarize(samples)
+            samples, response = timed(lambda: client.get(f'/api/agents/search?{urlencode(params)}'), args.repeat)
+            stats['route'] = common.summarize(samples)
+            samples, _ = timed(lambda: client.get(f"/api/agents/search?{urlencode({**params, 'facets': 'false'})}"),
+                               args.repeat)
+            stats['route_without_facets'] = common.summarize(samples)
+            if legacy:
+                stats['speedup'] = round(stats['legacy']['p50_ms'] / stats['index']['p50_ms'], 1)
+            stats['total'] = total
+
+            expected_total, expected_facets, expected_ids = brute_force(rows, params)
+            body = response.get_json()
+            ids = [agent['id'] for agent in body.get('agents', [])]
+            if response.status_code != 200:
+                failures.append(f'{label}: status {response.status_code}')
+            elif (body['total'], ids) != (expected_total, expected_ids):
+                failures.append(f"{label}: {body['total']} matches, page {ids[:5]}..., "
+                                f'expected {expected_total}, {expected_ids[:5]}...')
+            elif body['facets'] != expected_facets:
+                failures.append(f"{label}: facets {body['facets']}, expected {expected_facets}")
+            results['searches'][label] = stats
+
+        # Every page of a few thousand matches, each match once
+        seen, page = [], 1
+        while page:
+            body = client.get(f'/api/agents/search?q=luxury&state=TX&limit=100&page={page}').get_json()
+            seen.extend(agent['id'] for agent in body['agents'])
+            page = body['next_page']
+        results['paged_matches'] = len(seen)
+        if len(seen) != len(set(seen)) or len(seen) != body['total']:
+            failures.append(f"paging returned {len(seen)} agents ({len(set(seen))} distinct) of {body['total']}")
+
+        check_sync(db, client, failures)
+
+    results['failures'] = failures
+    print(json.dumps(results, indent=2))
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""Valuation throughput per worker, sync view vs async view, as concurrency grows
+
+Runs the stub providers in their own process with injected latency, then
+serves the app with ONE worker per model and drives POST /api/valuation
+with a new address on every request, so each one waits on the geocoder,
+RentCast and ATTOM:
+
+  gunicorn-gthread  sync view, one thread per in-flight request (--threads)
+  uvicorn-wsgi      sync view through the ASGI bridge's thread pool
+  uvicorn-async     async view: httpx + AsyncSession on the event loop
+
+The async view needs httpx and aiosqlite; without them uvicorn-async is
+skipped. Exits non-zero if any request fails.
+
+    python benchmarks/bench_async_valuation.py --latency-ms 100 --concurrency 1,8,32,128
+"""
+import argparse
+import http.client
+import importlib.util
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import common  # adds the deployment root to sys.path
+from common import summarize
+from bench_worker_models import free_port, wait_until_ready
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def server_command(model, port, threads):
+    python = sys.executable
+    if model == 'gunicorn-gthread':
+        if importlib.util.find_spec('gunicorn') is None:
+            return None
+        return [python, '-m', 'gunicorn', '-c', os.path.join(common.ROOT, 'gunicorn.conf.py'),
+                'api.index:app'], {
+            'BIND': f'127.0.0.1:{port}', 'WEB_CONCURRENCY': '1',
+            'GUNICORN_WORKER_CLASS': 'gthread', 'GUNICORN_THREADS': str(threads)
+        }
+    if model.startswith('uvicorn-'):
+        if importlib.util.find_spec('uvicorn') is None:
+            return None
+        if model == 'uvicorn-async' and not all(importlib.util.find_spec(name) for name in ('httpx', 'aiosqlite')):
+            return None
+        return [python, '-m', 'uvicorn', 'api.asgi:app', '--host', '127.0.0.1', '--port', str(port),
+                '--workers', '1', '--log-level', 'warning'], {
+            'ASYNC_VALUATION': '1' if model == 'uvicorn-async' else '0', 'ASGI_THREADS': str(threads)
+        }
+    raise ValueError(model)
+
+def run_level(port, concurrency, requests_per_client, addresses):
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def client():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        local = []
+        for _ in range(requests_per_client):
+            body = json.dumps({'address': next(addresses)})
+            start = time.perf_counter()
+            try:
+                conn.request('POST', '/api/valuation', body=body, headers={'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                payload = response.read()
+            except OSError as e:
+                conn.close()
+                with lock:
+                    errors.append(repr(e))
+                continue
+            local.append((time.perf_counter() - start) * 1000)
+            if response.status != 200 or json.loads(payload).get('cached'):
+                with lock:
+                    errors.append(f'{response.status} {payload[:120]!r}')
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return dict(summarize(latencies), valuations_per_sec=round(len(latencies) / elapsed, 1),
+                errors=len(errors), error_samples=errors[:3])
+
+def run_model(model, args, env, levels, addresses):
+    port = free_port()
+    command = server_command(model, port, args.threads)
+    if command is None:
+        return {'skipped': 'server or async dependencies not installed'}
+    command, extra_env = command
+    process = subprocess.Popen(command, cwd=common.ROOT, env=dict(env, **extra_env),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_ready(port, process)
+        run_level(port, 2, 2, addresses)  # warm connections and pools
+        return {f'concurrency_{level}': run_level(port, level, args.requests_per_client, addresses)
+                for level in levels}
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--models', default='gunicorn-gthread,uvicorn-wsgi,uvicorn-async')
+    parser.add_argument('--concurrency', default='1,8,32,128')
+    parser.add_argument('--requests-per-client', type=int, default=5)
+    parser.add_argument('--threads', type=int, default=4,
+                        help='request threads per worker for the sync view (gthread threads, ASGI_THREADS)')
+    parser.add_argument('--latency-ms', type=float, default=100.0, help='mean injected provider latency')
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    stub_port = free_port()
+    stub = subprocess.Popen([sys.executable, os.path.join(HERE, 'stub_providers.py'), '--port', str(stub_port),
+                             '--latency-ms', str(args.latency_ms)], stdout=subprocess.DEVNULL)
+    stub_url = f'http://127.0.0.1:{stub_port}'
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'app.db')}",
+        RENTCAST_API_KEY='stub', RENTCAST_BASE_URL=f'{stub_url}/v1',
+        ATTOM_API_KEY='stub', ATTOM_BASE_URL=f'{stub_url}/propertyapi/v1.0.0',
+        GEOCODER_API_KEY='stub', GEOCODER_BASE_URL=f'{stub_url}/maps/api/geocode',
+        # Provider pools sized so neither view is capped by the client limits
+        HTTP_POOL_SIZE='256', HTTP_MAX_CONCURRENCY='256', PROVIDER_MAX_WORKERS='64', HTTP_RETRIES='0'
+    )
+    env.pop('AUTO_CREATE_SCHEMA', None)
+    try:
+        subprocess.run([sys.executable, os.path.join(common.ROOT, 'src', 'manage.py'), 'init-db'],
+                       env=env, check=True, stdout=subprocess.DEVNULL)
+        # Every request values an address no worker has seen
+        addresses = (f'{n} Congress Ave, Austin, TX 78701' for n in itertools.count(1000))
+        results = {model: run_model(model, args, env, levels, addresses) for model in args.models.split(',')}
+    finally:
+        stub.terminate()
+
+    print(json.dumps({'latency_ms': args.latency_ms, 'threads': args.threads, 'results': results}, indent=2))
+    if any(level.get('errors') for result in results.values() for level in result.values()
+           if isinstance(level, dict)):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""Addresses per second: POST /api/valuation/batch vs one POST per address
+
+Runs the stub providers in their own process with injected latency and
+values the same mix of addresses three ways, each on its own address set:
+one POST /api/valuation at a time, --threads concurrent POSTs, and a single
+batch request whose NDJSON stream is read to the end. The mix has
+--stored-fraction addresses already valued in the database and
+--duplicate-fraction repeats spelled differently.
+
+Reports addresses/s, SQL statements and commits per address, and time to
+the first streamed line. Exits non-zero if a batch line is missing or
+failed.
+
+    python benchmarks/bench_batch_valuation.py --addresses 1000 --latency-ms 20
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import common  # adds the deployment root to sys.path
+from bench_worker_models import free_port
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def address_mix(prefix, count, stored_fraction, duplicate_fraction, rng):
+    """(request addresses, addresses to pre-store) for one scenario"""
+    unique = [f'{prefix + i} Congress Avenue, Austin, TX 78701' for i in range(count)]
+    stored = rng.sample(unique, int(count * stored_fraction))
+    duplicates = [address.replace('Avenue', 'Ave.').upper()
+                  for address in rng.sample(unique, int(count * duplicate_fraction))]
+    addresses = unique + duplicates
+    rng.shuffle(addresses)
+    return addresses, stored
+
+class StatementCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.statements = 0
+        self.commits = 0
+        event.listen(engine, 'before_cursor_execute', self._statement)
+        event.listen(engine, 'commit', self._commit)
+
+    def _statement(self, *args):
+        self.statements += 1
+
+    def _commit(self, *args):
+        self.commits += 1
+
+    def reset(self):
+        self.statements = self.commits = 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--addresses', type=int, default=1000, help='unique addresses per scenario')
+    parser.add_argument('--stored-fraction', type=float, default=0.3)
+    parser.add_argument('--duplicate-fraction', type=float, default=0.1)
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='mean injected provider latency')
+    parser.add_argument('--threads', type=int, default=8, help='concurrent single POSTs (matches BATCH_CONCURRENCY)')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    stub_port = free_port()
+    stub = subprocess.Popen([sys.executable, os.path.join(HERE, 'stub_providers.py'), '--port', str(stub_port),
+                             '--latency-ms', str(args.latency_ms)], stdout=subprocess.DEVNULL)
+    stub_url = f'http://127.0.0.1:{stub_port}'
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'batch.db')}",
+        'AUTO_CREATE_SCHEMA': '1',  # scratch database
+        'RENTCAST_API_KEY': 'stub', 'RENTCAST_BASE_URL': f'{stub_url}/v1',
+        'ATTOM_API_KEY': 'stub', 'ATTOM_BASE_URL': f'{stub_url}/propertyapi/v1.0.0',
+        'GEOCODER_API_KEY': 'stub', 'GEOCODER_BASE_URL': f'{stub_url}/maps/api/geocode',
+        'HTTP_RETRIES': '0', 'BATCH_CONCURRENCY': str(args.threads)
+    })
+    time.sleep(0.5)
+
+    from src.main import app
+    from src.models.user import db
+    from src.services.valuation_cache import valuation_cache
+
+    rng = random.Random(args.seed)
+    client = app.test_client()
+    with app.app_context():
+        counter = StatementCounter(db.engine)
+
+    def prepare(prefix):
+        addresses, stored = address_mix(prefix, args.addresses, args.stored_fraction, args.duplicate_fraction, rng)
+        with ThreadPoolExecutor(args.threads) as pool:
+            list(pool.map(lambda address: client.post('/api/valuation', json={'address': address}), stored))
+        valuation_cache.clear()
+        counter.reset()
+        return addresses
+
+    def single(address):
+        return client.post('/api/valuation', json={'address': address}).status_code
+
+    results = {}
+    failures = []
+    try:
+        for name, prefix in (('single_sequential', 10000), ('single_concurrent', 20000), ('batch', 30000)):
+            addresses = prepare(prefix)
+            start = time.perf_counter()
+            if name == 'single_sequential':
+                statuses = [single(address) for address in addresses]
+            elif name == 'single_concurrent':
+                with ThreadPoolExecutor(args.threads) as pool:
+                    statuses = list(pool.map(single, addresses))
+            else:
+                response = client.post('/api/valuation/batch', json={'addresses': addresses}, buffered=False)
+                first_line_ms = None
+                lines = []
+                for chunk in response.response:
+                    if first_line_ms is None:
+                        first_line_ms = round((time.perf_counter() - start) * 1000, 1)
+                    lines.extend(chunk.decode().splitlines() if isinstance(chunk, bytes) else chunk.splitlines())
+                response.close()
+                records = [json.loads(line) for line in lines]
+                statuses = [record['status'] for record in records if 'inputs' in record for _ in record['inputs']]
+                summary = records[-1].get('summary', {})
+            elapsed = time.perf_counter() - start
+
+            results[name] = {
+                'addresses': len(addresses),
+                'addresses_per_sec': round(len(addresses) / elapsed, 1),
+                'seconds': round(elapsed, 2),
+                'sql_statements_per_address': round(counter.statements / len(addresses), 2),
+                'commits_per_address': round(counter.commits / len(addresses), 3),
+                'non_200': sum(1 for status in statuses if status != 200)
+            }
+            if name == 'batch':
+                results[name].update(first_line_ms=first_line_ms, summary=summary)
+                if len(statuses) != len(addresses) or results[name]['non_200']:
+                    failures.append(f'batch answered {len(statuses)} of {len(addresses)} inputs, '
+                                    f'{results[name]["non_200"]} not 200')
+    finally:
+        stub.terminate()
+
+    results['speedup_vs_sequential'] = round(
+        results['batch']['addresses_per_sec'] / results['single_sequential']['addresses_per_sec'], 1)
+    results['speedup_vs_concurrent'] = round(
+        results['batch']['addresses_per_sec'] / results['single_concurrent']['addresses_per_sec'], 1)
+    results['failures'] = failures
+    print(json.dumps(results, indent=2))
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
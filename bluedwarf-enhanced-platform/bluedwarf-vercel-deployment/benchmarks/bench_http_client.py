@@ -0,0 +1,85 @@
+"""Pooled provider client vs a new connection per request
+
+Starts the local stub provider server, points the RentCast/ATTOM/geocoder
+adapters at it and runs the valuation fan-out through the pooled client.
+The same request volume is then replayed with a fresh `requests.get` per
+call. Reports latency, connection reuse rate and what the server saw.
+
+    python benchmarks/bench_http_client.py --lookups 200 --latency-ms 20
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import os
+import time
+
+import common  # adds the deployment root to sys.path
+from common import summarize
+from stub_providers import start_stub_server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lookups', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--failure-rate', type=float, default=0.02)
+    args = parser.parse_args()
+
+    server = start_stub_server(latency_ms=args.latency_ms, failure_rate=args.failure_rate)
+    os.environ.update({
+        'RENTCAST_API_KEY': 'stub', 'RENTCAST_BASE_URL': f'{server.base_url}/v1',
+        'ATTOM_API_KEY': 'stub', 'ATTOM_BASE_URL': f'{server.base_url}/propertyapi/v1.0.0',
+        'GEOCODER_API_KEY': 'stub', 'GEOCODER_BASE_URL': f'{server.base_url}/maps/api/geocode'
+    })
+
+    import requests
+    from src.routes.property import fetch_provider_data
+    from src.services.http_client import all_client_stats
+
+    def pooled_lookup(i):
+        start = time.perf_counter()
+        fetch_provider_data(f'{i} Main St, Austin, TX 78701')
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(args.threads) as pool:
+        pooled = list(pool.map(pooled_lookup, range(args.lookups)))
+    pooled_connections = server.connections
+    pooled_requests = server.requests
+
+    # Baseline: same upstream calls and fan-out, each call on a new connection
+    providers = {
+        'rentcast': ['/v1/properties', '/v1/avm/value', '/v1/avm/rent/long-term'],
+        'attom': ['/propertyapi/v1.0.0/property/expandedprofile'],
+        'geocode': ['/maps/api/geocode/json']
+    }
+
+    def unpooled_provider(paths):
+        def call(address):
+            for path in paths:
+                requests.get(server.base_url + path, params={'address': address}, timeout=5)
+        return call
+
+    unpooled_providers = {name: unpooled_provider(paths) for name, paths in providers.items()}
+
+    def unpooled_lookup(i):
+        start = time.perf_counter()
+        fetch_provider_data(f'{i} Main St, Austin, TX 78701', unpooled_providers)
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(args.threads) as pool:
+        unpooled = list(pool.map(unpooled_lookup, range(args.lookups)))
+
+    report = {
+        'pooled': dict(summarize(pooled),
+                       server_connections=pooled_connections,
+                       server_requests=pooled_requests),
+        'unpooled': dict(summarize(unpooled),
+                         server_connections=server.connections - pooled_connections,
+                         server_requests=server.requests - pooled_requests),
+        'clients': all_client_stats()
+    }
+    print(json.dumps(report, indent=2))
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
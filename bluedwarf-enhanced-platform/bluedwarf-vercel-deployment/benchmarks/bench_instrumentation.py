@@ -0,0 +1,137 @@
+"""Cost of the request instrumentation: the same requests with it on and off
+
+Seeds a scratch SQLite database (the bench_lead_endpoints data plus one
+stored valuation) and times a mix of requests through the test client:
+
+  health           GET /health, no database
+  valuation_hit    POST /api/valuation answered from the valuation cache
+  valuation_db     POST /api/valuation served from the stored row
+  leads_compact    GET /api/agents/<id>/leads?view=compact
+  leads_full       GET /api/agents/<id>/leads
+  agent_search     GET /api/agents/search
+
+Each scenario alternates rounds with the instrumentation middleware and SQL
+listeners installed and removed, and reports the best round of each. The
+mix is every scenario once. Also checks that the Server-Timing header, the
+SQL counts and /metrics (behind METRICS_TOKEN) come out as expected. Exits non-zero if any
+scenario's overhead, or the mix's, exceeds --budget-pct or a check fails.
+
+    python benchmarks/bench_instrumentation.py --rounds 15 --requests 300
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import common  # adds the deployment root to sys.path
+from bench_lead_endpoints import seed
+
+ADDRESS = '100 Congress Ave, Austin, TX 78701'
+METRICS_TOKEN = 'bench-metrics-token'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=15, help='on/off round pairs per scenario')
+    parser.add_argument('--requests', type=int, default=300, help='requests per round')
+    parser.add_argument('--budget-pct', type=float, default=2.0)
+    args = parser.parse_args()
+
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'instrumentation.db')}",
+        'AUTO_CREATE_SCHEMA': '1',  # scratch database
+        'INSTRUMENTATION': '1',
+        'METRICS_TOKEN': METRICS_TOKEN
+    })
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from src.main import app
+    from src.models.user import db
+    from src.services import instrumentation
+    from src.services.valuation_cache import valuation_cache
+
+    with app.app_context():
+        seed(db, 20, 50, random.Random(3))
+    client = app.test_client()
+    client.post('/api/valuation', json={'address': ADDRESS})
+
+    middleware = app.wsgi_app
+    listeners = (('before_cursor_execute', instrumentation.before_cursor_execute),
+                 ('after_cursor_execute', instrumentation.after_cursor_execute))
+
+    def instrument(on):
+        app.wsgi_app = middleware if on else middleware.wsgi_app
+        for name, listener in listeners:
+            if on and not event.contains(Engine, name, listener):
+                event.listen(Engine, name, listener)
+            elif not on and event.contains(Engine, name, listener):
+                event.remove(Engine, name, listener)
+
+    def valuation_db():
+        valuation_cache.clear()
+        return client.post('/api/valuation', json={'address': ADDRESS})
+
+    agent_ids = [random.Random(n).randint(1, 20) for n in range(args.requests)]
+    scenarios = {
+        'health': lambda n: client.get('/health'),
+        'valuation_hit': lambda n: client.post('/api/valuation', json={'address': ADDRESS}),
+        'valuation_db': lambda n: valuation_db(),
+        'leads_compact': lambda n: client.get(f'/api/agents/{agent_ids[n]}/leads?limit=50&view=compact'),
+        'leads_full': lambda n: client.get(f'/api/agents/{agent_ids[n]}/leads?limit=50'),
+        'agent_search': lambda n: client.get('/api/agents/search?zip_code=78701')
+    }
+
+    results, failures = {}, []
+    mix = {False: 0.0, True: 0.0}
+    for name, call in scenarios.items():
+        best = {False: float('inf'), True: float('inf')}
+        for _ in range(args.rounds):
+            for on in (False, True):
+                instrument(on)
+                start = time.perf_counter()
+                for n in range(args.requests):
+                    call(n)
+                best[on] = min(best[on], (time.perf_counter() - start) / args.requests)
+        mix[False] += best[False]
+        mix[True] += best[True]
+        results[name] = {
+            'off_us': round(best[False] * 1e6, 1),
+            'on_us': round(best[True] * 1e6, 1),
+            'overhead_us': round((best[True] - best[False]) * 1e6, 1),
+            'overhead_pct': round((best[True] / best[False] - 1) * 100, 2)
+        }
+        # Each scenario on its own: the cheap ones are where a fixed per-request cost shows
+        if results[name]['overhead_pct'] > args.budget_pct:
+            failures.append(f"{name} overhead {results[name]['overhead_pct']}% exceeds {args.budget_pct}%")
+    results['mix_overhead_pct'] = round((mix[True] / mix[False] - 1) * 100, 2)
+    if results['mix_overhead_pct'] > args.budget_pct:
+        failures.append(f"mix overhead {results['mix_overhead_pct']}% exceeds {args.budget_pct}%")
+
+    # What the instrumentation reports
+    instrument(True)
+    valuation_cache.clear()
+    header = valuation_db().headers.get('Server-Timing', '')
+    results['server_timing_example'] = header
+    for stage in ('lookup', 'agents', 'db;', 'total;'):
+        if stage not in header:
+            failures.append(f'Server-Timing has no {stage.rstrip(";")} entry: {header!r}')
+    for headers in ({}, {'Authorization': 'Bearer wrong-token'}):
+        status = client.get('/metrics', headers=headers).status_code
+        if status != 401:
+            failures.append(f'/metrics answered {status} without the metrics token')
+    exposition = client.get('/metrics', headers={'Authorization': f'Bearer {METRICS_TOKEN}'}).get_data(as_text=True)
+    for sample in ('bluedwarf_http_request_duration_seconds_bucket{method="POST",route="/api/valuation",le="+Inf"}',
+                   'bluedwarf_db_statements_total{method="GET",route="/api/agents/<int:agent_id>/leads"}',
+                   'bluedwarf_span_seconds_count{method="POST",route="/api/valuation",span="cache"}'):
+        if sample not in exposition:
+            failures.append(f'/metrics is missing {sample}')
+
+    results['failures'] = failures
+    print(json.dumps(results, indent=2))
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
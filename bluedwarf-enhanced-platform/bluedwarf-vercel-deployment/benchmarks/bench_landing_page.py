@@ -0,0 +1,67 @@
+"""Requests per second for the landing page at the repository root
+
+Loads the root index.py app and serves GET / through the test client as it
+is now (prebuilt body, gzip, conditional 304), and as it was before
+(render_template_string on every request), registered here on a side route.
+
+    python benchmarks/bench_landing_page.py --requests 5000
+"""
+import argparse
+import importlib.util
+import json
+import os
+import time
+
+import common  # adds the deployment root to sys.path
+
+SITE_INDEX = os.path.join(common.ROOT, '..', '..', 'index.py')
+
+def load_site():
+    spec = importlib.util.spec_from_file_location('site_index', SITE_INDEX)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def measure(client, path, headers, requests):
+    size = 0
+    statuses = set()
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(path, headers=headers)
+        size += len(response.data)
+        statuses.add(response.status_code)
+    elapsed = time.perf_counter() - start
+    return {
+        'requests_per_sec': round(requests / elapsed),
+        'us_per_request': round(elapsed / requests * 1e6, 1),
+        'bytes_per_response': round(size / requests),
+        'statuses': sorted(statuses)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5000)
+    args = parser.parse_args()
+
+    site = load_site()
+    from flask import render_template_string
+
+    @site.app.route('/legacy-home')
+    def legacy_home():
+        return render_template_string(site.HTML_TEMPLATE)
+
+    client = site.app.test_client()
+    etag = client.get('/', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+    cases = {
+        'before_render_per_request': ('/legacy-home', {}),
+        'after_identity': ('/', {}),
+        'after_gzip': ('/', {'Accept-Encoding': 'gzip, deflate, br'}),
+        'after_revalidate_304': ('/', {'Accept-Encoding': 'gzip, deflate, br', 'If-None-Match': etag})
+    }
+    results = {name: measure(client, path, headers, args.requests)
+               for name, (path, headers) in cases.items()}
+    results['brotli_available'] = site.brotli is not None
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
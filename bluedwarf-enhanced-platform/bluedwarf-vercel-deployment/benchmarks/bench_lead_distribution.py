@@ -0,0 +1,133 @@
+"""Agent selection latency for lead distribution, before and after the area index
+
+Seeds agents with JSON service areas spread over many markets (ZIPs,
+"City, ST" and bare states) into a fresh SQLite database per size, then
+times picking the top 3 eligible agents for an Austin property both ways:
+the old load-everything-and-substring-match loop and the indexed
+agent_service_areas query.
+
+    python benchmarks/bench_lead_distribution.py --sizes 10000 100000 --queries 200
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import common  # adds the deployment root to sys.path
+
+MARKETS = [
+    ('Austin', 'TX', '787'), ('Dallas', 'TX', '752'), ('Houston', 'TX', '770'),
+    ('Denver', 'CO', '802'), ('Phoenix', 'AZ', '850'), ('Portland', 'OR', '972'),
+    ('Seattle', 'WA', '981'), ('Atlanta', 'GA', '303'), ('Miami', 'FL', '331'),
+    ('Chicago', 'IL', '606'), ('Boston', 'MA', '021'), ('Raleigh', 'NC', '276'),
+    ('Nashville', 'TN', '372'), ('Columbus', 'OH', '432'), ('Salt Lake City', 'UT', '841'),
+    ('Las Vegas', 'NV', '891'), ('Minneapolis', 'MN', '554'), ('Kansas City', 'MO', '641'),
+    ('Charlotte', 'NC', '282'), ('San Diego', 'CA', '921')
+]
+
+def service_areas(rng):
+    """One to four areas in one market, written the way agents type them"""
+    city, state, zip_prefix = rng.choice(MARKETS)
+    areas = []
+    for _ in range(rng.randint(1, 4)):
+        kind = rng.random()
+        if kind < 0.5:
+            areas.append(f'{zip_prefix}{rng.randint(0, 99):02d}')
+        elif kind < 0.9:
+            areas.append(f'{city}, {state}')
+        else:
+            areas.append(state)
+    return areas
+
+def seed(db, count, rng):
+    from src.models.property import Agent, AgentServiceArea
+    from src.services.agent_locator import service_area_rows
+
+    agents = []
+    for i in range(1, count + 1):
+        agents.append({
+            'id': i, 'name': f'Agent {i}', 'email': f'agent{i}@example.com',
+            'license_number': f'{i:08d}', 'license_state': 'TX',
+            'service_areas': json.dumps(service_areas(rng)),
+            'rating': round(rng.uniform(3.0, 5.0), 2),
+            'subscription_tier': 'basic', 'leads_received': 0,
+            'subscription_active': rng.random() < 0.8,
+            'license_verified': True, 'identity_verified': True
+        })
+    connection = db.session.connection()
+    connection.execute(Agent.__table__.insert(), agents)
+    rows = []
+    for row in agents:
+        rows.extend(service_area_rows(Agent(**row)))
+    connection.execute(AgentServiceArea.__table__.insert(), rows)
+    db.session.commit()
+    return len(rows)
+
+def legacy_select():
+    """The distribute_lead loop this replaced"""
+    from src.models.property import Agent
+
+    qualified_agents = Agent.query.filter(
+        Agent.subscription_active == True,
+        Agent.license_verified == True,
+        Agent.identity_verified == True
+    ).order_by(Agent.rating.desc()).all()
+    area_agents = []
+    for agent in qualified_agents:
+        areas = json.loads(agent.service_areas) if agent.service_areas else []
+        if any('TX' in area or 'Austin' in area for area in areas):
+            area_agents.append(agent)
+    return area_agents[:3]
+
+def run_size(count, queries, seed_value):
+    from flask import Flask
+    from src.models.user import db
+    from src.services.address import canonicalize_address, area_keys
+    from src.services.agent_locator import agents_serving_areas
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'leads.db')}"
+    db.init_app(app)
+    rng = random.Random(seed_value)
+    with app.app_context():
+        db.create_all()
+        area_rows = seed(db, count, rng)
+
+        addresses = [f'{rng.randint(1, 9999)} Congress Ave, Austin, TX 787{rng.randint(0, 99):02d}'
+                     for _ in range(queries)]
+        indexed = []
+        for address in addresses:
+            db.session.expunge_all()
+            start = time.perf_counter()
+            location = canonicalize_address(address)
+            agents_serving_areas(area_keys(location.city, location.state, location.zip_code), limit=3)
+            indexed.append((time.perf_counter() - start) * 1000)
+
+        legacy = []
+        for _ in range(max(1, queries // 10)):
+            db.session.expunge_all()
+            start = time.perf_counter()
+            legacy_select()
+            legacy.append((time.perf_counter() - start) * 1000)
+
+        db.session.remove()
+    return {
+        'agents': count,
+        'service_area_rows': area_rows,
+        'indexed_query': common.summarize(indexed),
+        'legacy_scan': common.summarize(legacy)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=5)
+    args = parser.parse_args()
+
+    print(json.dumps([run_size(size, args.queries, args.seed) for size in args.sizes], indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Latency of the lead endpoints by view, against the old lazy-loading handler
+
+Seeds agents with leads on distinct properties, then times
+GET /api/agents/<id>/leads?limit=50 (full, compact and ?fields=) and the
+agent profile through the test client. For comparison it also times the
+handler this replaced: lazy relationship loads and the full nested
+property and agent for every lead.
+
+    python benchmarks/bench_lead_endpoints.py --agents 20 --leads-per-agent 200 --requests 200
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import common  # adds the deployment root to sys.path
+
+def seed(db, agents, leads_per_agent, rng):
+    from src.models.property import Agent, ComparableSale, Property, PropertyLead
+    from src.services.address import address_key
+
+    connection = db.session.connection()
+    connection.execute(Agent.__table__.insert(), [{
+        'id': i, 'name': f'Agent {i}', 'email': f'agent{i}@example.com', 'license_number': f'{i:08d}',
+        'license_state': 'TX', 'service_areas': json.dumps(['Austin, TX', '78701']),
+        'specialties': json.dumps(['Luxury', 'First-time buyers']), 'subscription_tier': 'premium',
+        'subscription_active': True, 'license_verified': True, 'identity_verified': True,
+        'leads_received': leads_per_agent, 'leads_converted': 0, 'rating': 4.5, 'reviews_count': 10
+    } for i in range(1, agents + 1)])
+    properties = agents * leads_per_agent
+    connection.execute(Property.__table__.insert(), [{
+        'id': i, 'address': f'{i} Congress Ave, Austin, TX 78701',
+        'normalized_address': f'{i} CONGRESS AVE, AUSTIN, TX 78701',
+        'address_key': address_key(f'{i} Congress Ave, Austin, TX 78701'),
+        'estimated_value': rng.randint(200000, 900000), 'square_feet': rng.randint(900, 4000),
+        'median_home_value': 500000, 'price_appreciation': 4.2, 'days_on_market': 30
+    } for i in range(1, properties + 1)])
+    connection.execute(ComparableSale.__table__.insert(), [{
+        'property_id': i, 'position': position, 'address': 'comp', 'sale_price': 480000
+    } for i in range(1, properties + 1) for position in range(5)])
+    connection.execute(PropertyLead.__table__.insert(), [{
+        'property_id': i, 'agent_id': (i - 1) % agents + 1, 'lead_type': 'valuation',
+        'customer_name': 'Buyer', 'customer_email': 'buyer@example.com', 'status': 'new',
+        'priority': 'medium'
+    } for i in range(1, properties + 1)])
+    db.session.commit()
+
+def legacy_leads(agent_id, limit=50):
+    """The get_agent_leads handler this replaced"""
+    from flask import jsonify
+    from src.models.property import Agent, PropertyLead
+
+    agent = Agent.query.get_or_404(agent_id)
+    leads = PropertyLead.query.filter_by(agent_id=agent_id).order_by(
+        PropertyLead.created_at.desc()
+    ).limit(limit).all()
+    return jsonify({
+        'leads': [{
+            **lead.to_dict(fields=[column.name for column in PropertyLead.__table__.columns]),
+            'property': lead.property.to_dict() if lead.property else None,
+            'agent': lead.agent.to_dict() if lead.agent else None
+        } for lead in leads],
+        'count': len(leads),
+        'agent': agent.to_dict()
+    })
+
+def time_calls(call, requests, agents, rng):
+    samples, size = [], 0
+    for _ in range(requests):
+        agent_id = rng.randint(1, agents)
+        start = time.perf_counter()
+        body = call(agent_id)
+        samples.append((time.perf_counter() - start) * 1000)
+        size += len(body)
+    return dict(common.summarize(samples), avg_bytes=round(size / requests))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--agents', type=int, default=20)
+    parser.add_argument('--leads-per-agent', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=9)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'leads.db')}"
+    os.environ['AUTO_CREATE_SCHEMA'] = '1'  # scratch database
+    from src.main import app
+    from src.models.user import db
+
+    rng = random.Random(args.seed)
+    with app.app_context():
+        seed(db, args.agents, args.leads_per_agent, rng)
+
+    client = app.test_client()
+
+    def legacy(agent_id):
+        with app.test_request_context():
+            body = legacy_leads(agent_id).get_data()
+            db.session.remove()
+            return body
+
+    views = {
+        'legacy_lazy_full': legacy,
+        'leads_full': lambda a: client.get(f'/api/agents/{a}/leads?limit=50').get_data(),
+        'leads_compact': lambda a: client.get(f'/api/agents/{a}/leads?limit=50&view=compact').get_data(),
+        'leads_fields_id_status': lambda a: client.get(
+            f'/api/agents/{a}/leads?limit=50&fields=id,status,created_at').get_data(),
+        'profile_full': lambda a: client.get(f'/api/agents/{a}/profile').get_data(),
+        'profile_compact': lambda a: client.get(f'/api/agents/{a}/profile?view=compact').get_data()
+    }
+    results = {name: time_calls(call, args.requests, args.agents, rng) for name, call in views.items()}
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
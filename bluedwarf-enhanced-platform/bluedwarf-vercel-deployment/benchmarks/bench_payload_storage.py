@@ -0,0 +1,229 @@
+"""Bytes per property and serialize time: JSON Text payload columns vs typed columns
+
+Builds a scratch SQLite database in the old layout - rentcast_data,
+attom_data, market_trends, comparable_sales and neighborhood_data as JSON
+Text on every properties row - with --properties valuations made from the
+stub provider payloads. Then runs `manage.py migrate`, which moves them into
+typed columns, the comparable_sales table and the compressed
+property_payloads archive.
+
+Reports, before and after, bytes per property (SQLite dbstat, after
+VACUUM) split into the hot tables and the archive, and the time to load and
+serialize every property as the API does. Also times a comps search by
+date and price. Exits non-zero if a migrated property serializes
+differently, an archived payload does not round-trip, or `manage.py
+rescore` finds a valuation the typed columns cannot reproduce.
+
+    python benchmarks/bench_payload_storage.py --properties 5000
+"""
+from datetime import date, timedelta
+import argparse
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import common  # adds the deployment root to sys.path
+import stub_providers
+
+LEGACY_COLUMNS = ('rentcast_data', 'attom_data', 'market_trends', 'comparable_sales', 'neighborhood_data')
+
+def provider_payloads(rng):
+    """(rentcast, attom) payloads as the provider adapters return them"""
+    from src.routes.property import rentcast_result, attom_result, mock_attom_data
+    value = stub_providers.rentcast_value()
+    for comp in value['comparables']:
+        comp['lastSeenDate'] = (date(2022, 1, 1) + timedelta(days=rng.randint(0, 1000))).isoformat()
+    rentcast = rentcast_result(stub_providers.rentcast_property(), value, stub_providers.rentcast_rent())
+    attom = attom_result(stub_providers.attom_profile())
+    attom['neighborhood'] = mock_attom_data()['neighborhood']
+    return rentcast, attom
+
+def table_bytes(path):
+    """{table: bytes} including its indexes, after VACUUM"""
+    connection = sqlite3.connect(path)
+    connection.execute('VACUUM')
+    names = dict(connection.execute("SELECT name, tbl_name FROM sqlite_schema WHERE type IN ('table', 'index')"))
+    sizes = {}
+    for name, size in connection.execute('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name'):
+        table = names.get(name, name)
+        sizes[table] = sizes.get(table, 0) + size
+    connection.close()
+    return sizes
+
+def legacy_to_dict(self):
+    """Property.to_dict() as it was with JSON Text columns"""
+    return {
+        'id': self.id,
+        'address': self.address,
+        'normalized_address': self.normalized_address,
+        'latitude': self.latitude,
+        'longitude': self.longitude,
+        'bedrooms': self.bedrooms,
+        'bathrooms': self.bathrooms,
+        'square_feet': self.square_feet,
+        'lot_size': self.lot_size,
+        'year_built': self.year_built,
+        'property_type': self.property_type,
+        'estimated_value': self.estimated_value,
+        'confidence_score': self.confidence_score,
+        'estimated_rent': self.estimated_rent,
+        'price_per_sqft': self.price_per_sqft,
+        'market_trends': json.loads(self.market_trends) if self.market_trends else None,
+        'comparable_sales': json.loads(self.comparable_sales) if self.comparable_sales else None,
+        'neighborhood_data': json.loads(self.neighborhood_data) if self.neighborhood_data else None,
+        'created_at': self.created_at.isoformat() if self.created_at else None,
+        'updated_at': self.updated_at.isoformat() if self.updated_at else None
+    }
+
+def legacy_model(url):
+    """A mapped class over the old-layout properties table, with the old to_dict"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.automap import automap_base
+    engine = create_engine(url)
+    base = automap_base()
+    base.prepare(autoload_with=engine, reflection_options={'only': ['properties']})
+    model = base.classes.properties
+    model.to_dict = legacy_to_dict
+    return engine, model
+
+def load_and_serialize(session, query, count):
+    """(load ms, serialize us per row, {id: dict}) for every property, as the API loads and serializes them"""
+    start = time.perf_counter()
+    records = session.scalars(query).all()
+    loaded = time.perf_counter()
+    serialized = {record.id: record.to_dict() for record in records}
+    done = time.perf_counter()
+    return round((loaded - start) * 1000, 1), round((done - loaded) * 1e6 / count, 1), serialized
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--properties', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'payloads.db')
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{path}')
+    env.pop('AUTO_CREATE_SCHEMA', None)
+    manage = os.path.join(common.ROOT, 'src', 'manage.py')
+    subprocess.run([sys.executable, manage, 'init-db'], env=env, check=True, stdout=subprocess.DEVNULL)
+    os.environ['DATABASE_URL'] = env['DATABASE_URL']
+
+    from src.services.address import address_key
+    from src.services.valuation import calculate_ai_valuation
+    rng = random.Random(args.seed)
+    random.seed(args.seed)  # the stub payload builders use the module RNG
+
+    # The old layout: the payload columns on every properties row
+    connection = sqlite3.connect(path)
+    for column in LEGACY_COLUMNS:
+        connection.execute(f'ALTER TABLE properties ADD COLUMN {column} TEXT')
+    rows, expected = [], {}
+    for n in range(1, args.properties + 1):
+        rentcast, attom = provider_payloads(rng)
+        details = rentcast['property']
+        value, confidence = calculate_ai_valuation(rentcast, attom, {'year_built': details['yearBuilt']})
+        rows.append({
+            'id': n, 'address': f'{n} Congress Ave, Austin, TX 78701',
+            'normalized_address': f'{n} CONGRESS AVE, AUSTIN, TX 78701',
+            'address_key': address_key(f'{n} Congress Ave, Austin, TX 78701'),
+            'latitude': 30.27, 'longitude': -97.74, 'bedrooms': details['bedrooms'],
+            'bathrooms': details['bathrooms'], 'square_feet': details['squareFootage'],
+            'lot_size': details['lotSize'], 'year_built': details['yearBuilt'],
+            'property_type': details['propertyType'], 'estimated_value': value, 'confidence_score': confidence,
+            'estimated_rent': details['rentEstimate'], 'price_per_sqft': value / details['squareFootage'],
+            'market_trends': json.dumps(attom['neighborhood']),
+            'comparable_sales': json.dumps(rentcast['comparables']),
+            'neighborhood_data': None,
+            'rentcast_data': json.dumps(rentcast), 'attom_data': json.dumps(attom),
+            'created_at': '2026-01-01 00:00:00.000000', 'updated_at': '2026-01-02 00:00:00.000000'
+        })
+        expected[n] = (rentcast, attom)
+    columns = list(rows[0])
+    connection.executemany(
+        f'INSERT INTO properties ({", ".join(columns)}) VALUES ({", ".join(":" + c for c in columns)})', rows
+    )
+    connection.commit()
+    connection.close()
+
+    results = {'properties': args.properties}
+    before = table_bytes(path)
+    results['before'] = {'properties_bytes_per_row': round(before['properties'] / args.properties)}
+
+    from sqlalchemy import select
+    from sqlalchemy.orm import Session
+    engine, LegacyProperty = legacy_model(env['DATABASE_URL'])
+    with Session(engine) as session:
+        load_ms, serialize_us, legacy = load_and_serialize(
+            session, select(LegacyProperty).order_by(LegacyProperty.id), args.properties)
+    engine.dispose()
+    results['before'].update(load_ms=load_ms, serialize_us_per_row=serialize_us)
+
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, manage, 'migrate'], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    results['migrate_seconds'] = round(time.perf_counter() - start, 2)
+    results['migrate_output'] = output.strip().splitlines()
+
+    after = table_bytes(path)
+    hot = after['properties'] + after.get('comparable_sales', 0)
+    results['after'] = {
+        'properties_bytes_per_row': round(after['properties'] / args.properties),
+        'hot_bytes_per_property': round(hot / args.properties),
+        'archive_bytes_per_property': round(after.get('property_payloads', 0) / args.properties)
+    }
+
+    from sqlalchemy.orm import selectinload
+    from src.main import app
+    from src.models.property import Property, db
+    from src.services.payload_archive import load_payloads
+
+    failures = []
+    with app.app_context():
+        load_ms, serialize_us, migrated = load_and_serialize(
+            db.session, select(Property).order_by(Property.id).options(selectinload(Property.comparables)),
+            args.properties)
+        results['after'].update(load_ms=load_ms, serialize_us_per_row=serialize_us)
+
+        for property_id, old in legacy.items():
+            new = migrated[property_id]
+            for key in ('market_trends', 'comparable_sales', 'neighborhood_data', 'estimated_value'):
+                if new[key] != old[key]:
+                    failures.append(f'property {property_id}: {key} {new[key]!r} != {old[key]!r}')
+        for property_id in rng.sample(sorted(expected), min(50, len(expected))):
+            rentcast, attom = expected[property_id]
+            if load_payloads(property_id, db.session) != {'rentcast': rentcast, 'attom': attom}:
+                failures.append(f'property {property_id}: archived payloads do not round-trip')
+
+    client = app.test_client()
+    search = '/api/comparable-sales?sold_after=2023-06-01&sold_before=2023-12-31&min_price=400000&max_price=600000'
+    start = time.perf_counter()
+    response = client.get(search)
+    results['comps_search'] = {'ms': round((time.perf_counter() - start) * 1000, 1), 'status': response.status_code,
+                               'matches': response.get_json().get('count')}
+    connection = sqlite3.connect(path)
+    results['comps_search']['plan'] = [row[-1] for row in connection.execute(
+        'EXPLAIN QUERY PLAN SELECT * FROM comparable_sales WHERE sale_date >= ? AND sale_date <= ? '
+        'AND sale_price >= ? AND sale_price <= ? ORDER BY sale_date DESC LIMIT 50',
+        ('2023-06-01', '2023-12-31', 400000, 600000))]
+    connection.close()
+    if response.status_code != 200:
+        failures.append(f'comps search returned {response.status_code}')
+
+    rescore = subprocess.run([sys.executable, manage, 'rescore'], env=env, check=True,
+                             capture_output=True, text=True).stdout
+    if 'valuations changed: 0' not in rescore:
+        failures.append(f'rescore from typed columns changed valuations: {rescore.strip()}')
+
+    results['bytes_saved_per_property'] = results['before']['properties_bytes_per_row'] - results['after']['hot_bytes_per_property']
+    results['failures'] = failures[:20]
+    print(json.dumps(results, indent=2))
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
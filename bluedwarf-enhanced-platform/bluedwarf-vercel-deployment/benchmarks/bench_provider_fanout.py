@@ -0,0 +1,89 @@
+"""Serial vs concurrent provider lookups for the valuation pipeline
+
+Runs the geocode/RentCast/ATTOM lookups against stub providers with injected
+latency, once one after another (the old code path) and once through the
+fan-out layer, and reports p50/p99 for both.
+
+    python benchmarks/bench_provider_fanout.py --iterations 200
+"""
+import argparse
+import random
+import time
+
+import common  # adds the deployment root to sys.path
+from common import summarize
+from src.routes.property import (
+    PROVIDER_TIMEOUTS, fetch_provider_data, calculate_ai_valuation,
+    geocode_address, get_rentcast_data, get_attom_data
+)
+
+def stub_provider(fn, mean_ms, tail_ms, tail_rate):
+    """Wrap a mock provider with lognormal latency and an occasional slow tail"""
+    def call(address):
+        latency = random.lognormvariate(0, 0.35) * mean_ms
+        if random.random() < tail_rate:
+            latency += tail_ms
+        time.sleep(latency / 1000.0)
+        return fn(address)
+    return call
+
+def value(rentcast_data, attom_data, missing=()):
+    details = {
+        'square_feet': rentcast_data.get('property', {}).get('squareFootage'),
+        'year_built': rentcast_data.get('property', {}).get('yearBuilt')
+    }
+    return calculate_ai_valuation(rentcast_data, attom_data, details, missing_sources=missing)
+
+def run_serial(providers, iterations):
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        address = f'{i} Main St, Austin, TX'
+        providers['geocode'](address)
+        rentcast_data = providers['rentcast'](address)
+        attom_data = providers['attom'](address)
+        value(rentcast_data, attom_data)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def run_concurrent(providers, iterations):
+    samples = []
+    partial = 0
+    for i in range(iterations):
+        start = time.perf_counter()
+        results, failures = fetch_provider_data(f'{i} Main St, Austin, TX', providers)
+        value(results.get('rentcast') or {}, results.get('attom') or {}, failures)
+        samples.append((time.perf_counter() - start) * 1000)
+        partial += bool(failures)
+    return samples, partial
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=80.0, help='mean provider latency')
+    parser.add_argument('--tail-ms', type=float, default=1500.0, help='extra latency for slow calls')
+    parser.add_argument('--tail-rate', type=float, default=0.01, help='fraction of slow calls')
+    parser.add_argument('--timeout', type=float, default=1.0, help='per-provider timeout (s)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    for name in PROVIDER_TIMEOUTS:
+        PROVIDER_TIMEOUTS[name] = args.timeout
+    providers = {
+        'geocode': stub_provider(geocode_address, args.latency_ms * 0.5, args.tail_ms, args.tail_rate),
+        'rentcast': stub_provider(get_rentcast_data, args.latency_ms, args.tail_ms, args.tail_rate),
+        'attom': stub_provider(get_attom_data, args.latency_ms * 1.2, args.tail_ms, args.tail_rate)
+    }
+
+    serial = summarize(run_serial(providers, args.iterations))
+    concurrent_samples, partial = run_concurrent(providers, args.iterations)
+    concurrent = summarize(concurrent_samples)
+
+    print(f"{'path':<12}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    print(f"{'serial':<12}{serial['p50_ms']:>10.1f}{serial['p99_ms']:>10.1f}{serial['mean_ms']:>10.1f}")
+    print(f"{'concurrent':<12}{concurrent['p50_ms']:>10.1f}{concurrent['p99_ms']:>10.1f}{concurrent['mean_ms']:>10.1f}")
+    print(f"partial valuations (provider timeout): {partial}/{args.iterations}")
+
+if __name__ == '__main__':
+    main()
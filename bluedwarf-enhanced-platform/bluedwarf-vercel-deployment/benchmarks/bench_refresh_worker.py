@@ -0,0 +1,153 @@
+"""Hot-address latency: on-request refresh vs stale-while-revalidate vs the refresh worker
+
+Runs the stub providers in their own process with injected latency and
+seeds --properties stored valuations with Zipf-distributed request counts,
+all past VALUATION_MAX_AGE. The --hot most requested addresses are then
+looked up through POST /api/valuation three ways, each on its own rows:
+
+  on_request   no worker, no stale window: the user waits for the providers
+  stale        VALUATION_STALE_HOURS: the stored value is served, marked stale
+  worker       refresh_worker.RefreshWorker.run_once() first, then lookups
+
+Also checks that the worker refreshed in popularity order, stayed within
+its per-provider token bucket rates, and that request counts reach the
+database. Exits non-zero if any check fails.
+
+    python benchmarks/bench_refresh_worker.py --properties 60 --hot 50 --rate 30 --latency-ms 50
+"""
+from datetime import datetime, timedelta
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import common  # adds the deployment root to sys.path
+from common import summarize
+from bench_worker_models import free_port
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def zipf_counts(count, exponent=1.1, top=5000):
+    return [max(1, int(top / (rank + 1) ** exponent)) for rank in range(count)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--properties', type=int, default=60, help='stored properties per scenario')
+    parser.add_argument('--hot', type=int, default=50, help='most requested addresses looked up')
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='mean injected provider latency')
+    parser.add_argument('--rate', type=float, default=30.0, help='worker requests/s per provider')
+    args = parser.parse_args()
+
+    stub_port = free_port()
+    stub = subprocess.Popen([sys.executable, os.path.join(HERE, 'stub_providers.py'), '--port', str(stub_port),
+                             '--latency-ms', str(args.latency_ms)], stdout=subprocess.DEVNULL)
+    stub_url = f'http://127.0.0.1:{stub_port}'
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'refresh.db')}",
+        'AUTO_CREATE_SCHEMA': '1',  # scratch database
+        'RENTCAST_API_KEY': 'stub', 'RENTCAST_BASE_URL': f'{stub_url}/v1',
+        'ATTOM_API_KEY': 'stub', 'ATTOM_BASE_URL': f'{stub_url}/propertyapi/v1.0.0',
+        'GEOCODER_API_KEY': 'stub', 'GEOCODER_BASE_URL': f'{stub_url}/maps/api/geocode',
+        'HTTP_RETRIES': '0', 'VALUATION_STALE_HOURS': '24',
+        'POPULARITY_FLUSH_SIZE': '1000000', 'POPULARITY_FLUSH_SECONDS': '3600'
+    })
+    time.sleep(0.5)
+
+    from src.main import app
+    from src.models.property import Property, db
+    from src.routes import property as property_routes
+    from src.services.address import address_key
+    from src.services.popularity import request_counter
+    from src.services.valuation_cache import valuation_cache
+    from src.refresh_worker import RefreshWorker
+
+    client = app.test_client()
+    counts = zipf_counts(args.properties)
+
+    def seed(prefix):
+        """Stored, stale properties; returns the hot addresses, most requested first"""
+        now = datetime.utcnow()
+        rows = [{
+            'address': f'{prefix + n} Congress Ave, Austin, TX 78701',
+            'normalized_address': property_routes.normalize_address(f'{prefix + n} Congress Ave, Austin, TX 78701'),
+            'address_key': address_key(f'{prefix + n} Congress Ave, Austin, TX 78701'),
+            'latitude': 30.27, 'longitude': -97.74, 'estimated_value': 500000, 'confidence_score': 0.8,
+            'request_count': count, 'last_requested_at': now,
+            'created_at': now - timedelta(days=3), 'updated_at': now - timedelta(hours=30)
+        } for n, count in enumerate(counts)]
+        with app.app_context():
+            db.session.execute(Property.__table__.insert(), rows)
+            db.session.commit()
+        return [row['address'] for row in rows[:args.hot]]
+
+    def lookups(addresses):
+        latencies, stale, providers_called = [], 0, 0
+        for address in addresses:
+            start = time.perf_counter()
+            response = client.post('/api/valuation', json={'address': address})
+            latencies.append((time.perf_counter() - start) * 1000)
+            body = response.get_json()
+            stale += bool(body.get('stale'))
+            providers_called += not body.get('cached')
+        return dict(summarize(latencies), stale=stale, providers_called=providers_called)
+
+    results = {}
+    failures = []
+    try:
+        hot = seed(10000)
+        before = counts[0]
+        property_routes.VALUATION_STALE_MAX_AGE = timedelta(0)
+        results['on_request'] = lookups(hot)
+        with app.app_context():
+            request_counter.flush(db.engine)
+            flushed = db.session.scalar(db.select(Property.request_count).where(
+                Property.address_key == address_key(hot[0])))
+        if flushed != before + 1:
+            failures.append(f'request count for the top address is {flushed}, expected {before + 1}')
+
+        hot = seed(20000)
+        property_routes.VALUATION_STALE_MAX_AGE = timedelta(hours=24)
+        valuation_cache.clear()
+        results['stale'] = lookups(hot)
+
+        hot = seed(30000)
+        rates = {'geocode': args.rate, 'rentcast': args.rate, 'attom': args.rate}
+        with app.app_context():
+            worker = RefreshWorker(rates=rates, batch_size=25)
+            first = worker.due_properties()
+            due_counts = [db.session.get(Property, property_id).request_count for property_id, _ in first]
+            # Rows seeded by earlier scenarios are due as well
+            start = time.perf_counter()
+            refreshed = worker.run_once()
+            elapsed = time.perf_counter() - start
+        if due_counts != sorted(due_counts, reverse=True):
+            failures.append('worker did not pick due properties in popularity order')
+        stats = worker.stats()
+        for name, bucket in stats['providers'].items():
+            observed = bucket['acquired'] / elapsed
+            bucket['observed_rate'] = round(observed, 1)
+            if bucket['acquired'] > bucket['capacity'] + args.rate * elapsed * 1.05:
+                failures.append(f'{name}: {bucket["acquired"]} requests in {elapsed:.1f}s exceeds {args.rate}/s')
+        valuation_cache.clear()
+        results['worker'] = dict(lookups(hot), refreshed=refreshed, refresh_seconds=round(elapsed, 2),
+                                 refresh_stats=stats)
+    finally:
+        stub.terminate()
+
+    if not results['on_request']['providers_called']:
+        failures.append('on_request lookups never reached the providers')
+    if results['stale']['stale'] != len(hot) or results['stale']['providers_called']:
+        failures.append('stale lookups were not all served stale from the database')
+    if results['worker']['stale'] or results['worker']['providers_called']:
+        failures.append('lookups after the worker ran were stale or reached the providers')
+
+    results['failures'] = failures
+    print(json.dumps(results, indent=2))
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
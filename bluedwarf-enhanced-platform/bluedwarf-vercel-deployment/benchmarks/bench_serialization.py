@@ -0,0 +1,121 @@
+"""Serialization time for Property, Agent and PropertyLead lists: stdlib vs orjson, cold vs cached to_dict
+
+Seeds a scratch SQLite database (the bench_lead_endpoints data: agents,
+properties with five comparables each, one lead per property and agent), loads
+--rows of each model with their relationships, then times turning the list
+into a JSON response body four ways:
+
+  stdlib_cold    Flask's DefaultJSONProvider, to_dict caches cleared first
+  stdlib_cached  DefaultJSONProvider, to_dict served from the cache
+  orjson_cold    OrjsonProvider, caches cleared first
+  orjson_cached  OrjsonProvider, cached to_dict - what a warm worker does
+
+Exits non-zero if the bodies do not decode to the same data, or if editing
+a list or dict nested in one to_dict() result changes what the next call
+returns.
+
+    python benchmarks/bench_serialization.py --rows 2000 --repeat 20
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import common  # adds the deployment root to sys.path
+from bench_lead_endpoints import seed
+
+def clear_caches(session):
+    """Drop the cached to_dict() of everything loaded, nested objects included"""
+    from src.models.property import invalidate_serialized
+    for record in list(session.identity_map.values()):
+        invalidate_serialized(record)
+
+def time_body(provider, session, records, repeat, cold):
+    """(us per row, response body) for serializing records as one JSON list"""
+    samples = []
+    for _ in range(repeat):
+        if cold:
+            clear_caches(session)
+        start = time.perf_counter()
+        body = provider.response([record.to_dict() for record in records]).get_data()
+        samples.append(time.perf_counter() - start)
+    return round(min(samples) * 1e6 / len(records), 2), body
+
+def mutate_nested(value):
+    """Edit every list and dict nested in a to_dict() result; returns how many"""
+    edited = 0
+    for item in list(value.values() if isinstance(value, dict) else value):
+        if isinstance(item, dict):
+            edited += mutate_nested(item) + 1
+            item['mutated'] = True
+        elif isinstance(item, list):
+            edited += mutate_nested(item) + 1
+            item.append('mutated')
+    return edited
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000, help='records of each model')
+    parser.add_argument('--repeat', type=int, default=20, help='timed runs per case; the best is reported')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'serialization.db')}",
+        'AUTO_CREATE_SCHEMA': '1'  # scratch database
+    })
+    from flask.json.provider import DefaultJSONProvider
+    from sqlalchemy import select
+    from sqlalchemy.orm import selectinload
+    from src.main import app
+    from src.models.property import Agent, Property, PropertyLead, db
+    from src.services.json_provider import OrjsonProvider, orjson
+
+    if orjson is None:
+        raise SystemExit('orjson is not installed; pip install orjson to compare')
+
+    providers = {'stdlib': DefaultJSONProvider(app), 'orjson': OrjsonProvider(app)}
+    results = {'rows': args.rows}
+    failures = []
+    with app.app_context():
+        seed(db, args.rows, 1, random.Random(args.seed))
+        models = {
+            'Property': db.session.scalars(select(Property).options(selectinload(Property.comparables))
+                                           .order_by(Property.id).limit(args.rows)).all(),
+            'Agent': db.session.scalars(select(Agent).order_by(Agent.id)).all(),
+            'PropertyLead': db.session.scalars(select(PropertyLead).options(
+                selectinload(PropertyLead.property).selectinload(Property.comparables),
+                selectinload(PropertyLead.agent)
+            ).order_by(PropertyLead.id).limit(args.rows)).all()
+        }
+
+        for name, records in models.items():
+            timings, bodies = {}, {}
+            for encoder, provider in providers.items():
+                for cold in (True, False):
+                    case = f"{encoder}_{'cold' if cold else 'cached'}"
+                    timings[case], bodies[case] = time_body(provider, db.session, records, args.repeat, cold)
+            expected = json.loads(bodies['stdlib_cold'])
+            for case, body in bodies.items():
+                if json.loads(body) != expected:
+                    failures.append(f'{name}: {case} body differs from stdlib_cold')
+            # Callers must get their own nested lists and dicts, not the cached ones
+            expected_dicts = [json.loads(json.dumps(record.to_dict())) for record in records]
+            edited = sum(mutate_nested(record.to_dict()) for record in records)
+            if [record.to_dict() for record in records] != expected_dicts:
+                failures.append(f'{name}: editing a nested to_dict() value changed later calls')
+            timings['nested_values_edited'] = edited
+            timings['speedup'] = round(timings['stdlib_cold'] / timings['orjson_cached'], 1)
+            timings['bytes'] = {encoder: len(bodies[f'{encoder}_cold']) for encoder in providers}
+            results[name] = timings
+
+    results['failures'] = failures
+    print(json.dumps(results, indent=2))
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
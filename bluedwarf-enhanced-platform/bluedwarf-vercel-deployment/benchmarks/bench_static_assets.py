@@ -0,0 +1,130 @@
+"""Bytes sent and filesystem calls per page view of the static site
+
+Runs src/build_assets.py, then loads the page the way a browser does (HTML,
+then the logo and favicon it references, with browser Accept headers)
+through the in-memory asset table, and through the old catch-all (an
+os.path.exists check plus send_from_directory per request) registered here
+on a side route. A repeat view revalidates what the old handler left
+uncached; hashed assets are immutable and are not requested again.
+
+Filesystem calls are counted with an audit hook for opens and a counting
+wrapper around os.stat, which os.path.exists and send_file go through.
+
+    python benchmarks/bench_static_assets.py --views 500
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import common  # adds the deployment root to sys.path
+
+try:
+    import brotli
+except ImportError:  # without it the build makes no br variants to decode
+    brotli = None
+
+BROWSER_HEADERS = {
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8'
+}
+IMAGE_ACCEPT = 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8'
+
+class FilesystemCounter:
+    def __init__(self):
+        self.opens = 0
+        self.stats = 0
+        self.active = False
+        sys.addaudithook(self._audit)
+        real_stat = os.stat
+
+        def counting_stat(*args, **kwargs):
+            if self.active:
+                self.stats += 1
+            return real_stat(*args, **kwargs)
+        os.stat = counting_stat
+
+    def _audit(self, event, args):
+        if self.active and event == 'open':
+            self.opens += 1
+
+def asset_links(html):
+    return re.findall(r'''(?:src|href)=["']([^"'#?:]+\.(?:png|ico|jpg|jpeg|webp|svg|css|js))["']''', html)
+
+def page_view(client, prefix, cached):
+    """Fetch a page and its assets; cached maps url -> ETag from a previous view"""
+    headers = dict(BROWSER_HEADERS)
+    if prefix in cached:
+        headers['If-None-Match'] = cached[prefix]
+    response = client.get(prefix, headers=headers)
+    sent = len(response.data)
+    cached[prefix] = response.headers.get('ETag', cached.get(prefix))
+    if response.status_code == 200:
+        body = response.data
+        if response.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        elif response.headers.get('Content-Encoding') == 'br':
+            body = brotli.decompress(body)
+        cached['html', prefix] = body.decode('utf-8')
+    for link in set(asset_links(cached['html', prefix])):
+        url = prefix.rstrip('/') + '/' + link
+        if url in cached and cached[url] is None:
+            continue  # immutable - served from the browser cache
+        headers = {'Accept': IMAGE_ACCEPT, 'Accept-Encoding': 'gzip, deflate, br'}
+        if cached.get(url):
+            headers['If-None-Match'] = cached[url]
+        asset = client.get(url, headers=headers)
+        sent += len(asset.data)
+        cached[url] = None if 'immutable' in asset.headers.get('Cache-Control', '') else asset.headers.get('ETag')
+    return sent
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--views', type=int, default=500)
+    args = parser.parse_args()
+
+    subprocess.run([sys.executable, os.path.join(common.ROOT, 'src', 'build_assets.py')],
+                   check=True, stdout=subprocess.DEVNULL)
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'app.db')}")
+    os.environ['AUTO_CREATE_SCHEMA'] = '1'  # scratch database
+    from flask import send_from_directory
+    from src.main import app
+
+    @app.route('/legacy/', defaults={'path': ''})
+    @app.route('/legacy/<path:path>')
+    def legacy_serve(path):
+        static_folder_path = app.static_folder
+        if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
+            return send_from_directory(static_folder_path, path)
+        return send_from_directory(static_folder_path, 'index.html')
+
+    counter = FilesystemCounter()
+    client = app.test_client()
+    results = {}
+    for name, prefix in (('before', '/legacy/'), ('after', '/')):
+        first_bytes = repeat_bytes = 0
+        counter.opens = counter.stats = 0
+        counter.active = True
+        start = time.perf_counter()
+        for _ in range(args.views):
+            cached = {}
+            first_bytes += page_view(client, prefix, cached)
+            repeat_bytes += page_view(client, prefix, cached)
+        elapsed = time.perf_counter() - start
+        counter.active = False
+        results[name] = {
+            'first_view_bytes': round(first_bytes / args.views),
+            'repeat_view_bytes': round(repeat_bytes / args.views),
+            'fs_opens_per_view': round(counter.opens / (2 * args.views), 2),
+            'fs_stats_per_view': round(counter.stats / (2 * args.views), 2),
+            'ms_per_view': round(elapsed / (2 * args.views) * 1000, 3)
+        }
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Repeat /api/valuation lookups with and without the in-process cache
+
+Values a set of popular addresses once, then replays a skewed request mix
+against the Flask test client: first answered from the Property table (the
+24h database check), then from the in-process LRU cache.
+
+    python benchmarks/bench_valuation_cache.py --addresses 200 --requests 5000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import common  # adds the deployment root to sys.path
+from common import summarize
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--addresses', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+    os.environ['AUTO_CREATE_SCHEMA'] = '1'  # scratch database
+
+    from src.main import app
+    from src.services.valuation_cache import valuation_cache
+
+    random.seed(args.seed)
+    client = app.test_client()
+    addresses = [f'{100 + i} Main St, Austin, TX 78701' for i in range(args.addresses)]
+    for address in addresses:
+        client.post('/api/valuation', json={'address': address})
+
+    # Zipf-like popularity: a few addresses get most of the traffic
+    weights = [1.0 / (rank + 1) for rank in range(len(addresses))]
+    workload = random.choices(addresses, weights=weights, k=args.requests)
+
+    def replay():
+        samples = []
+        for address in workload:
+            start = time.perf_counter()
+            response = client.post('/api/valuation', json={'address': address})
+            samples.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200
+        return samples
+
+    # Database path: keep the cache empty so every lookup hits the Property table
+    valuation_cache.maxsize = 0
+    valuation_cache.clear()
+    database = summarize(replay())
+
+    valuation_cache.maxsize = max(64, args.addresses // 2)
+    valuation_cache.clear()
+    valuation_cache.hits = valuation_cache.misses = valuation_cache.evictions = 0
+    cached = summarize(replay())
+
+    print(json.dumps({
+        'database_check': database,
+        'in_process_cache': cached,
+        'cache_stats': valuation_cache.stats()
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
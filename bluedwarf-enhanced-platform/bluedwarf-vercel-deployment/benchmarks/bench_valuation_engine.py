@@ -0,0 +1,157 @@
+"""Re-scoring speed: scalar calculate_ai_valuation loop vs the vectorized engine
+
+Generates --rows synthetic properties (seeded) with realistic gaps: some
+rows miss RentCast or ATTOM, some miss an assessed value, some have no
+year built or square footage. Scores them once with the scalar function
+row by row and once with calculate_ai_valuations over whole columns, and
+checks every estimated value, confidence score and price per square foot
+is identical. Exits non-zero on any mismatch.
+
+With --db-rows it also stores that many properties in a scratch SQLite
+database and times `manage.py rescore` end to end.
+
+    python benchmarks/bench_valuation_engine.py --rows 1000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import common  # adds the deployment root to sys.path
+import numpy as np
+
+from src.services.valuation import calculate_ai_valuation, calculate_ai_valuations
+
+CURRENT_YEAR = 2026
+
+def synthetic_columns(rows, seed):
+    """Provider values, year built, square feet and missing-source masks"""
+    rng = np.random.default_rng(seed)
+    base = rng.lognormal(mean=13.0, sigma=0.5, size=rows).round()
+    missing_rentcast = rng.random(rows) < 0.08
+    missing_attom = rng.random(rows) < 0.08
+    missing_geocode = rng.random(rows) < 0.03
+    rentcast = np.where(missing_rentcast, 0, (base * rng.normal(1.0, 0.08, rows)).round())
+    market = np.where(missing_attom, 0, (base * rng.normal(1.0, 0.10, rows)).round())
+    assessed = np.where(missing_attom | (rng.random(rows) < 0.05), 0, (base * rng.normal(0.85, 0.10, rows)).round())
+    year_built = np.where(rng.random(rows) < 0.05, 0, rng.integers(1900, CURRENT_YEAR + 1, rows))
+    square_feet = np.where(rng.random(rows) < 0.05, 0, rng.integers(500, 6000, rows))
+    return {
+        'rentcast': rentcast, 'market': market, 'assessed': assessed,
+        'year_built': year_built, 'square_feet': square_feet,
+        'missing': {'geocode': missing_geocode, 'rentcast': missing_rentcast, 'attom': missing_attom}
+    }
+
+def score_scalar(columns):
+    """Row-by-row, the way each /api/valuation request scores a property"""
+    missing = {source: mask.tolist() for source, mask in columns['missing'].items()}
+    rows = zip(columns['rentcast'].tolist(), columns['market'].tolist(), columns['assessed'].tolist(),
+               columns['year_built'].tolist(), columns['square_feet'].tolist(),
+               missing['geocode'], missing['rentcast'], missing['attom'])
+    values, confidences, prices = [], [], []
+    for rentcast, market, assessed, year_built, square_feet, no_geocode, no_rentcast, no_attom in rows:
+        missing_sources = [source for source, absent in
+                           (('geocode', no_geocode), ('rentcast', no_rentcast), ('attom', no_attom)) if absent]
+        value, confidence = calculate_ai_valuation(
+            {'property': {'valueEstimate': rentcast}},
+            {'property': {'marketValue': market, 'assessedValue': assessed}},
+            {'year_built': int(year_built), 'square_feet': int(square_feet)},
+            missing_sources=missing_sources, current_year=CURRENT_YEAR
+        )
+        values.append(value)
+        confidences.append(confidence)
+        prices.append(value / square_feet if square_feet else 0)
+    return values, confidences, prices
+
+def score_vectorized(columns):
+    result = calculate_ai_valuations(
+        columns['rentcast'], columns['market'], columns['assessed'], columns['year_built'],
+        square_feet=columns['square_feet'], missing=columns['missing'], current_year=CURRENT_YEAR
+    )
+    return result['estimated_value'], result['confidence_score'], result['price_per_sqft']
+
+def compare(scalar, vectorized):
+    """Rows where the two engines disagree, by output"""
+    mismatches = {}
+    for name, expected, actual in zip(('estimated_value', 'confidence_score', 'price_per_sqft'), scalar, vectorized):
+        differing = np.flatnonzero(np.asarray(expected, dtype=np.float64) != np.asarray(actual, dtype=np.float64))
+        if len(differing):
+            mismatches[name] = {'rows': int(len(differing)), 'first_rows': differing[:5].tolist()}
+    return mismatches
+
+def time_db_rescore(rows, seed):
+    """Store `rows` properties in a scratch database and time manage.py rescore"""
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'rescore.db')}")
+    env.pop('AUTO_CREATE_SCHEMA', None)
+    manage = os.path.join(common.ROOT, 'src', 'manage.py')
+    subprocess.run([sys.executable, manage, 'init-db'], env=env, check=True, stdout=subprocess.DEVNULL)
+
+    os.environ.update(DATABASE_URL=env['DATABASE_URL'])
+    from src.main import app
+    from src.models.property import Property, db
+    from src.services.address import address_key
+
+    columns = synthetic_columns(rows, seed)
+    with app.app_context():
+        db.session.execute(Property.__table__.insert(), [
+            {
+                'address': f'{n} Synthetic St, Austin, TX 78701',
+                'normalized_address': f'{n} SYNTHETIC ST AUSTIN TX 78701',
+                'address_key': address_key(f'{n} Synthetic St, Austin, TX 78701'),
+                'latitude': None if columns['missing']['geocode'][n] else 30.27,
+                'longitude': None if columns['missing']['geocode'][n] else -97.74,
+                'year_built': int(columns['year_built'][n]) or None,
+                'square_feet': int(columns['square_feet'][n]) or None,
+                'rentcast_value': int(columns['rentcast'][n]) or None,
+                'market_value': int(columns['market'][n]) or None,
+                'assessed_value': int(columns['assessed'][n]) or None,
+                'missing_sources': ','.join(source for source in ('attom', 'geocode', 'rentcast')
+                                            if columns['missing'][source][n])
+            }
+            for n in range(rows)
+        ])
+        db.session.commit()
+
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, manage, 'rescore'], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    elapsed = time.perf_counter() - start
+    return {'rows': rows, 'seconds': round(elapsed, 2), 'rows_per_sec': round(rows / elapsed),
+            'output': output.strip().splitlines()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--db-rows', type=int, default=0, help='also time manage.py rescore over this many stored rows')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    columns = synthetic_columns(args.rows, args.seed)
+
+    start = time.perf_counter()
+    scalar = score_scalar(columns)
+    scalar_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized = score_vectorized(columns)
+    vectorized_seconds = time.perf_counter() - start
+
+    mismatches = compare(scalar, vectorized)
+    results = {
+        'rows': args.rows,
+        'scalar': {'seconds': round(scalar_seconds, 3), 'rows_per_sec': round(args.rows / scalar_seconds)},
+        'vectorized': {'seconds': round(vectorized_seconds, 3), 'rows_per_sec': round(args.rows / vectorized_seconds)},
+        'speedup': round(scalar_seconds / vectorized_seconds, 1),
+        'mismatches': mismatches
+    }
+    if args.db_rows:
+        results['db_rescore'] = time_db_rescore(args.db_rows, args.seed)
+    print(json.dumps(results, indent=2))
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""Throughput of the API under each server and worker model
+
+Serves api/index.py (WSGI) and api/asgi.py (ASGI) through worker_app.py,
+which adds a /bench/stream route, under each available server:
+
+  werkzeug-threaded  one process, a thread per request (python src/main.py)
+  gunicorn-sync      --workers N, one request at a time per worker
+  gunicorn-gthread   --workers N --threads T (the gunicorn.conf.py default)
+  uvicorn            --workers N through the WSGI bridge in api/asgi.py
+
+Each model gets the same closed-loop load: --connections client threads on
+persistent HTTP/1.1 connections, mixing GET /health and POST /api/valuation
+over a small address set. It reports requests/s, latency, errors and the
+connections the clients had to open. It also checks that a streamed
+response arrives chunk by chunk. Exits non-zero if any model returns
+errors or buffers the stream.
+
+    python benchmarks/bench_worker_models.py --workers 4 --connections 16 --duration 5
+"""
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import common  # adds the deployment root to sys.path
+from common import summarize
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ADDRESSES = [f'{100 + i} Congress Ave, Austin, TX 78701' for i in range(20)]
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def server_command(model, port, workers, threads):
+    """(command, extra env) for a model, or None when its server is not installed"""
+    python = sys.executable
+    if model == 'werkzeug-threaded':
+        return [python, '-c', 'import worker_app; from werkzeug.serving import run_simple; '
+                f'run_simple("127.0.0.1", {port}, worker_app.app, threaded=True)'], {}
+    if model.startswith('gunicorn-'):
+        if importlib.util.find_spec('gunicorn') is None:
+            return None
+        return [python, '-m', 'gunicorn', '-c', os.path.join(common.ROOT, 'gunicorn.conf.py'),
+                'worker_app:app'], {
+            'BIND': f'127.0.0.1:{port}', 'WEB_CONCURRENCY': str(workers),
+            'GUNICORN_WORKER_CLASS': model.split('-', 1)[1], 'GUNICORN_THREADS': str(threads)
+        }
+    if model == 'uvicorn':
+        if importlib.util.find_spec('uvicorn') is None:
+            return None
+        return [python, '-m', 'uvicorn', 'worker_app:asgi_app', '--host', '127.0.0.1',
+                '--port', str(port), '--workers', str(workers), '--log-level', 'warning'], {}
+    raise ValueError(model)
+
+def wait_until_ready(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with {process.returncode}')
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                conn.close()
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('server did not become ready')
+
+class CountingConnection(http.client.HTTPConnection):
+    """HTTPConnection that counts the TCP connections it opens"""
+    opened = 0
+    lock = threading.Lock()
+
+    def connect(self):
+        super().connect()
+        with CountingConnection.lock:
+            CountingConnection.opened += 1
+
+def send(conn, method, path, body=None):
+    headers = {'Content-Type': 'application/json'} if body is not None else {}
+    for attempt in range(2):
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            # The server closed an idle keep-alive connection; retry on a new one
+            conn.close()
+            if attempt:
+                raise
+
+def run_load(port, connections, duration):
+    CountingConnection.opened = 0
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+
+    def client(seed):
+        rng = random.Random(seed)
+        conn = CountingConnection('127.0.0.1', port, timeout=30)
+        local = []
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                if rng.random() < 0.5:
+                    status = send(conn, 'GET', '/health')
+                else:
+                    body = json.dumps({'address': rng.choice(ADDRESSES)})
+                    status = send(conn, 'POST', '/api/valuation', body)
+            except OSError as e:
+                errors.append(repr(e))
+                conn.close()
+                continue
+            local.append((time.perf_counter() - start) * 1000)
+            if status != 200:
+                errors.append(status)
+        conn.close()
+        latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(connections)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return dict(summarize(latencies),
+                requests_per_sec=round(len(latencies) / elapsed),
+                errors=len(errors),
+                error_samples=[str(e) for e in errors[:3]],
+                connections_opened=CountingConnection.opened)
+
+def probe_stream(port):
+    """(ms to the first line, ms to the whole body) for /bench/stream"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    start = time.perf_counter()
+    conn.request('GET', '/bench/stream')
+    response = conn.getresponse()
+    first = response.readline()
+    first_ms = (time.perf_counter() - start) * 1000
+    rest = response.read()
+    total_ms = (time.perf_counter() - start) * 1000
+    conn.close()
+    lines = (first + rest).decode().splitlines()
+    return round(first_ms, 1), round(total_ms, 1), len(lines)
+
+def run_model(model, args, env):
+    port = free_port()
+    command = server_command(model, port, args.workers, args.threads)
+    if command is None:
+        return {'skipped': 'server not installed'}
+    command, extra_env = command
+    # Access logs would fill a pipe and stall the server, so they are discarded
+    process = subprocess.Popen(command, cwd=HERE, env=dict(env, **extra_env),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_ready(port, process)
+        # Warm every worker's valuation path before measuring
+        run_load(port, args.connections, min(1.0, args.duration))
+        result = run_load(port, args.connections, args.duration)
+        first_ms, total_ms, lines = probe_stream(port)
+        result.update(stream_first_line_ms=first_ms, stream_total_ms=total_ms, stream_lines=lines,
+                      streamed=lines > 1 and first_ms < total_ms / 2)
+        return result
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--models', default='werkzeug-threaded,gunicorn-sync,gunicorn-gthread,uvicorn')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4, help='threads per gthread worker')
+    parser.add_argument('--connections', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=5.0)
+    args = parser.parse_args()
+
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'app.db')}")
+    env.pop('AUTO_CREATE_SCHEMA', None)
+    subprocess.run([sys.executable, os.path.join(common.ROOT, 'src', 'manage.py'), 'init-db'],
+                   env=env, check=True, stdout=subprocess.DEVNULL)
+
+    results = {model: run_model(model, args, env) for model in args.models.split(',')}
+    print(json.dumps(results, indent=2))
+    if any(r.get('errors') or r.get('streamed') is False for r in results.values()):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
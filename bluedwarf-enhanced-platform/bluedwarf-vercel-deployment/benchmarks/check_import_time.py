@@ -0,0 +1,108 @@
+"""Check the cold-start cost of serving /api/valuation
+
+Each run is a fresh interpreter that imports src.main and serves one POST
+/api/valuation (no provider keys, so the built-in estimates are used), the
+way a new serverless instance does. Exits non-zero if the median of import
+plus first request goes over --budget-ms, or if a module that should load
+on first use (stripe, requests) is imported by src.main.
+
+The schema is created once up front with src/manage.py init-db, so each
+run measures the import of an app that only checks its tables exist.
+
+    python benchmarks/check_import_time.py --runs 5 --budget-ms 1500
+    python benchmarks/check_import_time.py --top 15   # slowest imports too
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import common  # adds the deployment root to sys.path
+
+# Imported on first use; loading any of these from src.main is a regression
+DEFERRED_MODULES = ('stripe', 'requests')
+
+def run_child():
+    import time
+    start = time.perf_counter()
+    from src.main import app
+    imported = time.perf_counter()
+    loaded_at_import = [name for name in DEFERRED_MODULES if name in sys.modules]
+
+    response = app.test_client().post('/api/valuation', json={'address': '500 Congress Ave, Austin, TX 78701'})
+    served = time.perf_counter()
+    print(json.dumps({
+        'import_ms': (imported - start) * 1000,
+        'first_request_ms': (served - imported) * 1000,
+        'status': response.status_code,
+        'loaded_at_import': loaded_at_import
+    }))
+
+def slowest_imports(env, top):
+    """(cumulative us, module) for the slowest imports under -X importtime"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import src.main'],
+                            cwd=common.ROOT, env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].strip()))
+    return sorted(rows, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=1500.0,
+                        help='median import + first request, in milliseconds')
+    parser.add_argument('--top', type=int, default=0, help='also list the N slowest imports')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return run_child()
+
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'app.db')}")
+    for key in ('RENTCAST_API_KEY', 'ATTOM_API_KEY', 'GEOCODER_API_KEY', 'AUTO_CREATE_SCHEMA'):
+        env.pop(key, None)
+    subprocess.run([sys.executable, os.path.join(common.ROOT, 'src', 'manage.py'), 'init-db'],
+                   env=env, check=True, stdout=subprocess.DEVNULL)
+
+    runs = []
+    for _ in range(args.runs):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child'],
+                                env=env, capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    import_ms = statistics.median(run['import_ms'] for run in runs)
+    first_request_ms = statistics.median(run['first_request_ms'] for run in runs)
+    loaded = sorted({name for run in runs for name in run['loaded_at_import']})
+    failures = []
+    if import_ms + first_request_ms > args.budget_ms:
+        failures.append(f'cold start {import_ms + first_request_ms:.0f} ms over budget {args.budget_ms:.0f} ms')
+    if loaded:
+        failures.append(f'imported by src.main: {", ".join(loaded)}')
+    if any(run['status'] != 200 for run in runs):
+        failures.append(f'valuation statuses: {sorted({run["status"] for run in runs})}')
+
+    results = {
+        'runs': args.runs,
+        'median_import_ms': round(import_ms, 1),
+        'median_first_request_ms': round(first_request_ms, 1),
+        'median_cold_start_ms': round(import_ms + first_request_ms, 1),
+        'budget_ms': args.budget_ms,
+        'failures': failures
+    }
+    if args.top:
+        results['slowest_imports_ms'] = [
+            {'module': module, 'cumulative_ms': round(us / 1000, 1)}
+            for us, module in slowest_imports(env, args.top)
+        ]
+    print(json.dumps(results, indent=2))
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
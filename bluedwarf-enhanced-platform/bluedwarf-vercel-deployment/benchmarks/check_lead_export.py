@@ -0,0 +1,160 @@
+"""Check lead paging and the streamed lead export: every lead once, flat memory
+
+Seeds agents with increasing lead counts (--sizes) into a scratch SQLite
+database. Many leads share a created_at, so the (created_at, id) keyset has
+ties to break. Then checks:
+
+  - walking GET /api/agents/<id>/leads?cursor= returns every lead once,
+    newest first, with pages capped at LEADS_MAX_PAGE_SIZE
+  - a malformed cursor is a 400
+  - /leads/export as NDJSON and CSV has every lead once, in the same order
+  - peak Python memory (tracemalloc) while streaming the export does not
+    grow with the number of leads: the largest agent's peak must stay
+    within --max-growth times the smallest's (keep the smallest above a few
+    LEADS_EXPORT_CHUNK_SIZE chunks, so it measures the steady state)
+
+Exits non-zero if a check fails.
+
+    python benchmarks/check_lead_export.py --sizes 5000 20000 100000
+"""
+from datetime import datetime, timedelta
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import common  # adds the deployment root to sys.path
+
+def seed(db, sizes):
+    from src.models.property import Agent, Property, PropertyLead
+    from src.services.address import address_key
+
+    connection = db.session.connection()
+    connection.execute(Agent.__table__.insert(), [{
+        'id': agent_id, 'name': f'Agent {agent_id}', 'email': f'agent{agent_id}@example.com',
+        'license_number': f'{agent_id:08d}', 'license_state': 'TX'
+    } for agent_id in range(1, len(sizes) + 1)])
+    connection.execute(Property.__table__.insert(), [{
+        'id': i, 'address': f'{i} Congress Ave, Austin, TX 78701', 'normalized_address': f'{i} CONGRESS AVE, AUSTIN, TX 78701',
+        'address_key': address_key(f'{i} Congress Ave, Austin, TX 78701')
+    } for i in range(1, 1001)])
+    started = datetime(2026, 1, 1)
+    lead_id = 0
+    for agent_id, size in enumerate(sizes, 1):
+        rows = []
+        for n in range(size):
+            lead_id += 1
+            rows.append({
+                'id': lead_id, 'property_id': n % 1000 + 1, 'agent_id': agent_id, 'lead_type': 'valuation',
+                'customer_name': f'Buyer {n}', 'customer_email': f'buyer{n}@example.com', 'status': 'new',
+                'message': 'Interested in a valuation, please call after 5pm.',
+                # Ten leads per second: ties on created_at across page boundaries
+                'created_at': started + timedelta(seconds=n // 10)
+            })
+        connection.execute(PropertyLead.__table__.insert(), rows)
+    db.session.commit()
+
+def expected_order(db, agent_id):
+    from src.models.property import PropertyLead
+
+    return [lead_id for (lead_id,) in db.session.query(PropertyLead.id).filter_by(agent_id=agent_id).order_by(
+        PropertyLead.created_at.desc(), PropertyLead.id.desc())]
+
+def walk_pages(client, agent_id, limit):
+    """Lead ids from following next_cursor to the end, and the largest page seen"""
+    ids, largest, cursor = [], 0, None
+    while True:
+        url = f'/api/agents/{agent_id}/leads?view=compact&limit={limit}'
+        body = client.get(url + (f'&cursor={cursor}' if cursor else '')).get_json()
+        ids.extend(lead['id'] for lead in body['leads'])
+        largest = max(largest, body['count'])
+        cursor = body['next_cursor']
+        if not cursor:
+            return ids, largest
+
+def stream_export(client, agent_id, export_format):
+    """(body text, peak traced bytes, seconds) for one export, consumed chunk by chunk"""
+    with tempfile.TemporaryFile() as spool:
+        # Chunks go to a file, so only what the app holds at once is traced; tracing
+        # starts before the request because the test client pulls the first chunk itself
+        tracemalloc.start()
+        start = time.perf_counter()
+        response = client.get(f'/api/agents/{agent_id}/leads/export?format={export_format}', buffered=False)
+        for chunk in response.response:
+            spool.write(chunk if isinstance(chunk, bytes) else chunk.encode())
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        response.close()
+        spool.seek(0)
+        return spool.read().decode(), peak, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5000, 20000, 100000], help='leads per agent')
+    parser.add_argument('--max-growth', type=float, default=1.5, help='allowed peak memory ratio, largest to smallest')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'export.db')}"
+    os.environ['AUTO_CREATE_SCHEMA'] = '1'  # scratch database
+    from src.main import app
+    from src.models.user import db
+    from src.routes.agent import LEADS_MAX_PAGE_SIZE
+
+    failures = []
+    results = {'sizes': {}}
+    with app.app_context():
+        seed(db, args.sizes)
+        expected = {agent_id: expected_order(db, agent_id) for agent_id in range(1, len(args.sizes) + 1)}
+        db.session.remove()
+    client = app.test_client()
+
+    if client.get('/api/agents/1/leads?cursor=not-a-cursor').status_code != 400:
+        failures.append('malformed cursor was not a 400')
+
+    peaks = []
+    for agent_id, size in enumerate(args.sizes, 1):
+        order = expected[agent_id]
+        stats = {}
+        if size <= 20000:  # paging through every lead of the largest agents takes a while
+            start = time.perf_counter()
+            ids, largest = walk_pages(client, agent_id, LEADS_MAX_PAGE_SIZE * 10)
+            stats['paging_seconds'] = round(time.perf_counter() - start, 2)
+            if ids != order:
+                failures.append(f'{size} leads: paging returned {len(ids)} leads ({len(set(ids))} distinct), '
+                                f'not the {len(order)} expected in order')
+            if largest > LEADS_MAX_PAGE_SIZE:
+                failures.append(f'{size} leads: a page had {largest} leads, over the {LEADS_MAX_PAGE_SIZE} cap')
+
+        body, peak, elapsed = stream_export(client, agent_id, 'ndjson')
+        ids = [json.loads(line)['id'] for line in body.splitlines()]
+        if ids != order:
+            failures.append(f'{size} leads: NDJSON export has {len(ids)} leads, not the {len(order)} expected in order')
+        stats['ndjson'] = {'seconds': round(elapsed, 2), 'rows_per_sec': round(size / elapsed),
+                           'peak_kib': round(peak / 1024), 'bytes': len(body)}
+        peaks.append(peak)
+
+        body, peak, elapsed = stream_export(client, agent_id, 'csv')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        if [int(row['id']) for row in rows] != order:
+            failures.append(f'{size} leads: CSV export has {len(rows)} rows, not the {len(order)} expected in order')
+        stats['csv'] = {'seconds': round(elapsed, 2), 'rows_per_sec': round(size / elapsed),
+                        'peak_kib': round(peak / 1024), 'bytes': len(body)}
+        results['sizes'][size] = stats
+
+    results['peak_growth'] = round(max(peaks) / min(peaks), 2)
+    if results['peak_growth'] > args.max_growth:
+        failures.append(f"export peak memory grew {results['peak_growth']}x from {min(args.sizes)} "
+                        f'to {max(args.sizes)} leads (allowed {args.max_growth}x)')
+    results['failures'] = failures
+    print(json.dumps(results, indent=2))
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Check the number of SQL statements the lead endpoints issue
+
+Seeds one agent with leads on distinct properties and counts the statements
+sent while serving each lead view. Exits non-zero if any view goes over its
+budget, which is fixed and independent of how many leads are returned.
+
+    python benchmarks/check_lead_queries.py --leads 50
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import common  # adds the deployment root to sys.path
+
+# (path, statement budget)
+CASES = [
+    ('/api/agents/1/leads?limit=50', 4),                  # agent, leads, properties, comps
+    ('/api/agents/1/leads?limit=50&view=compact', 3),     # agent, leads, properties
+    ('/api/agents/1/leads?limit=50&fields=id,status', 2),  # agent, leads
+    ('/api/agents/1/profile', 5),                          # agent, leads, properties, comps, counts
+    ('/api/agents/1/profile?view=compact', 4),
+    ('/api/leads/performance?agent_id=1', 4)               # agent, counts, quota, monthly count
+]
+
+def seed(db, leads):
+    from src.models.property import Agent, ComparableSale, Property, PropertyLead
+    from src.services.address import address_key
+
+    db.session.add(Agent(id=1, name='Lead Agent', email='leads@example.com', license_number='12345678',
+                         license_state='TX', service_areas=json.dumps(['Austin, TX']),
+                         specialties=json.dumps(['Luxury']), subscription_active=True,
+                         license_verified=True, identity_verified=True, leads_received=leads))
+    for i in range(1, leads + 1):
+        db.session.add(Property(id=i, address=f'{i} Congress Ave, Austin, TX 78701',
+                                normalized_address=f'{i} CONGRESS AVE, AUSTIN, TX 78701',
+                                address_key=address_key(f'{i} Congress Ave, Austin, TX 78701'),
+                                estimated_value=500000, median_home_value=480000,
+                                comparables=[ComparableSale(position=0, address='comp', sale_price=480000)]))
+        db.session.add(PropertyLead(property_id=i, agent_id=1, lead_type='valuation',
+                                    status='converted' if i % 4 == 0 else 'new'))
+    db.session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--leads', type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'leads.db')}"
+    os.environ['AUTO_CREATE_SCHEMA'] = '1'  # scratch database
+    from sqlalchemy import event
+    from src.main import app
+    from src.models.user import db
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(' '.join(statement.split())[:120])
+
+    with app.app_context():
+        seed(db, args.leads)
+        event.listen(db.engine, 'before_cursor_execute', record)
+
+    client = app.test_client()
+    results, failures = [], []
+    for path, budget in CASES:
+        del statements[:]
+        response = client.get(path)
+        count = len(statements)
+        results.append({'path': path, 'status': response.status_code, 'statements': count,
+                        'budget': budget})
+        if response.status_code != 200 or count > budget:
+            failures.append({'path': path, 'statements': list(statements)})
+
+    print(json.dumps({'results': results, 'failures': failures}, indent=2))
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Check that concurrent lead distributions never push an agent past their limit
+
+Seeds one eligible basic-tier agent (10 leads a month) who already has
+some leads this month, then launches several app processes that each fire
+many simultaneous POST /api/leads/distribute requests. Exits non-zero if the
+agent ends up with more leads this month than the tier allows, or if the
+quota counter disagrees with the leads actually written.
+
+    python benchmarks/check_lead_quota.py --processes 2 --threads 8 --existing 7
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+
+import common  # adds the deployment root to sys.path
+
+LEAD_LIMIT = 10
+
+def run_worker(threads):
+    from src.main import app
+
+    barrier = threading.Barrier(threads)
+
+    def fire(_):
+        client = app.test_client()
+        barrier.wait()
+        return client.post('/api/leads/distribute', json={
+            'property_id': 1, 'customer_info': {'name': 'Buyer', 'email': 'buyer@example.com'}
+        }).status_code
+
+    with ThreadPoolExecutor(threads) as pool:
+        statuses = list(pool.map(fire, range(threads)))
+    print(json.dumps({'statuses': statuses}))
+
+def seed(existing):
+    from src.main import app
+    from src.models.property import Agent, Property, PropertyLead, db
+    from src.services.address import address_key
+
+    with app.app_context():
+        db.session.add(Property(address='500 Congress Ave, Austin, TX 78701',
+                                normalized_address='500 CONGRESS AVE, AUSTIN, TX 78701',
+                                address_key=address_key('500 Congress Ave, Austin, TX 78701')))
+        agent = Agent(name='Quota Agent', email='quota@example.com', license_number='12345678',
+                      license_state='TX', service_areas=json.dumps(['Austin, TX']),
+                      subscription_tier='basic', subscription_active=True,
+                      license_verified=True, identity_verified=True, leads_received=0)
+        db.session.add(agent)
+        db.session.flush()
+        for _ in range(existing):
+            db.session.add(PropertyLead(property_id=1, agent_id=agent.id, lead_type='valuation'))
+        db.session.commit()
+
+def report():
+    from src.main import app
+    from src.models.property import AgentLeadQuota, PropertyLead
+    from src.services.lead_quota import current_period
+
+    with app.app_context():
+        leads = PropertyLead.query.filter_by(agent_id=1).count()
+        quota = AgentLeadQuota.query.filter_by(agent_id=1, period=current_period()).first()
+        return leads, quota.lead_count if quota else None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--existing', type=int, default=7)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return run_worker(args.threads)
+
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'app.db')}"
+    os.environ['AUTO_CREATE_SCHEMA'] = '1'  # scratch database
+    seed(args.existing)
+
+    command = [sys.executable, os.path.abspath(__file__), '--worker', '--threads', str(args.threads)]
+    workers = [subprocess.Popen(command, env=os.environ, stdout=subprocess.PIPE, text=True)
+               for _ in range(args.processes)]
+    statuses = []
+    for worker in workers:
+        out, _ = worker.communicate()
+        statuses.extend(json.loads(out.strip().splitlines()[-1])['statuses'])
+
+    leads, counter = report()
+    result = {
+        'requests': len(statuses),
+        'statuses': {str(code): statuses.count(code) for code in sorted(set(statuses))},
+        'existing_leads': args.existing,
+        'lead_limit': LEAD_LIMIT,
+        'leads_this_month': leads,
+        'quota_counter': counter
+    }
+    print(json.dumps(result, indent=2))
+    if leads > LEAD_LIMIT or counter != leads:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Check the admin sampling profiler: auth, collapsed output and overhead
+
+Seeds a scratch SQLite database (the bench_lead_endpoints data), then
+through the test client:
+
+  - without ADMIN_TOKEN the admin routes answer 404, with a wrong token 401
+  - no sampler thread exists until a profile is started
+  - POST /api/admin/profile answers 202, a second one 409 while it runs
+  - GET /api/agents/search load is profiled; the collapsed stacks must be
+    well-formed 'frame;frame;... count' lines that include search_agents
+  - throughput of the same load with and without a profile running
+
+Exits non-zero if a check fails.
+
+    python benchmarks/check_profiler.py --seconds 3 --interval-ms 5
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+
+import common  # adds the deployment root to sys.path
+from bench_lead_endpoints import seed
+
+COLLAPSED_LINE = re.compile(r'^\S.* [0-9]+$')
+
+def search_rate(client, seconds):
+    """GET /api/agents/search requests per second over `seconds`"""
+    count, deadline = 0, time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        client.get('/api/agents/search?zip_code=78701')
+        count += 1
+    return count / seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=3.0, help='profile length')
+    parser.add_argument('--interval-ms', type=float, default=10.0)
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp()
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(scratch, 'profiler.db')}",
+        'AUTO_CREATE_SCHEMA': '1',  # scratch database
+        'PROFILER_OUTPUT_DIR': os.path.join(scratch, 'profiles'),
+        'INSTRUMENTATION': '0'
+    })
+    os.environ.pop('ADMIN_TOKEN', None)
+    os.environ.pop('PROFILER_SECONDS', None)
+    from src.main import app
+    from src.models.user import db
+    from src.routes import admin
+
+    with app.app_context():
+        seed(db, 20, 50, random.Random(5))
+    client = app.test_client()
+    failures = []
+    results = {}
+
+    def expect(response, status, what):
+        if response.status_code != status:
+            failures.append(f'{what}: expected {status}, got {response.status_code}')
+
+    expect(client.post('/api/admin/profile?seconds=1'), 404, 'no ADMIN_TOKEN')
+    admin.ADMIN_TOKEN = 'check-token'
+    headers = {'Authorization': 'Bearer check-token'}
+    expect(client.post('/api/admin/profile?seconds=1'), 401, 'no token')
+    expect(client.post('/api/admin/profile?seconds=1', headers={'Authorization': 'Bearer wrong'}), 401, 'wrong token')
+    expect(client.post('/api/admin/profile?seconds=9999', headers=headers), 400, 'seconds over the limit')
+    if any(thread.name == 'sampling-profiler' for thread in threading.enumerate()):
+        failures.append('a sampler thread runs before any profile was started')
+
+    results['baseline_rps'] = round(search_rate(client, args.seconds), 1)
+
+    started = client.post(f'/api/admin/profile?seconds={args.seconds}&interval_ms={args.interval_ms}', headers=headers)
+    expect(started, 202, 'start profile')
+    profile_id = started.get_json().get('profile_id', '')
+    expect(client.post('/api/admin/profile?seconds=1', headers=headers), 409, 'second profile')
+    expect(client.get(f'/api/admin/profile/{profile_id}', headers=headers), 202, 'running profile')
+    results['profiled_rps'] = round(search_rate(client, args.seconds), 1)
+
+    deadline = time.monotonic() + args.seconds + 5
+    while client.get(f'/api/admin/profile/{profile_id}', headers=headers).status_code == 202:
+        if time.monotonic() > deadline:
+            failures.append('profile did not finish')
+            break
+        time.sleep(0.05)
+
+    collapsed = client.get(f'/api/admin/profile/{profile_id}', headers=headers)
+    expect(collapsed, 200, 'finished profile')
+    lines = collapsed.get_data(as_text=True).splitlines()
+    samples = sum(int(line.rsplit(' ', 1)[1]) for line in lines if COLLAPSED_LINE.match(line))
+    results['stacks'] = len(lines)
+    results['samples'] = samples
+    results['search_agents_samples'] = sum(int(line.rsplit(' ', 1)[1]) for line in lines
+                                           if 'search_agents (' in line)
+    results['top_stack'] = lines[0][-300:] if lines else ''
+    if not lines or any(not COLLAPSED_LINE.match(line) for line in lines):
+        failures.append('collapsed output is empty or malformed')
+    if not results['search_agents_samples']:
+        failures.append('no samples inside search_agents')
+    expect(client.get('/api/admin/profile/123-00000000', headers=headers), 404, 'unknown profile')
+    expect(client.get('/api/admin/profile/latest', headers=headers), 404, 'malformed profile id')
+    if any(thread.name == 'sampling-profiler' for thread in threading.enumerate()):
+        failures.append('the sampler thread outlived its profile')
+
+    results['overhead_pct'] = round((results['baseline_rps'] / results['profiled_rps'] - 1) * 100, 1)
+    results['failures'] = failures
+    print(json.dumps(results, indent=2))
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
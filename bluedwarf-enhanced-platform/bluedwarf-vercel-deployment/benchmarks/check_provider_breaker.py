@@ -0,0 +1,69 @@
+"""Check that a cancelled half-open probe doesn't leave a provider's breaker stuck
+
+async_fan_out cancels a provider call that runs past its timeout. Opens an
+async client's circuit breaker, lets the cooldown pass, and cancels the
+half-open probe against a stub provider that never answers in time. Exits
+non-zero unless the breaker reopens and, once the cooldown has passed
+again, lets the next call through to a successful response.
+
+    python benchmarks/check_provider_breaker.py --reset-seconds 0.2
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+import common  # adds the deployment root to sys.path
+from stub_providers import start_stub_server
+from src.services.http_client import AsyncProviderClient, CircuitBreaker
+
+async def run(server, reset_seconds):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=reset_seconds)
+    client = AsyncProviderClient('rentcast', f'{server.base_url}/v1', retries=0, breaker=breaker)
+    params = {'address': '100 Congress Ave, Austin, TX 78701'}
+    report = {}
+    try:
+        breaker.record_failure()
+        await asyncio.sleep(reset_seconds * 1.5)
+
+        # The probe: the stub sleeps far past the timeout, so wait_for cancels it
+        server.latency_ms = 600000.0
+        try:
+            await asyncio.wait_for(client.get('/avm/value', params=params), 0.1)
+            report['probe'] = 'answered'
+        except asyncio.TimeoutError:
+            report['probe'] = 'cancelled'
+        report['state_after_probe'] = breaker.state
+
+        server.latency_ms = 0.0
+        await asyncio.sleep(reset_seconds * 1.5)
+        try:
+            await client.get('/avm/value', params=params)
+            report['next_call'] = 'ok'
+        except Exception as e:
+            report['next_call'] = f'{e.__class__.__name__}: {e}'
+        report['state_after_next_call'] = breaker.state
+    finally:
+        await client.aclose()
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reset-seconds', type=float, default=0.2)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(start_stub_server(), args.reset_seconds))
+    failures = []
+    if report['probe'] != 'cancelled':
+        failures.append('the probe was not cancelled')
+    if report['state_after_probe'] != CircuitBreaker.OPEN:
+        failures.append(f"breaker {report['state_after_probe']} after a cancelled probe, expected open")
+    if report['next_call'] != 'ok' or report['state_after_next_call'] != CircuitBreaker.CLOSED:
+        failures.append('the call after the cooldown was not let through')
+    report['failures'] = failures
+    print(json.dumps(report, indent=2))
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""Check that the hot queries are served by indexes, not table scans
+
+Seeds a SQLite database with agents, properties and leads, runs ANALYZE,
+then drives the hot endpoints and lookups while recording every statement
+they send. Each recorded SELECT/UPDATE/DELETE is run through
+EXPLAIN QUERY PLAN; the check exits non-zero if any plan has a bare
+"SCAN <table>" step (a full scan without an index). Scanning a subquery the
+plan materialized itself, e.g. the agents matching a search word, is fine.
+
+    python benchmarks/check_query_plans.py --agents 2000 --leads 20000
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+
+import common  # adds the deployment root to sys.path
+
+FULL_SCAN_RE = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+MATERIALIZE_RE = re.compile(r'^MATERIALIZE (\w+)$')
+
+def seed(db, agents, properties, leads, rng):
+    from src.models.property import (Agent, Property, PropertyLead, AgentSearchTerm, AgentServiceArea,
+                                      AgentSpecialty, AgentCoverageCell)
+    from src.services.address import address_key
+    from src.services.agent_locator import coverage_rows, service_area_rows
+    from src.services.agent_search import search_term_rows, specialty_rows
+
+    agent_rows = []
+    for i in range(1, agents + 1):
+        agent_rows.append({
+            'id': i, 'name': f'Agent {i}', 'email': f'agent{i}@example.com',
+            'license_number': f'{i:08d}', 'license_state': 'TX', 'brokerage': f'Brokerage {i % 40}',
+            'specialties': json.dumps(rng.sample(['Luxury', 'Investment', 'Relocation', 'Condos'], 2)),
+            'service_areas': json.dumps(['Austin, TX', f'787{i % 100:02d}']),
+            'latitude': 30.2672 + rng.uniform(-0.5, 0.5), 'longitude': -97.7431 + rng.uniform(-0.5, 0.5),
+            'service_radius_miles': 25.0, 'rating': round(rng.uniform(3.0, 5.0), 2),
+            'subscription_tier': rng.choice(['basic', 'premium', 'enterprise']), 'leads_received': 0,
+            'subscription_active': rng.random() < 0.7, 'license_verified': rng.random() < 0.9,
+            'identity_verified': rng.random() < 0.9, 'stripe_customer_id': f'cus_{i:06d}'
+        })
+    property_rows = [{
+        'id': i, 'address': f'{i} Congress Ave, Austin, TX 78701',
+        'normalized_address': f'{i} CONGRESS AVE, AUSTIN, TX 78701',
+        'address_key': address_key(f'{i} Congress Ave, Austin, TX 78701'),
+        'latitude': 30.2672, 'longitude': -97.7431
+    } for i in range(1, properties + 1)]
+    lead_rows = [{
+        'property_id': rng.randint(1, properties), 'agent_id': rng.randint(1, agents),
+        'lead_type': 'valuation', 'status': rng.choice(['new', 'assigned', 'contacted', 'converted', 'closed']),
+        'priority': 'medium'
+    } for _ in range(leads)]
+
+    connection = db.session.connection()
+    connection.execute(Agent.__table__.insert(), agent_rows)
+    connection.execute(Property.__table__.insert(), property_rows)
+    connection.execute(PropertyLead.__table__.insert(), lead_rows)
+    areas, cells, terms, specialties = [], [], [], []
+    for row in agent_rows:
+        agent = Agent(**row)
+        areas.extend(service_area_rows(agent))
+        cells.extend(coverage_rows(agent))
+        terms.extend(search_term_rows(agent))
+        specialties.extend(specialty_rows(agent))
+    connection.execute(AgentServiceArea.__table__.insert(), areas)
+    connection.execute(AgentCoverageCell.__table__.insert(), cells)
+    connection.execute(AgentSearchTerm.__table__.insert(), terms)
+    connection.execute(AgentSpecialty.__table__.insert(), specialties)
+    db.session.commit()
+    db.session.execute(db.text('ANALYZE'))
+    db.session.commit()
+
+def hot_operations(client):
+    """(name, callable) pairs for the lookups that run on every request"""
+    from src.models.property import Agent
+
+    return [
+        ('valuation by address key', lambda: client.post(
+            '/api/valuation', json={'address': '7 Congress Ave, Austin, TX 78701'})),
+        ('agent leads newest first', lambda: client.get('/api/agents/5/leads')),
+        ('agent leads by status', lambda: client.get('/api/agents/5/leads?status=new')),
+        ('agent leads after a cursor', lambda: client.get('/api/agents/5/leads?limit=5&cursor=' + client.get(
+            '/api/agents/5/leads?limit=5').get_json()['next_cursor'])),
+        ('agent lead export', lambda: client.get('/api/agents/5/leads/export?format=csv').get_data()),
+        ('agent lead performance', lambda: client.get('/api/leads/performance?agent_id=5')),
+        ('platform lead performance', lambda: client.get('/api/leads/performance')),
+        ('lead distribution', lambda: client.post(
+            '/api/leads/distribute', json={'property_id': 3, 'customer_info': {'name': 'Buyer'}})),
+        ('agents near a point', lambda: client.post(
+            '/api/agents/search', json={'latitude': 30.27, 'longitude': -97.74})),
+        ('top rated agents', lambda: client.post('/api/agents/search', json={})),
+        ('agent search by state', lambda: client.get('/api/agents/search?state=TX&min_rating=4')),
+        ('agent text search', lambda: client.get('/api/agents/search?q=brokerage+1&page=2')),
+        ('agent search by specialty and city', lambda: client.get(
+            '/api/agents/search?specialty=luxury&city=austin&tier=premium')),
+        ('agent by email', lambda: client.post('/api/agents/register', json={
+            'name': 'New', 'email': 'agent9@example.com', 'license_number': '12345678',
+            'license_state': 'TX'})),
+        ('agent by stripe customer', lambda: Agent.query.filter_by(stripe_customer_id='cus_000042').first())
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--agents', type=int, default=2000)
+    parser.add_argument('--properties', type=int, default=2000)
+    parser.add_argument('--leads', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'plans.db')}"
+    os.environ['AUTO_CREATE_SCHEMA'] = '1'  # scratch database
+    from sqlalchemy import event
+    from src.main import app
+    from src.models.user import db
+
+    recorded = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip().split(None, 1)[0].upper()
+        if not executemany and verb in ('SELECT', 'UPDATE', 'DELETE'):
+            recorded.append((statement, parameters))
+
+    failures = {}
+    report = {}
+    with app.app_context():
+        seed(db, args.agents, args.properties, args.leads, random.Random(args.seed))
+        client = app.test_client()
+        event.listen(db.engine, 'before_cursor_execute', record)
+        for name, operation in hot_operations(client):
+            del recorded[:]
+            with app.test_request_context():
+                operation()
+            plans = []
+            for statement, parameters in list(recorded):
+                rows = db.session.connection().exec_driver_sql(
+                    f'EXPLAIN QUERY PLAN {statement}', parameters
+                ).fetchall()
+                steps = [row[-1] for row in rows]
+                plans.append({'sql': ' '.join(statement.split())[:160], 'plan': steps})
+                materialized = {match.group(1) for match in map(MATERIALIZE_RE.match, steps) if match}
+                scans = [step for step in steps
+                         if FULL_SCAN_RE.match(step) and FULL_SCAN_RE.match(step).group(1) not in materialized]
+                if scans:
+                    failures.setdefault(name, []).extend(scans)
+            report[name] = plans
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    print(json.dumps({'operations': report, 'full_scans': failures}, indent=2))
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
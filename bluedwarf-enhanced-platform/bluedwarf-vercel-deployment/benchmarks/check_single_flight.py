@@ -0,0 +1,141 @@
+"""Check that concurrent valuations of one address call each provider once
+
+Starts the stub provider server and a shared cache (the Redis stand-in or a
+SQLite file), then launches several app processes that each fire many
+concurrent POST /api/valuation requests for the same uncached addresses,
+with --batch-threads of the threads sending them all as one POST
+/api/valuation/batch instead. --async-clients more per process send theirs
+through api/asgi.py's async view on an event loop (needs httpx and
+aiosqlite). Exits non-zero if any provider endpoint was called more than
+once for an address.
+
+    python benchmarks/check_single_flight.py --backend redis --processes 4 --threads 16
+    python benchmarks/check_single_flight.py --async-clients 8
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+
+import common  # adds the deployment root to sys.path
+from stub_providers import start_stub_server
+from stub_redis import start_stub_redis
+
+async def asgi_post(asgi_app, path, payload):
+    """Status of a POST served by an ASGI app, called in process"""
+    body = json.dumps(payload).encode()
+    messages = [{'type': 'http.request', 'body': body}]
+    sent = []
+
+    async def receive():
+        return messages.pop() if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi_app({'type': 'http', 'method': 'POST', 'path': path, 'query_string': b'', 'http_version': '1.1',
+                    'headers': [(b'content-type', b'application/json'),
+                                (b'content-length', str(len(body)).encode())]}, receive, send)
+    return sent[0]['status']
+
+def run_worker(addresses, threads, batch_threads, async_clients):
+    from src.main import app
+
+    parties = threads + (1 if async_clients else 0)
+    barrier = threading.Barrier(parties)
+
+    def fire(index):
+        if index == threads:
+            return asyncio.run(fire_async())
+        client = app.test_client()
+        barrier.wait()
+        if index < batch_threads:
+            lines = client.post('/api/valuation/batch', json=addresses).get_data(as_text=True).splitlines()
+            return [line['status'] for line in map(json.loads, lines) if 'status' in line]
+        return [client.post('/api/valuation', json={'address': a}).status_code for a in addresses]
+
+    async def fire_async():
+        from api.asgi import app as asgi_app
+        if ('POST', '/api/valuation') not in asgi_app.async_routes:
+            raise SystemExit('the async valuation view is unavailable (httpx, aiosqlite)')
+
+        async def client():
+            return [await asgi_post(asgi_app, '/api/valuation', {'address': a}) for a in addresses]
+
+        await asyncio.get_running_loop().run_in_executor(None, barrier.wait)
+        return [code for codes in await asyncio.gather(*(client() for _ in range(async_clients)))
+                for code in codes]
+
+    with ThreadPoolExecutor(parties) as pool:
+        statuses = [code for codes in pool.map(fire, range(parties)) for code in codes]
+    print(json.dumps({'statuses': statuses}))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backend', choices=['redis', 'sqlite'], default='redis')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--batch-threads', type=int, default=1, help='threads per process sending one batch request')
+    parser.add_argument('--async-clients', type=int, default=0,
+                        help='clients per process on the async view, through api/asgi.py')
+    parser.add_argument('--addresses', type=int, default=5)
+    parser.add_argument('--latency-ms', type=float, default=100.0)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    addresses = [f'{500 + i} Congress Ave, Austin, TX 78701' for i in range(args.addresses)]
+    if args.worker:
+        return run_worker(addresses, args.threads, args.batch_threads, args.async_clients)
+
+    workdir = tempfile.mkdtemp()
+    providers = start_stub_server(latency_ms=args.latency_ms)
+    if args.backend == 'redis':
+        redis = start_stub_redis()
+        cache_url = redis.url
+    else:
+        cache_url = f"sqlite:///{os.path.join(workdir, 'shared-cache.db')}"
+
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'app.db')}",
+        VALUATION_SHARED_CACHE_URL=cache_url,
+        RENTCAST_API_KEY='stub', RENTCAST_BASE_URL=f'{providers.base_url}/v1',
+        ATTOM_API_KEY='stub', ATTOM_BASE_URL=f'{providers.base_url}/propertyapi/v1.0.0',
+        GEOCODER_API_KEY='stub', GEOCODER_BASE_URL=f'{providers.base_url}/maps/api/geocode',
+        HTTP_RETRIES='0'
+    )
+    # Create the schema once before the workers race to use it
+    subprocess.run([sys.executable, os.path.join(common.ROOT, 'src', 'manage.py'), 'init-db'],
+                   env=env, check=True, stdout=subprocess.DEVNULL)
+
+    command = [sys.executable, os.path.abspath(__file__), '--worker',
+               '--threads', str(args.threads), '--batch-threads', str(args.batch_threads),
+               '--async-clients', str(args.async_clients), '--addresses', str(args.addresses)]
+    workers = [subprocess.Popen(command, env=env, stdout=subprocess.PIPE, text=True)
+               for _ in range(args.processes)]
+    statuses = []
+    for worker in workers:
+        out, _ = worker.communicate()
+        statuses.extend(json.loads(out.strip().splitlines()[-1])['statuses'])
+
+    duplicates = {f'{path} {address}': count
+                  for (path, address), count in providers.calls.items() if count > 1}
+    report = {
+        'backend': args.backend,
+        'requests': len(statuses),
+        'non_200': sum(1 for code in statuses if code != 200),
+        'unique_addresses': len(addresses),
+        'provider_calls': sum(providers.calls.values()),
+        'duplicate_provider_calls': duplicates
+    }
+    print(json.dumps(report, indent=2))
+    if duplicates or report['non_200']:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+import os
+import sys
+
+# Make the deployment root importable so benchmarks can use `src.*`
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+def percentile(samples, pct):
+    """Return the pct-th percentile of a list of samples (nearest rank)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+def summarize(samples):
+    """Return p50/p99/mean for a list of latency samples in milliseconds"""
+    return {
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+        'mean_ms': round(sum(samples) / len(samples), 3) if samples else 0.0,
+        'samples': len(samples)
+    }
@@ -0,0 +1,170 @@
+"""Seeded data for the benchmark suite: N properties, M agents, K leads
+
+The same --seed always produces the same rows, so runs on different commits
+load identical data. Properties, agents and their service areas are spread
+over a fixed list of markets; every agent is eligible for lead distribution
+and has coverage cells, service area keys and search terms indexed the way the app
+indexes agents it registers. Run standalone to fill a database:
+
+    DATABASE_URL=sqlite:////tmp/bench.db python benchmarks/datagen.py --properties 5000 --agents 500 --leads 20000
+"""
+import argparse
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+import common  # adds the deployment root to sys.path
+
+# city, state, ZIP prefix, latitude, longitude
+MARKETS = [
+    ('Austin', 'TX', '787', 30.2672, -97.7431), ('Dallas', 'TX', '752', 32.7767, -96.7970),
+    ('Houston', 'TX', '770', 29.7604, -95.3698), ('Denver', 'CO', '802', 39.7392, -104.9903),
+    ('Phoenix', 'AZ', '850', 33.4484, -112.0740), ('Portland', 'OR', '972', 45.5152, -122.6784),
+    ('Seattle', 'WA', '981', 47.6062, -122.3321), ('Atlanta', 'GA', '303', 33.7490, -84.3880),
+    ('Miami', 'FL', '331', 25.7617, -80.1918), ('Chicago', 'IL', '606', 41.8781, -87.6298),
+    ('Nashville', 'TN', '372', 36.1627, -86.7816), ('Raleigh', 'NC', '276', 35.7796, -78.6382)
+]
+STREETS = ['Congress Ave', 'Oak St', 'Maple Dr', 'Lamar Blvd', 'Elm St', 'Cedar Ln', 'Park Ave', 'Main St']
+SPECIALTIES = ['Luxury', 'First-time buyers', 'Investment', 'Relocation', 'Condos', 'New construction']
+TIERS = ['basic', 'premium', 'enterprise']
+LEAD_STATUSES = ['new', 'new', 'contacted', 'qualified', 'converted', 'lost']
+
+# Fixed so created_at values do not depend on the day the suite runs
+EPOCH = datetime(2026, 1, 1)
+
+def market_address(rng, number):
+    """(street address, market) in a random market"""
+    market = rng.choice(MARKETS)
+    city, state, zip_prefix = market[:3]
+    zip_code = f'{zip_prefix}{rng.randint(1, 40):02d}'
+    return f'{number} {rng.choice(STREETS)}, {city}, {state} {zip_code}', market
+
+def generate(db, properties, agents, leads, seed=42, users=None):
+    """Insert the rows and return their counts; the tables are expected to be empty"""
+    from src.models.property import (Agent, AgentCoverageCell, AgentSearchTerm, AgentServiceArea,
+                                      AgentSpecialty, ComparableSale, Property, PropertyLead)
+    from src.models.user import User
+    from src.services.address import canonicalize_address
+    from src.services.agent_locator import coverage_rows, service_area_rows
+    from src.services.agent_search import search_term_rows, specialty_rows
+
+    rng = random.Random(seed)
+    connection = db.session.connection()
+
+    agent_rows = []
+    for i in range(1, agents + 1):
+        city, state, zip_prefix, latitude, longitude = rng.choice(MARKETS)
+        areas = [f'{city}, {state}'] + [f'{zip_prefix}{rng.randint(1, 40):02d}' for _ in range(rng.randint(0, 3))]
+        agent_rows.append({
+            'id': i, 'name': f'Agent {i}', 'email': f'agent{i}@example.com', 'phone': f'512555{i % 10000:04d}',
+            'license_number': f'{i:08d}', 'license_state': state, 'brokerage': f'Brokerage {i % 40}',
+            'years_experience': rng.randint(1, 30),
+            'specialties': json.dumps(rng.sample(SPECIALTIES, rng.randint(1, 3))),
+            'service_areas': json.dumps(areas),
+            'latitude': latitude + rng.uniform(-0.2, 0.2), 'longitude': longitude + rng.uniform(-0.2, 0.2),
+            'service_radius_miles': rng.uniform(10.0, 40.0),
+            'subscription_tier': rng.choice(TIERS), 'subscription_active': True,
+            'subscription_start': EPOCH, 'subscription_end': EPOCH + timedelta(days=3650),
+            'license_verified': True, 'identity_verified': True,
+            'stripe_customer_id': f'cus_seed{i:08d}',
+            'leads_received': 0, 'leads_converted': 0,
+            'rating': round(rng.uniform(3.0, 5.0), 2), 'reviews_count': rng.randint(0, 200),
+            'created_at': EPOCH, 'updated_at': EPOCH
+        })
+    if agent_rows:
+        connection.execute(Agent.__table__.insert(), agent_rows)
+        cells, area_rows, term_rows, specialties = [], [], [], []
+        for row in agent_rows:
+            agent = Agent(**row)
+            cells.extend(coverage_rows(agent))
+            area_rows.extend(service_area_rows(agent))
+            term_rows.extend(search_term_rows(agent))
+            specialties.extend(specialty_rows(agent))
+        connection.execute(AgentCoverageCell.__table__.insert(), cells)
+        connection.execute(AgentServiceArea.__table__.insert(), area_rows)
+        connection.execute(AgentSearchTerm.__table__.insert(), term_rows)
+        connection.execute(AgentSpecialty.__table__.insert(), specialties)
+
+    property_rows, comparable_rows = [], []
+    for i in range(1, properties + 1):
+        address, market = market_address(rng, 100 + i)
+        value = rng.randint(200000, 1200000)
+        square_feet = rng.randint(800, 4500)
+        location = canonicalize_address(address)
+        property_rows.append({
+            'id': i, 'address': address, 'normalized_address': location.canonical, 'address_key': location.key,
+            'latitude': market[3] + rng.uniform(-0.1, 0.1), 'longitude': market[4] + rng.uniform(-0.1, 0.1),
+            'property_type': 'Single Family', 'bedrooms': rng.randint(1, 6),
+            'bathrooms': rng.choice([1, 1.5, 2, 2.5, 3, 3.5]), 'square_feet': square_feet,
+            'lot_size': rng.randint(3000, 20000), 'year_built': rng.randint(1920, 2024),
+            'estimated_value': value, 'confidence_score': round(rng.uniform(0.6, 0.98), 2),
+            'estimated_rent': round(value * rng.uniform(0.004, 0.007)),
+            'price_per_sqft': round(value / square_feet, 2),
+            'rentcast_value': round(value * rng.uniform(0.9, 1.1)),
+            'market_value': round(value * rng.uniform(0.9, 1.1)),
+            'assessed_value': round(value * rng.uniform(0.7, 0.9)),
+            'median_home_value': 500000, 'price_appreciation': round(rng.uniform(-2.0, 9.0), 1),
+            'days_on_market': rng.randint(5, 120),
+            'created_at': EPOCH, 'updated_at': EPOCH
+        })
+        for position in range(rng.randint(3, 5)):
+            comparable_rows.append({
+                'property_id': i, 'position': position, 'address': market_address(rng, rng.randint(100, 9999))[0],
+                'sale_price': round(value * rng.uniform(0.85, 1.15)), 'square_feet': rng.randint(800, 4500),
+                'sale_date': (EPOCH - timedelta(days=rng.randint(10, 400))).date()
+            })
+    if property_rows:
+        connection.execute(Property.__table__.insert(), property_rows)
+        connection.execute(ComparableSale.__table__.insert(), comparable_rows)
+
+    lead_rows = []
+    if properties and agents:
+        received = [0] * (agents + 1)
+        converted = [0] * (agents + 1)
+        for i in range(1, leads + 1):
+            agent_id = rng.randint(1, agents)
+            status = rng.choice(LEAD_STATUSES)
+            received[agent_id] += 1
+            converted[agent_id] += status == 'converted'
+            lead_rows.append({
+                'id': i, 'property_id': rng.randint(1, properties), 'agent_id': agent_id,
+                'customer_name': f'Buyer {i}', 'customer_email': f'buyer{i}@example.com',
+                'customer_phone': f'737555{i % 10000:04d}', 'lead_type': rng.choice(['valuation', 'buying', 'selling']),
+                'status': status, 'priority': rng.choice(['low', 'medium', 'high']),
+                'created_at': EPOCH + timedelta(minutes=i), 'updated_at': EPOCH + timedelta(minutes=i)
+            })
+        if lead_rows:
+            connection.execute(PropertyLead.__table__.insert(), lead_rows)
+            table = Agent.__table__
+            for agent_id in range(1, agents + 1):
+                if received[agent_id]:
+                    connection.execute(table.update().where(table.c.id == agent_id).values(
+                        leads_received=received[agent_id], leads_converted=converted[agent_id], updated_at=EPOCH))
+
+    users = agents if users is None else users
+    if users:
+        connection.execute(User.__table__.insert(), [
+            {'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com'} for i in range(1, users + 1)
+        ])
+    db.session.commit()
+    return {'properties': properties, 'comparables': len(comparable_rows), 'agents': agents,
+            'leads': len(lead_rows), 'users': users}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--properties', type=int, default=2000)
+    parser.add_argument('--agents', type=int, default=200)
+    parser.add_argument('--leads', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ.setdefault('AUTO_CREATE_SCHEMA', '1')
+    from src.main import app
+    from src.models.user import db
+
+    with app.app_context():
+        print(json.dumps(generate(db, args.properties, args.agents, args.leads, args.seed)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,370 @@
+"""Benchmark suite: seeded data, microbenchmarks and HTTP load on every blueprint
+
+Fills a scratch SQLite database with datagen.generate (--properties,
+--agents, --leads, --seed), starts the stub provider and stub Stripe
+servers, then measures:
+
+  micro   address canonicalization, valuation math (scalar and vectorized)
+          and to_dict for Property, Agent and PropertyLead, cold and cached,
+          in microseconds per operation (best of --repeat rounds)
+  http    --requests requests per scenario against user_bp, property_bp,
+          agent_bp, subscription_bp and batch_bp through the WSGI stack,
+          from --threads client threads: latency percentiles, requests per
+          second and responses with an unexpected status
+
+Results are one JSON document (stdout, and --output if given) stamped
+with the commit, so runs can be compared between commits:
+
+    python benchmarks/run_suite.py --output /tmp/before.json
+    git checkout my-branch
+    python benchmarks/run_suite.py --compare /tmp/before.json --threshold-pct 25
+
+--compare adds each metric's change against the baseline and exits
+non-zero if any got slower by more than --threshold-pct, as it does when a
+scenario returns unexpected statuses. --only runs the named micro or http
+benchmarks.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import common  # adds the deployment root to sys.path
+from bench_serialization import clear_caches
+from bench_worker_models import free_port
+from datagen import generate
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SUITE_VERSION = 1
+
+def git_revision():
+    """(commit, uncommitted changes?) of the tree being measured, or (None, None) outside git"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=common.ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no', '.'], cwd=common.ROOT,
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status.strip())
+
+def start_stubs(latency_ms):
+    """Stub provider and Stripe servers in their own processes, so they do not compete for the GIL"""
+    provider_port, stripe_port = free_port(), free_port()
+    processes = [
+        subprocess.Popen([sys.executable, os.path.join(HERE, 'stub_providers.py'), '--port', str(provider_port),
+                          '--latency-ms', str(latency_ms)], stdout=subprocess.DEVNULL),
+        subprocess.Popen([sys.executable, os.path.join(HERE, 'stub_stripe.py'), '--port', str(stripe_port),
+                          '--latency-ms', str(latency_ms)], stdout=subprocess.DEVNULL)
+    ]
+    stub_url = f'http://127.0.0.1:{provider_port}'
+    os.environ.update({
+        'RENTCAST_API_KEY': 'stub', 'RENTCAST_BASE_URL': f'{stub_url}/v1',
+        'ATTOM_API_KEY': 'stub', 'ATTOM_BASE_URL': f'{stub_url}/propertyapi/v1.0.0',
+        'GEOCODER_API_KEY': 'stub', 'GEOCODER_BASE_URL': f'{stub_url}/maps/api/geocode',
+        'LICENSE_BOARD_API_KEY': 'stub', 'LICENSE_BOARD_BASE_URL': stub_url,
+        'STRIPE_SECRET_KEY': 'sk_test_stub', 'STRIPE_API_BASE': f'http://127.0.0.1:{stripe_port}',
+        'HTTP_RETRIES': '0'
+    })
+    time.sleep(0.5)
+    return processes
+
+def best_us_per_op(run, ops, repeat, before=None):
+    """Fastest of `repeat` rounds of run(), in microseconds per operation"""
+    best = float('inf')
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return {'us_per_op': round(best * 1e6 / ops, 3), 'ops': ops}
+
+def messy(address, rng):
+    """The address as a user might type it"""
+    spelled = address.replace(' St,', ' Street,').replace(' Ave,', ' Avenue,').replace(' Dr,', ' Drive,')
+    return rng.choice([spelled.lower(), spelled.upper().replace(',', ''), address + ', USA', f'  {spelled}.  '])
+
+def micro_benchmarks(db, repeat, selected):
+    from sqlalchemy import select
+    from sqlalchemy.orm import selectinload
+    from src.models.property import Agent, Property, PropertyLead
+    from src.services.address import canonicalize_address
+    from src.services.valuation import calculate_ai_valuation, calculate_ai_valuations
+
+    rng = random.Random(1)
+    properties = db.session.scalars(select(Property).options(selectinload(Property.comparables))
+                                    .order_by(Property.id).limit(1000)).all()
+    agents = db.session.scalars(select(Agent).order_by(Agent.id).limit(1000)).all()
+    leads = db.session.scalars(select(PropertyLead).options(
+        selectinload(PropertyLead.property).selectinload(Property.comparables),
+        selectinload(PropertyLead.agent)
+    ).order_by(PropertyLead.id).limit(1000)).all()
+    addresses = [messy(record.address, rng) for record in properties]
+    rows = [(
+        {'property': {'valueEstimate': record.rentcast_value}},
+        {'property': {'marketValue': record.market_value, 'assessedValue': record.assessed_value}},
+        {'year_built': record.year_built, 'square_feet': record.square_feet}
+    ) for record in properties]
+    columns = [[record.rentcast_value for record in properties], [record.market_value for record in properties],
+               [record.assessed_value for record in properties], [record.year_built for record in properties]]
+
+    def serialize(records):
+        return lambda: [record.to_dict() for record in records]
+
+    def cold():
+        clear_caches(db.session)
+
+    benchmarks = {
+        'canonicalize_address': (lambda: [canonicalize_address(address) for address in addresses], len(addresses), None),
+        'valuation_scalar': (lambda: [calculate_ai_valuation(*row, current_year=2026) for row in rows], len(rows), None),
+        'valuation_vectorized': (lambda: calculate_ai_valuations(*columns, current_year=2026), len(rows), None),
+        'to_dict_property_cold': (serialize(properties), len(properties), cold),
+        'to_dict_property_cached': (serialize(properties), len(properties), None),
+        'to_dict_agent_cold': (serialize(agents), len(agents), cold),
+        'to_dict_agent_cached': (serialize(agents), len(agents), None),
+        'to_dict_lead_cold': (serialize(leads), len(leads), cold),
+        'to_dict_lead_cached': (serialize(leads), len(leads), None)
+    }
+    results = {}
+    for name, (run, ops, before) in benchmarks.items():
+        if selected and name not in selected:
+            continue
+        if not ops:
+            continue
+        try:
+            results[name] = best_us_per_op(run, ops, repeat, before)
+        except ImportError as e:  # numpy is optional for the vectorized engine
+            results[name] = {'skipped': str(e)}
+    return results
+
+def http_scenarios(db, seed):
+    """(name, blueprint, expected status, call(client, n), prepare or None) for every scenario"""
+    from sqlalchemy import select
+    from src.models.property import Agent, PropertyLead
+    from src.models.user import User
+    from src.routes.subscription import get_stripe
+
+    rng = random.Random(seed)
+    agent_ids = db.session.scalars(select(Agent.id).order_by(Agent.id)).all()
+    basic_agent_ids = db.session.scalars(select(Agent.id).where(Agent.subscription_tier == 'basic')).all() or agent_ids
+    user_ids = db.session.scalars(select(User.id).order_by(User.id)).all()
+    lead_pairs = db.session.execute(select(PropertyLead.id, PropertyLead.agent_id).order_by(PropertyLead.id)).all()
+    customers = dict(db.session.execute(select(Agent.id, Agent.stripe_customer_id)).all())
+    property_ids = db.session.scalars(select(PropertyLead.property_id).distinct()).all() or [1]
+    unique = itertools.count(1)
+    intents = []
+
+    def pick(values):
+        return values[rng.randrange(len(values))]
+
+    def create_intents(count):
+        # Paid intents for confirm-payment, made straight against the stub
+        stripe = get_stripe()
+        del intents[:]
+        for _ in range(count):
+            agent_id = pick(agent_ids)
+            intents.append((agent_id, stripe.PaymentIntent.create(
+                amount=19900, currency='usd', customer=customers[agent_id],
+                metadata={'agent_id': agent_id, 'subscription_tier': 'premium', 'type': 'subscription'}
+            ).id))
+
+    def confirm_payment(client, n):
+        agent_id, intent_id = intents[n % len(intents)]
+        return client.post('/api/subscription/confirm-payment', json={'agent_id': agent_id, 'payment_intent_id': intent_id})
+
+    def update_lead_status(client, n):
+        lead_id, agent_id = pick(lead_pairs)
+        return client.post(f'/api/agents/{agent_id}/update-lead-status',
+                           json={'lead_id': lead_id, 'status': pick(['contacted', 'qualified'])})
+
+    def batch(client, n):
+        response = client.post('/api/valuation/batch', json={'addresses': [
+            f'{next(unique)} Batch Loop, Austin, TX 78701' for _ in range(10)
+        ]})
+        response.get_data()  # the body streams; time all of it
+        return response
+
+    return [
+        ('users_list', 'user_bp', 200, lambda client, n: client.get('/api/users'), None),
+        ('user_get', 'user_bp', 200, lambda client, n: client.get(f'/api/users/{pick(user_ids)}'), None),
+        ('user_create', 'user_bp', 201, lambda client, n: client.post('/api/users', json={
+            'username': f'bench{next(unique)}', 'email': f'bench{next(unique)}@example.com'}), None),
+        ('user_update', 'user_bp', 200, lambda client, n: client.put(f'/api/users/{pick(user_ids)}', json={
+            'email': f'renamed{next(unique)}@example.com'}), None),
+
+        ('valuation_new_address', 'property_bp', 200, lambda client, n: client.post('/api/valuation', json={
+            'address': f'{next(unique)} Benchmark Rd, Austin, TX 78701'}), None),
+        ('valuation_repeat_address', 'property_bp', 200, lambda client, n: client.post('/api/valuation', json={
+            'address': '1 Benchmark Rd, Austin, TX 78701'}), None),
+        ('property_details', 'property_bp', 200, lambda client, n: client.get(f'/api/properties/{pick(property_ids)}'), None),
+        ('market_trends', 'property_bp', 200, lambda client, n: client.get(f'/api/market-trends/{pick(property_ids)}'), None),
+        ('comparable_sales', 'property_bp', 200, lambda client, n: client.get(
+            '/api/comparable-sales?min_price=400000&max_price=600000&limit=50'), None),
+        ('agents_near_point', 'property_bp', 200, lambda client, n: client.post('/api/agents/search', json={
+            'latitude': 30.2672 + rng.uniform(-0.1, 0.1), 'longitude': -97.7431 + rng.uniform(-0.1, 0.1)}), None),
+        ('lead_create', 'property_bp', 201, lambda client, n: client.post('/api/leads', json={
+            'property_id': pick(property_ids), 'customer_name': 'Bench Buyer',
+            'customer_email': 'buyer@example.com'}), None),
+
+        ('agent_register', 'agent_bp', 201, lambda client, n: client.post('/api/agents/register', json={
+            'name': 'Bench Agent', 'email': f'bench-agent{next(unique)}@example.com', 'license_number': '12345678',
+            'license_state': 'TX', 'service_areas': ['Austin, TX', '78701'],
+            'latitude': 30.2672, 'longitude': -97.7431}), None),
+        ('agent_search', 'agent_bp', 200, lambda client, n: client.get('/api/agents/search?state=TX&min_rating=3.5'), None),
+        ('agent_text_search', 'agent_bp', 200, lambda client, n: client.get(
+            '/api/agents/search?q=luxury+dal&tier=premium'), None),
+        ('agent_leads', 'agent_bp', 200, lambda client, n: client.get(f'/api/agents/{pick(agent_ids)}/leads?limit=50'), None),
+        ('agent_leads_compact', 'agent_bp', 200, lambda client, n: client.get(
+            f'/api/agents/{pick(agent_ids)}/leads?limit=50&view=compact'), None),
+        ('agent_profile', 'agent_bp', 200, lambda client, n: client.get(f'/api/agents/{pick(agent_ids)}/profile'), None),
+        ('update_lead_status', 'agent_bp', 200, update_lead_status, None),
+
+        ('subscription_tiers', 'subscription_bp', 200, lambda client, n: client.get('/api/subscription/tiers'), None),
+        ('create_payment_intent', 'subscription_bp', 200, lambda client, n: client.post(
+            '/api/subscription/create-payment-intent', json={'agent_id': pick(agent_ids), 'tier': 'premium'}), None),
+        ('confirm_payment', 'subscription_bp', 200, confirm_payment, create_intents),
+        ('upgrade_subscription', 'subscription_bp', 200, lambda client, n: client.post(
+            '/api/subscription/upgrade', json={'agent_id': pick(basic_agent_ids), 'new_tier': 'enterprise'}), None),
+        ('billing_history', 'subscription_bp', 200, lambda client, n: client.get(
+            f'/api/subscription/billing-history?agent_id={pick(agent_ids)}'), None),
+        ('distribute_lead', 'subscription_bp', 200, lambda client, n: client.post('/api/leads/distribute', json={
+            'property_id': pick(property_ids), 'customer_info': {'name': 'Bench Buyer', 'email': 'buyer@example.com'}
+        }), None),
+        ('lead_performance_agent', 'subscription_bp', 200, lambda client, n: client.get(
+            f'/api/leads/performance?agent_id={pick(agent_ids)}'), None),
+        ('lead_performance_platform', 'subscription_bp', 200, lambda client, n: client.get('/api/leads/performance'), None),
+        ('stripe_webhook', 'subscription_bp', 200, lambda client, n: client.post('/api/subscription/webhook', json={
+            'type': 'invoice.payment_succeeded', 'data': {'object': {'customer': customers[pick(agent_ids)]}}}), None),
+
+        ('valuation_batch_10', 'batch_bp', 200, batch, None)
+    ]
+
+def run_scenario(app, call, expected, requests, threads, warmup):
+    """Latency summary, throughput and unexpected statuses for `requests` calls"""
+    def worker(indexes):
+        client = app.test_client()
+        samples, errors = [], {}
+        for n in indexes:
+            start = time.perf_counter()
+            status = call(client, n).status_code
+            samples.append((time.perf_counter() - start) * 1000)
+            if status != expected:
+                errors[status] = errors.get(status, 0) + 1
+        return samples, errors
+
+    worker(range(-warmup, 0))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        outcomes = list(pool.map(worker, [range(offset, requests, threads) for offset in range(threads)]))
+    elapsed = time.perf_counter() - start
+
+    samples, errors = [], {}
+    for thread_samples, thread_errors in outcomes:
+        samples.extend(thread_samples)
+        for status, count in thread_errors.items():
+            errors[str(status)] = errors.get(str(status), 0) + count
+    return dict(common.summarize(samples), rps=round(requests / elapsed, 1), unexpected_statuses=errors)
+
+def compare(results, baseline, threshold_pct):
+    """Per-metric change against a baseline run, and the metrics over the threshold"""
+    comparison, regressions = {}, []
+    for section, metric in (('micro', 'us_per_op'), ('http', 'p50_ms')):
+        for name, current in results.get(section, {}).items():
+            before = baseline.get(section, {}).get(name, {}).get(metric)
+            if before is None or metric not in current or not before:
+                continue
+            change = round((current[metric] / before - 1) * 100, 1)
+            comparison[f'{section}.{name}'] = {'metric': metric, 'baseline': before,
+                                               'current': current[metric], 'change_pct': change}
+            if change > threshold_pct:
+                regressions.append(f'{section}.{name} {metric} {before} -> {current[metric]} (+{change}%)')
+    return comparison, regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--properties', type=int, default=2000)
+    parser.add_argument('--agents', type=int, default=200)
+    parser.add_argument('--leads', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--requests', type=int, default=200, help='requests per HTTP scenario')
+    parser.add_argument('--threads', type=int, default=1, help='client threads per HTTP scenario')
+    parser.add_argument('--warmup', type=int, default=10, help='untimed requests before each scenario')
+    parser.add_argument('--repeat', type=int, default=5, help='rounds per microbenchmark; the best is kept')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='mean injected stub provider and Stripe latency')
+    parser.add_argument('--only', nargs='*', default=[], help='benchmark or scenario names to run')
+    parser.add_argument('--output', help='also write the results to this file')
+    parser.add_argument('--compare', help='results file of an earlier run to compare against')
+    parser.add_argument('--threshold-pct', type=float, default=25.0, help='slowdown that counts as a regression')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    stubs = start_stubs(args.latency_ms)
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'suite.db')}",
+        'AUTO_CREATE_SCHEMA': '1'  # scratch database
+    })
+    try:
+        from src.main import app
+        from src.models.user import db
+
+        commit, dirty = git_revision()
+        results = {
+            'suite_version': SUITE_VERSION,
+            'commit': commit,
+            'uncommitted_changes': dirty,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'args': {name: value for name, value in vars(args).items() if name not in ('output', 'compare')}
+        }
+        failures = []
+        with app.app_context():
+            results['data'] = generate(db, args.properties, args.agents, args.leads, args.seed)
+            results['micro'] = micro_benchmarks(db, args.repeat, set(args.only))
+            scenarios = http_scenarios(db, args.seed)
+            db.session.remove()
+
+        results['http'] = {}
+        for name, blueprint, expected, call, prepare in scenarios:
+            if args.only and name not in args.only:
+                continue
+            if prepare is not None:
+                with app.app_context():
+                    prepare(args.requests + args.warmup)
+            stats = run_scenario(app, call, expected, args.requests, args.threads, args.warmup)
+            results['http'][name] = dict(stats, blueprint=blueprint)
+            if stats['unexpected_statuses']:
+                failures.append(f"{name}: unexpected statuses {stats['unexpected_statuses']} (expected {expected})")
+
+        if baseline is not None:
+            results['baseline_commit'] = baseline.get('commit')
+            results['comparison'], regressions = compare(results, baseline, args.threshold_pct)
+            failures.extend(regressions)
+        results['failures'] = failures
+    finally:
+        for process in stubs:
+            process.terminate()
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""Local stub HTTP server for the RentCast, ATTOM, geocoder and licensing APIs
+
+Speaks HTTP/1.1 with keep-alive so connection reuse can be measured, and can
+inject latency and failures. Point the clients at it with e.g.
+
+    RENTCAST_API_KEY=test RENTCAST_BASE_URL=http://127.0.0.1:8765/v1 ...
+
+or run it standalone:
+
+    python benchmarks/stub_providers.py --port 8765 --latency-ms 50
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import Counter
+from urllib.parse import urlparse, parse_qs
+import argparse
+import json
+import random
+import socket
+import threading
+import time
+
+def rentcast_property():
+    return [{
+        'bedrooms': random.randint(2, 5),
+        'bathrooms': random.choice([1, 1.5, 2, 2.5, 3]),
+        'squareFootage': random.randint(1200, 3500),
+        'lotSize': random.randint(5000, 15000),
+        'yearBuilt': random.randint(1980, 2020),
+        'propertyType': 'Single Family'
+    }]
+
+def rentcast_value():
+    return {
+        'price': random.randint(300000, 800000),
+        'comparables': [
+            {
+                'formattedAddress': f'{random.randint(100, 999)} Oak St, Austin, TX 78701',
+                'price': random.randint(280000, 760000),
+                'squareFootage': random.randint(1100, 3300),
+                'lastSeenDate': '2024-07-20T00:00:00.000Z'
+            }
+            for _ in range(3)
+        ]
+    }
+
+def rentcast_rent():
+    return {'rent': random.randint(2000, 5000)}
+
+def attom_profile():
+    return {'property': [{
+        'assessment': {
+            'assessed': {'assdttlvalue': random.randint(250000, 700000)},
+            'market': {'mktttlvalue': random.randint(300000, 800000)},
+            'tax': {'taxamt': random.randint(3000, 12000)}
+        },
+        'sale': {
+            'amount': {'saleamt': random.randint(280000, 750000)},
+            'saleTransDate': '2023-08-15'
+        }
+    }]}
+
+def geocode():
+    return {'status': 'OK', 'results': [{'geometry': {'location': {
+        'lat': 30.2672 + random.uniform(-0.1, 0.1),
+        'lng': -97.7431 + random.uniform(-0.1, 0.1)
+    }}}]}
+
+def license_record():
+    return {
+        'status': 'Active',
+        'license_type': 'Real Estate Salesperson',
+        'expiration_date': '2026-12-31',
+        'disciplinary_actions': None
+    }
+
+ROUTES = [
+    ('/properties', rentcast_property),
+    ('/avm/value', rentcast_value),
+    ('/avm/rent/long-term', rentcast_rent),
+    ('/property/expandedprofile', attom_profile),
+    ('/geocode/json', geocode),
+    ('/licenses/', license_record)
+]
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out in separate writes; avoid Nagle stalls on reused connections
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.stats_lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        address = (query.get('address') or query.get('address1') or [''])[0]
+        with self.server.stats_lock:
+            self.server.requests += 1
+            self.server.calls[(url.path, address)] += 1
+
+        if self.server.latency_ms:
+            time.sleep(random.expovariate(1.0 / self.server.latency_ms) / 1000.0)
+
+        if random.random() < self.server.failure_rate:
+            return self._send(503, {'error': 'injected failure'})
+
+        for suffix, build in ROUTES:
+            if suffix in url.path:
+                return self._send(200, build())
+        return self._send(404, {'error': 'not found'})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, latency_ms=0.0, failure_rate=0.0):
+        super().__init__(address, StubHandler)
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        self.stats_lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.calls = Counter()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+def start_stub_server(port=0, latency_ms=0.0, failure_rate=0.0):
+    """Start the stub server on a background thread and return it"""
+    server = StubServer(('127.0.0.1', port), latency_ms, failure_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stub provider HTTP server')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    server = StubServer(('127.0.0.1', args.port), args.latency_ms, args.failure_rate)
+    print(f'stub providers listening on {server.base_url}')
+    server.serve_forever()
@@ -0,0 +1,122 @@
+"""Minimal in-memory Redis stand-in speaking RESP
+
+Supports PING, GET, PTTL, SET (EX/PX/NX), DEL, SELECT, AUTH and EVAL of the
+lock release script, which is all the shared valuation cache uses. Run
+standalone with
+
+    python benchmarks/stub_redis.py --port 6390
+"""
+from socketserver import StreamRequestHandler, ThreadingTCPServer
+import argparse
+import threading
+import time
+
+import common  # adds the deployment root to sys.path
+from src.services.shared_cache import RELEASE_LOCK_SCRIPT
+
+class RedisHandler(StreamRequestHandler):
+
+    def handle(self):
+        while True:
+            try:
+                command = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if command is None:
+                return
+            self.wfile.write(self.server.dispatch(command))
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            raise ValueError('inline commands are not supported')
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+class StubRedisServer(ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, RedisHandler)
+        self.data = {}
+        self.lock = threading.Lock()
+        self.commands = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'redis://{host}:{port}/0'
+
+    def _live(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self.data[key]
+            return None
+        return value
+
+    def dispatch(self, args):
+        name = args[0].upper()
+        with self.lock:
+            self.commands += 1
+            if name == b'PING':
+                return b'+PONG\r\n'
+            if name in (b'SELECT', b'AUTH'):
+                return b'+OK\r\n'
+            if name == b'GET':
+                value = self._live(args[1])
+                if value is None:
+                    return b'$-1\r\n'
+                return b'$%d\r\n%s\r\n' % (len(value), value)
+            if name == b'PTTL':
+                if self._live(args[1]) is None:
+                    return b':-2\r\n'
+                expires_at = self.data[args[1]][1]
+                if expires_at is None:
+                    return b':-1\r\n'
+                return b':%d\r\n' % int((expires_at - time.time()) * 1000)
+            if name == b'DEL':
+                removed = sum(1 for key in args[1:] if self.data.pop(key, None) is not None)
+                return b':%d\r\n' % removed
+            if name == b'SET':
+                key, value = args[1], args[2]
+                options = [arg.upper() for arg in args[3:]]
+                expires_at = None
+                if b'PX' in options:
+                    expires_at = time.time() + int(options[options.index(b'PX') + 1]) / 1000.0
+                elif b'EX' in options:
+                    expires_at = time.time() + int(options[options.index(b'EX') + 1])
+                if b'NX' in options and self._live(key) is not None:
+                    return b'$-1\r\n'
+                self.data[key] = (value, expires_at)
+                return b'+OK\r\n'
+            if name == b'EVAL' and args[1] == RELEASE_LOCK_SCRIPT.encode():
+                # Compare-and-delete: KEYS[1] is the lock, ARGV[1] the token
+                key, token = args[3], args[4]
+                if self._live(key) != token:
+                    return b':0\r\n'
+                del self.data[key]
+                return b':1\r\n'
+        return b'-ERR unknown command\r\n'
+
+def start_stub_redis(port=0):
+    """Start the stand-in on a background thread and return it"""
+    server = StubRedisServer(('127.0.0.1', port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Redis protocol stand-in')
+    parser.add_argument('--port', type=int, default=6390)
+    args = parser.parse_args()
+    server = StubRedisServer(('127.0.0.1', args.port))
+    print(f'stub redis listening on {server.url}')
+    server.serve_forever()
@@ -0,0 +1,132 @@
+"""Local stub of the Stripe API calls the subscription routes make
+
+Covers customers, payment intents (create and retrieve - every intent
+reports status succeeded) and invoice listing, with the form-encoded
+requests the stripe SDK sends. Point the app at it with
+
+    STRIPE_SECRET_KEY=sk_test_stub STRIPE_API_BASE=http://127.0.0.1:8766 ...
+
+or run it standalone:
+
+    python benchmarks/stub_stripe.py --port 8766 --latency-ms 80
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import Counter
+from urllib.parse import urlparse, parse_qs
+import argparse
+import itertools
+import json
+import random
+import socket
+import threading
+import time
+
+def form_metadata(form):
+    """metadata[key]=value pairs of a form-encoded Stripe request"""
+    return {key[len('metadata['):-1]: values[0] for key, values in form.items() if key.startswith('metadata[')}
+
+class StripeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self._count(url.path)
+        if url.path.startswith('/v1/payment_intents/'):
+            intent = self.server.payment_intents.get(url.path.rsplit('/', 1)[1])
+            if intent is None:
+                return self._send(404, {'error': {'type': 'invalid_request_error', 'message': 'No such payment_intent'}})
+            return self._send(200, intent)
+        if url.path == '/v1/invoices':
+            query = parse_qs(url.query)
+            limit = int((query.get('limit') or ['10'])[0])
+            customer = (query.get('customer') or [''])[0]
+            return self._send(200, {'object': 'list', 'url': '/v1/invoices', 'has_more': False, 'data': [
+                self.server.invoice(customer, month) for month in range(limit)
+            ]})
+        return self._send(404, {'error': {'type': 'invalid_request_error', 'message': 'Unrecognized request URL'}})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        self._count(url.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        form = parse_qs(self.rfile.read(length).decode())
+        if url.path == '/v1/customers':
+            return self._send(200, {
+                'id': f'cus_{next(self.server.ids):08d}', 'object': 'customer',
+                'email': (form.get('email') or [None])[0], 'name': (form.get('name') or [None])[0],
+                'metadata': form_metadata(form)
+            })
+        if url.path == '/v1/payment_intents':
+            intent_id = f'pi_{next(self.server.ids):08d}'
+            intent = {
+                'id': intent_id, 'object': 'payment_intent', 'status': 'succeeded',
+                'client_secret': f'{intent_id}_secret_stub', 'currency': (form.get('currency') or ['usd'])[0],
+                'amount': int((form.get('amount') or ['0'])[0]), 'customer': (form.get('customer') or [None])[0],
+                'metadata': form_metadata(form)
+            }
+            self.server.payment_intents[intent_id] = intent
+            return self._send(200, intent)
+        return self._send(404, {'error': {'type': 'invalid_request_error', 'message': 'Unrecognized request URL'}})
+
+    def _count(self, path):
+        with self.server.stats_lock:
+            self.server.requests += 1
+            self.server.calls[path.rsplit('/', 1)[0] if path.startswith('/v1/payment_intents/') else path] += 1
+        if self.server.latency_ms:
+            time.sleep(random.expovariate(1.0 / self.server.latency_ms) / 1000.0)
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class StripeStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, latency_ms=0.0):
+        super().__init__(address, StripeHandler)
+        self.latency_ms = latency_ms
+        self.ids = itertools.count(1)
+        self.payment_intents = {}
+        self.stats_lock = threading.Lock()
+        self.requests = 0
+        self.calls = Counter()
+
+    def invoice(self, customer, month):
+        return {
+            'id': f'in_{customer}_{month}', 'object': 'invoice', 'customer': customer,
+            'amount_paid': 19900, 'currency': 'usd', 'status': 'paid',
+            'created': 1735689600 - month * 30 * 86400, 'description': None,
+            'hosted_invoice_url': f'https://invoice.stripe.test/{customer}/{month}'
+        }
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+def start_stub_stripe(port=0, latency_ms=0.0):
+    """Start the Stripe stub on a background thread and return it"""
+    server = StripeStubServer(('127.0.0.1', port), latency_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stub Stripe API server')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    args = parser.parse_args()
+    server = StripeStubServer(('127.0.0.1', args.port), args.latency_ms)
+    print(f'stub Stripe listening on {server.base_url}')
+    server.serve_forever()
@@ -0,0 +1,23 @@
+"""The deployed app plus a streaming probe route, served by bench_worker_models.py
+
+    gunicorn worker_app:app          # WSGI, through api/index.py
+    uvicorn worker_app:asgi_app      # ASGI, through api/asgi.py
+"""
+import time
+
+import common  # adds the deployment root to sys.path
+from flask import Response
+from api.asgi import app as asgi_app
+from api.index import app
+
+STREAM_CHUNKS = 5
+STREAM_INTERVAL = 0.05
+
+@app.route('/bench/stream')
+def bench_stream():
+    """NDJSON lines produced over time; a buffering adapter delivers them all at the end"""
+    def generate():
+        for i in range(STREAM_CHUNKS):
+            yield f'{{"chunk": {i}}}\n'
+            time.sleep(STREAM_INTERVAL)
+    return Response(generate(), mimetype='application/x-ndjson')
@@ -0,0 +1,26 @@
+"""gunicorn settings for running the API locally or on a VM
+
+    gunicorn api.index:app                        # threaded workers, keep-alive
+    GUNICORN_WORKER_CLASS=sync gunicorn api.index:app
+"""
+import multiprocessing
+import os
+import sys
+
+bind = os.getenv('BIND', f"0.0.0.0:{os.getenv('PORT', 5000)}")
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+# Idle keep-alive connections are held by threads, not by whole workers, under gthread
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+preload_app = os.getenv('GUNICORN_PRELOAD', '').lower() in ('1', 'true', 'yes')
+
+def post_fork(server, worker):
+    # With preload_app the pooled database connections opened in the parent
+    # must not be shared with the forked workers
+    main = sys.modules.get('main')
+    if main is not None:
+        with main.app.app_context():
+            main.db.engine.dispose(close=False)
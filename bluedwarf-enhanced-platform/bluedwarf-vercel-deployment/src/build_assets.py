@@ -0,0 +1,171 @@
+"""Build content-hashed, precompressed static assets
+
+Writes src/static/dist/ with:
+  - images resized to --max-image-size and recompressed, plus WebP (and AVIF
+    where Pillow supports it) alternates, when Pillow is installed
+  - gzip (and brotli, when installed) copies of text assets
+  - HTML with asset references rewritten to the hashed file names
+  - manifest.json, which src/main.py loads into its in-memory path table,
+    with the hash of each source file so a stale build can be detected
+
+Vercel's Python builder runs no build step, so dist/ is committed: rerun
+this after changing anything in src/static and commit the result.
+
+    python src/build_assets.py --max-image-size 256
+"""
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+try:
+    from PIL import Image, features
+except ImportError:  # optional - images are copied unchanged
+    Image = None
+
+try:
+    import brotli
+except ImportError:  # optional - text assets get gzip only
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_NAME = 'manifest.json'
+
+RESIZABLE_IMAGES = {'.png', '.jpg', '.jpeg'}
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml',
+                      'image/vnd.microsoft.icon', 'image/x-icon', 'application/xml')
+HTML_SUFFIXES = {'.html', '.htm'}
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+def hashed_name(name, data, extension=None):
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{content_hash(data)}{extension or ext}'
+
+def encode_image(image, image_format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+def build_image(name, data, max_size):
+    """(primary bytes, {mimetype: alternate bytes}) for a raster image"""
+    if Image is None:
+        return data, {}
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    resized = max(image.size) > max_size
+    if resized:
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+
+    ext = os.path.splitext(name)[1].lower()
+    if ext == '.png':
+        primary = encode_image(image, 'PNG', optimize=True)
+    else:
+        primary = encode_image(image.convert('RGB'), 'JPEG', quality=85, optimize=True, progressive=True)
+    if not resized and len(primary) >= len(data):
+        primary = data
+
+    alternates = {'image/webp': encode_image(image, 'WEBP', quality=85, method=6)}
+    if features.check('avif'):
+        alternates['image/avif'] = encode_image(image, 'AVIF', quality=60)
+    # Only keep alternates that actually save bytes
+    return primary, {mimetype: alt for mimetype, alt in alternates.items() if len(alt) < len(primary)}
+
+def compressed_variants(data, mimetype):
+    """{content-coding: bytes} for compressible types, when smaller"""
+    if not mimetype or not mimetype.startswith(COMPRESSIBLE_TYPES):
+        return {}
+    variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, quality=11)
+    return {encoding: body for encoding, body in variants.items() if len(body) < len(data)}
+
+def rewrite_references(html, renames):
+    """Point src/href attributes at the hashed file names"""
+    def replace(match):
+        target = renames.get(match.group(3))
+        return f'{match.group(1)}{match.group(2)}{target}{match.group(2)}' if target else match.group(0)
+    return re.sub(r'''(\b(?:src|href)=)(["'])([^"'#?]+)\2''', replace, html)
+
+def write(name, data):
+    with open(os.path.join(DIST_DIR, name), 'wb') as f:
+        f.write(data)
+
+def write_encodings(entry, data):
+    """Write the precompressed copies of an asset and list them in its entry"""
+    encodings = compressed_variants(data, entry['type'])
+    if encodings:
+        entry['encodings'] = {}
+        for encoding, body in encodings.items():
+            encoded_name = f"{entry['file']}.{'gz' if encoding == 'gzip' else encoding}"
+            write(encoded_name, body)
+            entry['encodings'][encoding] = encoded_name
+
+def build(max_image_size):
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    os.makedirs(DIST_DIR)
+
+    sources = sorted(name for name in os.listdir(STATIC_DIR)
+                     if os.path.isfile(os.path.join(STATIC_DIR, name)))
+    assets = {}
+    renames = {}
+    pages = []
+    for name in sources:
+        with open(os.path.join(STATIC_DIR, name), 'rb') as f:
+            data = f.read()
+        ext = os.path.splitext(name)[1].lower()
+        if ext in HTML_SUFFIXES:
+            pages.append((name, data))
+            continue
+
+        mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        source = content_hash(data)
+        alternates = {}
+        if ext in RESIZABLE_IMAGES:
+            data, alternates = build_image(name, data, max_image_size)
+
+        entry = {'file': hashed_name(name, data), 'type': mimetype, 'size': len(data), 'immutable': True,
+                 'source': source}
+        write(entry['file'], data)
+        if alternates:
+            entry['alternates'] = {}
+            for alt_type, alt_data in alternates.items():
+                alt_name = hashed_name(name, alt_data, mimetypes.guess_extension(alt_type) or '')
+                write(alt_name, alt_data)
+                entry['alternates'][alt_type] = alt_name
+        write_encodings(entry, data)
+        assets[name] = entry
+        renames[name] = entry['file']
+
+    # Pages keep their names (they are the entry points) but link to hashed assets
+    for name, data in pages:
+        html = rewrite_references(data.decode('utf-8'), renames).encode('utf-8')
+        entry = {'file': name, 'type': 'text/html', 'size': len(html), 'immutable': False,
+                 'source': content_hash(data)}
+        write(name, html)
+        write_encodings(entry, html)
+        assets[name] = entry
+
+    with open(os.path.join(DIST_DIR, MANIFEST_NAME), 'w') as f:
+        json.dump({'assets': assets}, f, indent=2, sort_keys=True)
+    return assets
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build hashed static assets')
+    parser.add_argument('--max-image-size', type=int, default=256,
+                        help='longest side in pixels for raster images')
+    args = parser.parse_args()
+
+    if Image is None:
+        print('Pillow not installed - images are copied without resizing or WebP/AVIF variants')
+    for name, entry in build(args.max_image_size).items():
+        extras = sorted(entry.get('encodings', {})) + sorted(entry.get('alternates', {}))
+        print(f"{name} -> {entry['file']} ({entry['size']} bytes) {' '.join(extras)}".rstrip())
@@ -3,17 +3,27 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
+from sqlalchemy import inspect
 from src.models.user import db
 from src.models.property import Property, Agent, PropertyLead
 from src.routes.user import user_bp
 from src.routes.property import property_bp
 from src.routes.agent import agent_bp
 from src.routes.subscription import subscription_bp
+from src.routes.batch import batch_bp
+from src.routes.admin import admin_bp
+from src.services.static_assets import AssetTable
+from src.services.json_provider import json_provider_class
+from src.services.instrumentation import INSTRUMENTATION_ENABLED, init_app as init_instrumentation
+from src.services.profiler import start_from_env as start_startup_profile
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 
+# orjson-backed jsonify and request.get_json when installed (JSON_PROVIDER=stdlib to opt out)
+app.json = json_provider_class()(app)
+
 # Production-ready configuration
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
 
@@ -24,6 +34,12 @@ app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(property_bp, url_prefix='/api')
 app.register_blueprint(agent_bp, url_prefix='/api')
 app.register_blueprint(subscription_bp, url_prefix='/api')
+app.register_blueprint(batch_bp, url_prefix='/api')
+app.register_blueprint(admin_bp, url_prefix='/api')
+
+# Server-Timing headers on every response and Prometheus metrics at /metrics
+if INSTRUMENTATION_ENABLED:
+    init_instrumentation(app)
 
 # Database configuration - use environment variable for production
 database_url = os.getenv('DATABASE_URL')
@@ -35,8 +51,33 @@ else:
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db.init_app(app)
-with app.app_context():
-    db.create_all()
+
+# Schema changes run from src/manage.py (init-db, migrate), not on every cold start.
+# By default a database missing any of the model tables - a fresh deploy, or the
+# checked-in database/app.db, which the Vercel build never migrates - gets them
+# created here, at the cost of one table listing; new columns on existing tables
+# still need `manage.py migrate`. AUTO_CREATE_SCHEMA=1 runs create_all on every
+# import (throwaway local databases) and 0 leaves the schema alone.
+AUTO_CREATE_SCHEMA = os.getenv('AUTO_CREATE_SCHEMA', 'missing').lower()
+if AUTO_CREATE_SCHEMA in ('1', 'true', 'yes'):
+    with app.app_context():
+        db.create_all()
+elif AUTO_CREATE_SCHEMA == 'missing':
+    with app.app_context():
+        if not db.metadata.tables.keys() <= set(inspect(db.engine).get_table_names()):
+            db.create_all()
+
+# Static files are held in memory; run src/build_assets.py for hashed, compressed assets
+static_assets = AssetTable(app.static_folder)
+if not static_assets.built:
+    app.logger.warning('static/dist/manifest.json is missing: serving raw static files without hashed '
+                       'names, compression or immutable caching (run src/build_assets.py)')
+elif static_assets.stale:
+    app.logger.warning('static/dist is older than %s: rerun src/build_assets.py', ', '.join(static_assets.stale))
+
+# PROFILER_SECONDS=N samples each worker for N seconds from startup (without
+# gunicorn --preload, so the sampler thread starts in the worker, not the master)
+start_startup_profile()
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -45,14 +86,12 @@ def serve(path):
     if static_folder_path is None:
             return "Static folder not configured", 404
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
+    asset = static_assets.get(path) if path != "" else None
+    if asset is None:
+        asset = static_assets.get('index.html')
+        if asset is None:
             return "index.html not found", 404
+    return static_assets.respond(asset)
 
 # Health check endpoint
 @app.route('/health')
@@ -0,0 +1,304 @@
+"""Database maintenance commands
+
+    python src/manage.py migrate
+    python src/manage.py rescore
+"""
+import json
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+from sqlalchemy import func, inspect, select, text, update
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import flag_modified
+from src.main import app
+from src.models.user import db
+from src.models.property import (Property, PropertyLead, PropertyPayload, AgentCoverageCell, AgentSearchTerm,
+                                  AgentServiceArea, AgentSpecialty)
+from src.routes.property import store_provider_fields
+from src.services.agent_locator import rebuild_coverage_index, rebuild_service_area_index
+from src.services.address import canonicalize_address
+from src.services.agent_search import rebuild_search_index
+from src.services.payload_archive import compress_payload, write_archived_payloads
+from src.services.valuation import calculate_ai_valuations
+
+def add_missing_columns():
+    """Add columns the models gained after their tables were created"""
+    inspector = inspect(db.engine)
+    preparer = db.engine.dialect.identifier_preparer
+    added = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            db.session.execute(text(
+                f'ALTER TABLE {preparer.quote(table.name)} ADD COLUMN {preparer.quote(column.name)} {column_type}'
+            ))
+            added.append(f'{table.name}.{column.name}')
+    db.session.commit()
+    return added
+
+# Properties given an address key per chunk
+ADDRESS_KEY_CHUNK_SIZE = 1000
+
+def backfill_address_keys():
+    """Key and re-canonicalize rows stored before properties.address_key existed"""
+    keyed = 0
+    while True:
+        rows = db.session.execute(
+            select(Property.id, Property.address).where(Property.address_key.is_(None))
+            .order_by(Property.id).limit(ADDRESS_KEY_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            break
+        changes = []
+        for row in rows:
+            location = canonicalize_address(row.address)
+            changes.append({'id': row.id, 'address_key': location.key, 'normalized_address': location.canonical})
+        db.session.execute(update(Property), changes)
+        db.session.commit()
+        keyed += len(rows)
+    return keyed
+
+def merge_duplicate_properties():
+    """Collapse rows sharing an address_key onto the newest one"""
+    duplicates = db.session.query(Property.address_key).group_by(
+        Property.address_key
+    ).having(func.count(Property.id) > 1).all()
+    merged = 0
+    for (key,) in duplicates:
+        rows = Property.query.filter_by(address_key=key).order_by(
+            Property.updated_at.desc(), Property.id.desc()
+        ).all()
+        keep, extras = rows[0], rows[1:]
+        extra_ids = [row.id for row in extras]
+        PropertyLead.query.filter(PropertyLead.property_id.in_(extra_ids)).update(
+            {PropertyLead.property_id: keep.id}, synchronize_session=False
+        )
+        PropertyPayload.query.filter(PropertyPayload.property_id.in_(extra_ids)).delete(synchronize_session=False)
+        for row in extras:
+            db.session.delete(row)
+        merged += len(extras)
+    db.session.commit()
+    return merged
+
+def create_missing_indexes():
+    """Create model indexes missing from tables that already existed"""
+    inspector = inspect(db.engine)
+    created = []
+    for table in db.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=db.engine, checkfirst=True)
+                created.append(index.name)
+    return created
+
+# Indexes replaced by wider or different ones in the models, by table
+SUPERSEDED_INDEXES = {
+    'properties': ('ux_properties_normalized_address',),  # now ux_properties_address_key
+    'property_leads': ('ix_property_leads_agent_created',),  # now ix_property_leads_agent_created_id
+    'agents': ('ix_agents_eligible_rating',)  # now ix_agents_eligible_rating_state_tier
+}
+
+def drop_superseded_indexes():
+    """Drop indexes whose queries a newer model index now serves"""
+    inspector = inspect(db.engine)
+    dropped = []
+    for table_name, names in SUPERSEDED_INDEXES.items():
+        existing = {index['name'] for index in inspector.get_indexes(table_name)}
+        for name in names:
+            if name in existing:
+                db.session.execute(text(f'DROP INDEX {db.engine.dialect.identifier_preparer.quote(name)}'))
+                dropped.append(name)
+    db.session.commit()
+    return dropped
+
+# JSON Text columns replaced by typed columns, comparable_sales and property_payloads
+LEGACY_PAYLOAD_COLUMNS = ('rentcast_data', 'attom_data', 'market_trends', 'comparable_sales', 'neighborhood_data')
+# Properties moved per chunk
+PAYLOAD_MIGRATION_CHUNK_SIZE = 1000
+
+def json_column(value, default):
+    try:
+        return json.loads(value) if value else default
+    except ValueError:
+        return default
+
+def migrate_provider_payloads():
+    """Move the legacy JSON payload columns into typed columns, comps and the archive, then drop them"""
+    existing = {column['name'] for column in inspect(db.engine).get_columns('properties')}
+    legacy = [name for name in LEGACY_PAYLOAD_COLUMNS if name in existing]
+    if not legacy:
+        return 0, []
+    preparer = db.engine.dialect.identifier_preparer
+    select_legacy = text(
+        f'SELECT id, {", ".join(preparer.quote(name) for name in legacy)} FROM properties '
+        f'WHERE id > :last_id ORDER BY id LIMIT :limit'
+    )
+
+    moved = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select_legacy, {'last_id': last_id, 'limit': PAYLOAD_MIGRATION_CHUNK_SIZE}
+        ).mappings().all()
+        if not rows:
+            break
+        records = {record.id: record for record in db.session.scalars(
+            select(Property).where(Property.id.in_([row['id'] for row in rows]))
+            .options(selectinload(Property.comparables))
+        )}
+        for row in rows:
+            rentcast_data = json_column(row.get('rentcast_data'), {})
+            attom_data = json_column(row.get('attom_data'), {})
+            if not rentcast_data and not attom_data and not row.get('comparable_sales'):
+                continue  # never valued
+            rentcast_data.setdefault('comparables', json_column(row.get('comparable_sales'), []))
+            attom_data.setdefault('neighborhood', json_column(row.get('market_trends'), {}))
+
+            # The failures its valuation saw: an empty payload means that provider failed
+            record = records[row['id']]
+            failures = [name for name, missing in (
+                ('geocode', record.latitude is None),
+                ('rentcast', not rentcast_data.get('property')),
+                ('attom', not attom_data.get('property'))
+            ) if missing]
+            store_provider_fields(record, rentcast_data, attom_data, failures)
+            # Moving data does not make the valuation any newer
+            flag_modified(record, 'updated_at')
+            blobs = {
+                name: compress_payload(data)
+                for name, data in (('rentcast', rentcast_data), ('attom', attom_data)) if data.get('property')
+            }
+            if blobs:
+                write_archived_payloads(db.session.connection(), record.id, blobs, fetched_at=record.updated_at)
+            moved += 1
+        db.session.commit()
+        last_id = rows[-1]['id']
+
+    for name in legacy:
+        db.session.execute(text(f'ALTER TABLE properties DROP COLUMN {preparer.quote(name)}'))
+    db.session.commit()
+    return moved, legacy
+
+def migrate():
+    """Bring an existing database up to the current models"""
+    added = add_missing_columns()
+    db.create_all()
+    # First, so re-canonicalized rows cannot trip the old unique index
+    superseded = drop_superseded_indexes()
+
+    # The unique address_key index needs every row keyed and duplicates gone first
+    keyed = backfill_address_keys()
+    merged = merge_duplicate_properties()
+    indexes = create_missing_indexes()
+
+    # Provider payloads move out of the properties rows
+    moved, dropped = migrate_provider_payloads()
+
+    # Derived lookup tables, rebuilt from the agents' own columns; this also
+    # re-tokenizes search terms indexed under an older search_words
+    rebuild_service_area_index()
+    rebuild_coverage_index()
+    rebuild_search_index()
+    # Planner statistics, so searches start from their most selective table
+    db.session.execute(text('ANALYZE'))
+    db.session.commit()
+
+    print(f'added columns: {", ".join(added) or "none"}')
+    print(f'properties given an address key: {keyed}')
+    print(f'merged duplicate properties: {merged}')
+    print(f'created indexes: {", ".join(indexes) or "none"}')
+    print(f'dropped superseded indexes: {", ".join(superseded) or "none"}')
+    print(f'properties moved to typed columns: {moved}; dropped columns: {", ".join(dropped) or "none"}')
+    print(f'agent_service_areas rows: {AgentServiceArea.query.count()}')
+    print(f'agent_coverage_cells rows: {AgentCoverageCell.query.count()}')
+    print(f'agent_search_terms rows: {AgentSearchTerm.query.count()}')
+    print(f'agent_specialties rows: {AgentSpecialty.query.count()}')
+
+def init_db():
+    """Create any missing tables for a fresh database"""
+    db.create_all()
+    print(f'tables: {", ".join(sorted(db.metadata.tables))}')
+
+# Properties re-scored per query and bulk update
+RESCORE_CHUNK_SIZE = int(os.getenv('RESCORE_CHUNK_SIZE', '10000'))
+
+def row_missing_sources(row):
+    """Providers missing from the valuation stored on a row"""
+    if row.missing_sources is not None:
+        return set(filter(None, row.missing_sources.split(',')))
+    # Not recorded: no coordinates means the geocoder failed, no figures the provider
+    missing = set()
+    if row.latitude is None:
+        missing.add('geocode')
+    if row.rentcast_value is None:
+        missing.add('rentcast')
+    if row.market_value is None and row.assessed_value is None:
+        missing.add('attom')
+    return missing
+
+def rescore_chunk(rows):
+    """Re-value a chunk of stored properties with the vectorized engine; returns the changed rows"""
+    missing = [row_missing_sources(row) for row in rows]
+    scores = calculate_ai_valuations(
+        [float(row.rentcast_value or 0) for row in rows], [float(row.market_value or 0) for row in rows],
+        [float(row.assessed_value or 0) for row in rows], [row.year_built or 0 for row in rows],
+        square_feet=[row.square_feet or 0 for row in rows],
+        missing={source: [source in sources for sources in missing] for source in ('geocode', 'rentcast', 'attom')}
+    )
+    changed = []
+    for row, value, confidence, price_per_sqft in zip(
+            rows, scores['estimated_value'].tolist(), scores['confidence_score'].tolist(),
+            scores['price_per_sqft'].tolist()):
+        if (value, confidence, price_per_sqft) != (row.estimated_value, row.confidence_score, row.price_per_sqft):
+            # updated_at is kept: the provider data is no newer than before
+            changed.append({'id': row.id, 'estimated_value': value, 'confidence_score': confidence,
+                            'price_per_sqft': price_per_sqft, 'updated_at': row.updated_at})
+    return changed
+
+def rescore():
+    """Recompute every stored valuation from its saved provider data"""
+    columns = (Property.id, Property.rentcast_value, Property.market_value, Property.assessed_value,
+               Property.missing_sources, Property.year_built, Property.square_feet, Property.latitude,
+               Property.estimated_value,
+               Property.confidence_score, Property.price_per_sqft, Property.updated_at)
+    scored = updated = 0
+    last_id = 0
+    while True:
+        # Keyset chunks, so each read finishes before its update is written
+        rows = db.session.execute(
+            select(*columns).where(Property.id > last_id).order_by(Property.id).limit(RESCORE_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            break
+        changed = rescore_chunk(rows)
+        if changed:
+            db.session.execute(update(Property), changed)
+        db.session.commit()
+        scored += len(rows)
+        updated += len(changed)
+        last_id = rows[-1].id
+
+    print(f'properties scored: {scored}')
+    print(f'valuations changed: {updated}')
+    # Cached /api/valuation responses age out on their own TTL
+
+COMMANDS = {
+    'init-db': init_db,
+    'migrate': migrate,
+    'rescore': rescore
+}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='BlueDwarf database maintenance')
+    parser.add_argument('command', choices=sorted(COMMANDS))
+    args = parser.parse_args()
+    with app.app_context():
+        COMMANDS[args.command]()
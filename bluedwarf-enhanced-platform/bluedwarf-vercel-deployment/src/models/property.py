@@ -1,15 +1,15 @@
-from flask_sqlalchemy import SQLAlchemy
+from src.models.user import db
+from sqlalchemy import event, inspect
 from datetime import datetime
 import json
 
-db = SQLAlchemy()
-
 class Property(db.Model):
     __tablename__ = 'properties'
     
     id = db.Column(db.Integer, primary_key=True)
     address = db.Column(db.String(255), nullable=False)
-    normalized_address = db.Column(db.String(255), nullable=False)
+    normalized_address = db.Column(db.String(255), nullable=False)  # canonical form, for display
+    address_key = db.Column(db.String(16), nullable=False)  # canonicalize_address() key, shared by every spelling
     latitude = db.Column(db.Float)
     longitude = db.Column(db.Float)
     
@@ -27,20 +27,60 @@ class Property(db.Model):
     estimated_rent = db.Column(db.Integer)
     price_per_sqft = db.Column(db.Float)
     
-    # Market Data
-    market_trends = db.Column(db.Text)  # JSON string
-    comparable_sales = db.Column(db.Text)  # JSON string
-    neighborhood_data = db.Column(db.Text)  # JSON string
+    # Provider figures behind the valuation; raw responses are archived in property_payloads
+    rentcast_value = db.Column(db.Integer)  # RentCast AVM estimate
+    market_value = db.Column(db.Integer)  # ATTOM market value
+    assessed_value = db.Column(db.Integer)  # ATTOM assessed value
+    missing_sources = db.Column(db.String(50))  # comma-separated providers that failed
     
-    # API Source Data
-    rentcast_data = db.Column(db.Text)  # JSON string
-    attom_data = db.Column(db.Text)  # JSON string
+    # Market Data - ATTOM neighborhood statistics, served as market_trends
+    median_home_value = db.Column(db.Integer)
+    price_appreciation = db.Column(db.Float)
+    days_on_market = db.Column(db.Integer)
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Popularity - valuation requests, flushed in batches by the request path
+    request_count = db.Column(db.Integer, default=0)
+    last_requested_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        # One row per address key; looked up on every valuation
+        db.Index('ux_properties_address_key', 'address_key', unique=True),
+        # Refresh worker: recently requested properties, most popular first
+        db.Index('ix_properties_refresh_order', 'last_requested_at', 'request_count'),
+    )
+    
+    # Comparable sales in provider order; property_payloads rows are only
+    # read through src/services/payload_archive.py
+    comparables = db.relationship('ComparableSale', order_by='ComparableSale.position',
+                                  cascade='all, delete-orphan', passive_deletes=True)
+    
+    # market_trends key -> column
+    MARKET_TREND_FIELDS = (
+        ('medianHomeValue', 'median_home_value'),
+        ('priceAppreciation', 'price_appreciation'),
+        ('daysOnMarket', 'days_on_market')
+    )
+    
+    def market_trends(self):
+        """ATTOM neighborhood statistics, None before the first valuation"""
+        if self.estimated_value is None:
+            return None
+        return {
+            key: getattr(self, column) for key, column in self.MARKET_TREND_FIELDS
+            if getattr(self, column) is not None
+        }
+    
     def to_dict(self):
+        data = cached_dict(self, 'columns', self.column_dict)
+        # Comparables serialize from their own cache, so changes to them are seen here
+        data['comparable_sales'] = [comp.to_dict() for comp in self.comparables] if self.estimated_value is not None else None
+        return data
+    
+    def column_dict(self):
         return {
             'id': self.id,
             'address': self.address,
@@ -57,13 +97,52 @@ class Property(db.Model):
             'confidence_score': self.confidence_score,
             'estimated_rent': self.estimated_rent,
             'price_per_sqft': self.price_per_sqft,
-            'market_trends': json.loads(self.market_trends) if self.market_trends else None,
-            'comparable_sales': json.loads(self.comparable_sales) if self.comparable_sales else None,
-            'neighborhood_data': json.loads(self.neighborhood_data) if self.neighborhood_data else None,
+            'market_trends': self.market_trends(),
+            'neighborhood_data': None,  # no provider fills it; kept in the response shape
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+class ComparableSale(db.Model):
+    __tablename__ = 'comparable_sales'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    property_id = db.Column(db.Integer, db.ForeignKey('properties.id', ondelete='CASCADE'), nullable=False)
+    position = db.Column(db.Integer, nullable=False, default=0)  # order in the provider response
+    address = db.Column(db.String(255))
+    sale_price = db.Column(db.Integer)
+    sale_date = db.Column(db.Date)
+    square_feet = db.Column(db.Integer)
+    
+    __table_args__ = (
+        db.Index('ix_comparable_sales_property_id', 'property_id', 'position'),
+        # Comps searched by sale date or price range
+        db.Index('ix_comparable_sales_sale_date', 'sale_date', 'sale_price'),
+        db.Index('ix_comparable_sales_sale_price', 'sale_price'),
+    )
+    
+    def to_dict(self):
+        return cached_dict(self, 'columns', self.column_dict)
+    
+    def column_dict(self):
+        # Keys as RentCast comparables were always served
+        return {
+            'address': self.address,
+            'salePrice': self.sale_price,
+            'saleDate': self.sale_date.isoformat() if self.sale_date else '',
+            'squareFootage': self.square_feet
+        }
+
+class PropertyPayload(db.Model):
+    __tablename__ = 'property_payloads'
+    
+    # Raw provider payload per property, zlib-compressed JSON - written on
+    # every valuation, read only when a payload needs re-parsing
+    property_id = db.Column(db.Integer, db.ForeignKey('properties.id', ondelete='CASCADE'), primary_key=True)
+    provider = db.Column(db.String(20), primary_key=True)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class Agent(db.Model):
     __tablename__ = 'agents'
     
@@ -87,6 +166,11 @@ class Agent(db.Model):
     specialties = db.Column(db.Text)  # JSON array
     service_areas = db.Column(db.Text)  # JSON array of zip codes/cities
     
+    # Service Coverage - a circle indexed in agent_coverage_cells
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    service_radius_miles = db.Column(db.Float, default=25.0)
+    
     # Subscription Info
     subscription_tier = db.Column(db.String(20), default='basic')  # basic, premium, enterprise
     monthly_fee = db.Column(db.Float)
@@ -105,7 +189,19 @@ class Agent(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # Eligible agents best rated first, without sorting the table; state and
+        # tier ride along so search facets never read the rows
+        db.Index('ix_agents_eligible_rating_state_tier', 'subscription_active', 'license_verified',
+                 'identity_verified', 'rating', 'license_state', 'subscription_tier'),
+        # Stripe webhooks resolve the agent by customer
+        db.Index('ix_agents_stripe_customer_id', 'stripe_customer_id'),
+    )
+    
     def to_dict(self):
+        return cached_dict(self, 'columns', self.column_dict)
+    
+    def column_dict(self):
         return {
             'id': self.id,
             'name': self.name,
@@ -119,6 +215,9 @@ class Agent(db.Model):
             'years_experience': self.years_experience,
             'specialties': json.loads(self.specialties) if self.specialties else [],
             'service_areas': json.loads(self.service_areas) if self.service_areas else [],
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'service_radius_miles': self.service_radius_miles,
             'subscription_tier': self.subscription_tier,
             'subscription_active': self.subscription_active,
             'rating': self.rating,
@@ -126,6 +225,61 @@ class Agent(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+class AgentCoverageCell(db.Model):
+    __tablename__ = 'agent_coverage_cells'
+    
+    # One row per geohash cell an agent's service circle touches
+    agent_id = db.Column(db.Integer, db.ForeignKey('agents.id'), primary_key=True)
+    geohash = db.Column(db.String(12), primary_key=True)
+    rating = db.Column(db.Float)  # copy of agents.rating so a cell scans in rating order
+    
+    __table_args__ = (
+        db.Index('ix_agent_coverage_cells_geohash_rating', 'geohash', 'rating'),
+    )
+
+class AgentServiceArea(db.Model):
+    __tablename__ = 'agent_service_areas'
+    
+    # One row per entry in Agent.service_areas, keyed like ZIP:78701 or CITY:AUSTIN TX
+    agent_id = db.Column(db.Integer, db.ForeignKey('agents.id'), primary_key=True)
+    area_key = db.Column(db.String(80), primary_key=True)
+    
+    __table_args__ = (
+        db.Index('ix_agent_service_areas_area_key', 'area_key', 'agent_id'),
+    )
+
+class AgentSpecialty(db.Model):
+    __tablename__ = 'agent_specialties'
+    
+    # One row per entry in Agent.specialties, casefolded, for search filters and facets
+    agent_id = db.Column(db.Integer, db.ForeignKey('agents.id'), primary_key=True)
+    specialty = db.Column(db.String(80), primary_key=True)
+    
+    __table_args__ = (
+        db.Index('ix_agent_specialties_specialty', 'specialty', 'agent_id'),
+    )
+
+class AgentSearchTerm(db.Model):
+    __tablename__ = 'agent_search_terms'
+    
+    # Inverted index for agent search: one row per distinct word in an agent's
+    # name, brokerage, specialties and service areas
+    agent_id = db.Column(db.Integer, db.ForeignKey('agents.id'), primary_key=True)
+    term = db.Column(db.String(80), primary_key=True)
+    weight = db.Column(db.Integer, nullable=False)  # of the best field the word is in
+    
+    __table_args__ = (
+        db.Index('ix_agent_search_terms_term', 'term', 'agent_id', 'weight'),
+    )
+
+class AgentLeadQuota(db.Model):
+    __tablename__ = 'agent_lead_quotas'
+    
+    # Leads assigned to an agent in one calendar month (period is YYYY-MM)
+    agent_id = db.Column(db.Integer, db.ForeignKey('agents.id'), primary_key=True)
+    period = db.Column(db.String(7), primary_key=True)
+    lead_count = db.Column(db.Integer, nullable=False, default=0)
+
 class PropertyLead(db.Model):
     __tablename__ = 'property_leads'
     
@@ -148,12 +302,36 @@ class PropertyLead(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # An agent's leads newest first, paged by (created_at, id), and monthly counts per agent
+        db.Index('ix_property_leads_agent_created_id', 'agent_id', 'created_at', 'id'),
+        db.Index('ix_property_leads_status', 'status'),
+        db.Index('ix_property_leads_property_id', 'property_id'),
+    )
+    
     # Relationships
     property = db.relationship('Property', backref='leads')
     agent = db.relationship('Agent', backref='leads')
     
-    def to_dict(self):
-        return {
+    # Fields of the compact lead view - no nested property or agent objects
+    COMPACT_FIELDS = ('id', 'property_id', 'agent_id', 'customer_name', 'customer_email',
+                      'lead_type', 'status', 'priority', 'created_at', 'property_address')
+    
+    def to_dict(self, fields=None):
+        """Serialize the lead; fields limits the keys and skips unrequested nested objects"""
+        wanted = frozenset(fields) if fields else None
+        data = cached_dict(self, wanted, lambda: self.column_dict(wanted))
+        # Nested objects come from their own caches, so changes to them are seen here
+        if wanted is None or 'property' in wanted:
+            data['property'] = self.property.to_dict() if self.property else None
+        if wanted is None or 'agent' in wanted:
+            data['agent'] = self.agent.to_dict() if self.agent else None
+        if wanted is not None and 'property_address' in wanted:
+            data['property_address'] = self.property.normalized_address if self.property else None
+        return data
+    
+    def column_dict(self, wanted=None):
+        data = {
             'id': self.id,
             'property_id': self.property_id,
             'agent_id': self.agent_id,
@@ -164,8 +342,57 @@ class PropertyLead(db.Model):
             'message': self.message,
             'status': self.status,
             'priority': self.priority,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'property': self.property.to_dict() if self.property else None,
-            'agent': self.agent.to_dict() if self.agent else None
+            'created_at': self.created_at.isoformat() if self.created_at else None
         }
+        if wanted is None:
+            return data
+        return {key: value for key, value in data.items() if key in wanted}
+
+def cached_dict(instance, key, build):
+    """A copy of build(), computed once per instance and key until the instance changes"""
+    # Kept in the instance __dict__ next to the loaded column values and
+    # dropped with them by the listeners below
+    cache = instance.__dict__.get('_serialized')
+    if cache is None:
+        cache = instance.__dict__['_serialized'] = {}
+    entry = cache.get(key)
+    if entry is None:
+        data = build()
+        # Keys holding lists or dicts (specialties, market_trends...), whose
+        # values each caller gets a fresh copy of, so editing one can't
+        # change what later calls return
+        nested = tuple(name for name, value in data.items() if isinstance(value, (list, dict)))
+        entry = cache[key] = (data, nested)
+    data, nested = entry
+    copy = dict(data)
+    for name in nested:
+        copy[name] = fresh_copy(data[name])
+    return copy
+
+def fresh_copy(value):
+    """value with its lists and dicts, at any depth, copied"""
+    if isinstance(value, dict):
+        return {key: fresh_copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fresh_copy(item) for item in value]
+    return value
+
+def invalidate_serialized(target, *args):
+    # target is None when the session expires an instance already garbage collected
+    if target is not None:
+        target.__dict__.pop('_serialized', None)
+
+def invalidate_flushed(mapper, connection, target):
+    # Primary and foreign keys are filled in by the flush without set events
+    invalidate_serialized(target)
 
+# Cached dicts are dropped when a column is assigned, when the row is
+# inserted or updated, and when the session expires or refreshes the
+# instance - after every commit, and for bulk UPDATEs it synchronizes
+for model in (Property, ComparableSale, Agent, PropertyLead):
+    for column in inspect(model).column_attrs:
+        event.listen(getattr(model, column.key), 'set', invalidate_serialized)
+    for name in ('expire', 'refresh', 'refresh_flush'):
+        event.listen(model, name, invalidate_serialized)
+    event.listen(model, 'after_insert', invalidate_flushed)
+    event.listen(model, 'after_update', invalidate_flushed)
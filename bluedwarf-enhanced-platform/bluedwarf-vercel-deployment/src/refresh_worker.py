@@ -0,0 +1,145 @@
+"""Background valuation refresh
+
+Re-values stored properties before they go stale, most requested first,
+so popular addresses are always answered from the database. Run one per
+deployment next to the web workers:
+
+    python src/refresh_worker.py
+    python src/refresh_worker.py --once   # a single pass, e.g. from cron
+
+Provider calls are paced by per-provider token buckets so the worker only
+uses its share of each API quota (*_REFRESH_RATE, requests per second).
+Set VALUATION_STALE_HOURS on the web workers to serve stale valuations
+while this catches up.
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import or_, select
+from sqlalchemy.orm import selectinload
+from src.main import app
+from src.models.property import Property, db
+from src.routes.property import VALUATION_MAX_AGE, fetch_provider_data, apply_provider_data
+from src.services.rate_limit import TokenBucket
+
+# Refresh this long before a valuation reaches VALUATION_MAX_AGE
+REFRESH_AHEAD = timedelta(minutes=float(os.getenv('REFRESH_AHEAD_MINUTES', '120')))
+# Only properties requested within this window are kept warm
+REFRESH_ACTIVE_WINDOW = timedelta(days=float(os.getenv('REFRESH_ACTIVE_DAYS', '30')))
+# Properties valued per pass, and at once
+REFRESH_BATCH_SIZE = int(os.getenv('REFRESH_BATCH_SIZE', '50'))
+REFRESH_CONCURRENCY = int(os.getenv('REFRESH_CONCURRENCY', '4'))
+# Sleep between passes when nothing is due
+REFRESH_IDLE_SECONDS = float(os.getenv('REFRESH_IDLE_SECONDS', '30'))
+# A property whose providers failed is retried after this long
+REFRESH_RETRY_SECONDS = float(os.getenv('REFRESH_RETRY_SECONDS', '600'))
+
+# Requests per second the worker may send each provider (0 - unlimited)
+PROVIDER_REFRESH_RATES = {
+    'geocode': float(os.getenv('GEOCODE_REFRESH_RATE', '5')),
+    'rentcast': float(os.getenv('RENTCAST_REFRESH_RATE', '1')),
+    'attom': float(os.getenv('ATTOM_REFRESH_RATE', '1'))
+}
+# HTTP requests one valuation makes to each provider
+PROVIDER_CALLS_PER_VALUATION = {
+    'geocode': 1,
+    'rentcast': 3,
+    'attom': 1
+}
+
+class RefreshWorker:
+    """Picks due properties in popularity order and re-values them in batches"""
+
+    def __init__(self, rates=None, batch_size=REFRESH_BATCH_SIZE, concurrency=REFRESH_CONCURRENCY):
+        rates = PROVIDER_REFRESH_RATES if rates is None else rates
+        self.buckets = {name: TokenBucket(rate) for name, rate in rates.items()}
+        self.batch_size = batch_size
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='refresh')
+        self.retry_at = {}
+        self.refreshed = 0
+        self.failed = 0
+
+    def due_properties(self, now=None):
+        """(id, address) of the most requested properties that are, or soon will be, stale"""
+        now = now or datetime.utcnow()
+        clock = time.monotonic()
+        self.retry_at = {property_id: at for property_id, at in self.retry_at.items() if at > clock}
+        rows = db.session.execute(
+            select(Property.id, Property.address).where(
+                Property.last_requested_at >= now - REFRESH_ACTIVE_WINDOW,
+                or_(Property.updated_at.is_(None), Property.updated_at < now - VALUATION_MAX_AGE + REFRESH_AHEAD)
+            ).order_by(Property.request_count.desc(), Property.updated_at).limit(self.batch_size + len(self.retry_at))
+        ).all()
+        return [row for row in rows if row.id not in self.retry_at][:self.batch_size]
+
+    def fetch(self, address):
+        """Provider data for one address, waiting for each provider's rate limit first"""
+        for name, bucket in self.buckets.items():
+            bucket.acquire(PROVIDER_CALLS_PER_VALUATION.get(name, 1))
+        return fetch_provider_data(address)
+
+    def refresh_batch(self, due):
+        """Value a batch of properties and write them back in one commit; returns the count refreshed"""
+        # The read transaction ends before the provider calls
+        db.session.close()
+        results = list(self.executor.map(self.fetch, [address for _, address in due]))
+
+        records = {record.id: record for record in db.session.scalars(
+            select(Property).where(Property.id.in_([property_id for property_id, _ in due]))
+            .options(selectinload(Property.comparables))
+        )}
+        refreshed = 0
+        for (property_id, _), (provider_results, provider_failures) in zip(due, results):
+            record = records.get(property_id)
+            if record is None:
+                continue
+            if not provider_results.get('rentcast') and not provider_results.get('attom'):
+                self.retry_at[property_id] = time.monotonic() + REFRESH_RETRY_SECONDS
+                self.failed += 1
+                continue
+            apply_provider_data(record, provider_results, provider_failures)
+            refreshed += 1
+        db.session.commit()
+        self.refreshed += refreshed
+        return refreshed
+
+    def run_once(self):
+        """Refresh everything currently due, batch by batch; returns the count refreshed"""
+        refreshed = 0
+        while True:
+            due = self.due_properties()
+            if not due:
+                return refreshed
+            refreshed += self.refresh_batch(due)
+
+    def run(self):
+        while True:
+            started = time.monotonic()
+            refreshed = self.run_once()
+            if refreshed:
+                print(f'refreshed {refreshed} properties in {time.monotonic() - started:.1f}s', flush=True)
+            time.sleep(REFRESH_IDLE_SECONDS)
+
+    def stats(self):
+        return {
+            'refreshed': self.refreshed,
+            'failed': self.failed,
+            'providers': {name: bucket.stats() for name, bucket in self.buckets.items()}
+        }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='BlueDwarf valuation refresh worker')
+    parser.add_argument('--once', action='store_true', help='refresh what is due now, then exit')
+    args = parser.parse_args()
+    with app.app_context():
+        worker = RefreshWorker()
+        if args.once:
+            worker.run_once()
+            print(worker.stats())
+        else:
+            worker.run()
@@ -0,0 +1,71 @@
+from flask import Blueprint, jsonify, request, Response
+from src.services import profiler
+import hmac
+import os
+import re
+
+admin_bp = Blueprint('admin', __name__)
+
+# Bearer token for the admin routes - they answer 404 when it is not set
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+
+PROFILE_ID = re.compile(r'^[0-9]+-[0-9a-f]{8}$')
+
+def authorized():
+    """Check the request's Bearer token against ADMIN_TOKEN"""
+    supplied = request.headers.get('Authorization', '')
+    if not supplied.startswith('Bearer '):
+        return False
+    return hmac.compare_digest(supplied[len('Bearer '):].encode(), ADMIN_TOKEN.encode())
+
+@admin_bp.before_request
+def require_admin_token():
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Not found'}), 404
+    if not authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+
+@admin_bp.route('/admin/profile', methods=['POST'])
+def start_profile():
+    """Sample this worker's CPU for ?seconds=N and write collapsed stacks
+
+    Only the worker process that serves this request is profiled; with
+    several workers, start one profile per worker or run a single worker
+    while investigating. Fetch the result from GET /admin/profile/<id>
+    and render it with flamegraph.pl or speedscope.
+    """
+    try:
+        seconds = float(request.args.get('seconds', 30))
+        interval_ms = float(request.args.get('interval_ms', profiler.PROFILER_INTERVAL * 1000))
+    except ValueError:
+        return jsonify({'error': 'seconds and interval_ms must be numbers'}), 400
+    if not 0 < seconds <= profiler.PROFILER_MAX_SECONDS:
+        return jsonify({'error': f'seconds must be between 0 and {profiler.PROFILER_MAX_SECONDS:g}'}), 400
+    if not 1 <= interval_ms <= 1000:
+        return jsonify({'error': 'interval_ms must be between 1 and 1000'}), 400
+
+    try:
+        profile_id = profiler.start_profile(seconds, interval_ms / 1000)
+        if profile_id is None:
+            return jsonify({'error': 'A profile is already running in this worker'}), 409
+        return jsonify({
+            'profile_id': profile_id,
+            'pid': os.getpid(),
+            'seconds': seconds,
+            'result': f'/api/admin/profile/{profile_id}'
+        }), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/profile/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """Collapsed stacks of a finished profile, one 'frame;frame;... count' per line"""
+    if not PROFILE_ID.match(profile_id):
+        return jsonify({'error': 'Profile not found'}), 404
+    status = profiler.profile_status(profile_id)
+    if status is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    if status == 'running':
+        return jsonify({'profile_id': profile_id, 'status': 'running'}), 202
+    with open(profiler.profile_path(profile_id)) as collapsed:
+        return Response(collapsed.read(), mimetype='text/plain')
@@ -1,12 +1,20 @@
-from flask import Blueprint, jsonify, request, current_app
-from src.models.property import Agent, PropertyLead, db
+from flask import Blueprint, jsonify, request, current_app, stream_with_context
+from sqlalchemy import case, func, select, tuple_
+from sqlalchemy.orm import selectinload
+from src.models.property import Agent, Property, PropertyLead, db
+from src.services.http_client import get_client, ProviderError
+from src.services.agent_locator import DEFAULT_SERVICE_RADIUS_MILES, MAX_SERVICE_RADIUS_MILES
+from src.services.agent_search import search_agent_index, SEARCH_PAGE_SIZE, SEARCH_MAX_PAGE_SIZE
+from src.routes.property import geocode_address, GEOCODER_API_KEY
 import os
 import json
+import math
 import re
 from datetime import datetime, timedelta
 from werkzeug.utils import secure_filename
-import requests
 import base64
+import csv
+import io
 
 agent_bp = Blueprint('agent', __name__)
 
@@ -14,6 +22,29 @@ agent_bp = Blueprint('agent', __name__)
 UPLOAD_FOLDER = 'uploads/agents'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf'}
 
+# State licensing board lookup - mock verification is used when not configured
+LICENSE_BOARD_API_KEY = os.getenv('LICENSE_BOARD_API_KEY')
+LICENSE_BOARD_BASE_URL = os.getenv('LICENSE_BOARD_BASE_URL', '')
+license_board_client = get_client(
+    'license_board',
+    LICENSE_BOARD_BASE_URL,
+    headers={'Authorization': f'Bearer {LICENSE_BOARD_API_KEY or ""}', 'Accept': 'application/json'}
+)
+
+# Lead listing pages - larger ?limit= values are capped, the rest is reached with ?cursor=
+LEADS_PAGE_SIZE = 50
+LEADS_MAX_PAGE_SIZE = int(os.getenv('LEADS_MAX_PAGE_SIZE', '200'))
+# Rows fetched from the database per round trip while streaming a lead export
+LEADS_EXPORT_CHUNK_SIZE = int(os.getenv('LEADS_EXPORT_CHUNK_SIZE', '1000'))
+
+# Lead export columns, in CSV column order
+LEAD_EXPORT_COLUMNS = (
+    PropertyLead.id, PropertyLead.created_at, PropertyLead.updated_at, PropertyLead.status,
+    PropertyLead.priority, PropertyLead.lead_type, PropertyLead.customer_name, PropertyLead.customer_email,
+    PropertyLead.customer_phone, PropertyLead.message, PropertyLead.property_id,
+    Property.normalized_address.label('property_address')
+)
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -31,12 +62,16 @@ def validate_license_number(license_number, state):
     return bool(re.match(pattern, license_number))
 
 def verify_license_with_state(license_number, state, agent_name):
-    """Verify license with state licensing board (mock implementation)"""
-    # In production, integrate with state licensing APIs
-    # For demo, simulate verification process
+    """Verify license with state licensing board"""
+    if not validate_license_number(license_number, state):
+        return {
+            'verified': False,
+            'status': 'Invalid',
+            'error': 'License number format invalid'
+        }
     
-    # Mock verification logic
-    if validate_license_number(license_number, state):
+    if not (LICENSE_BOARD_API_KEY and LICENSE_BOARD_BASE_URL):
+        # No licensing board configured - simulate a successful lookup
         return {
             'verified': True,
             'status': 'Active',
@@ -44,12 +79,23 @@ def verify_license_with_state(license_number, state, agent_name):
             'expiration_date': '2025-12-31',
             'disciplinary_actions': None
         }
-    else:
+    
+    try:
+        record = license_board_client.get(f'/licenses/{state}/{license_number}', params={'name': agent_name})
+    except ProviderError as e:
         return {
             'verified': False,
-            'status': 'Invalid',
-            'error': 'License number format invalid'
+            'status': 'Unavailable',
+            'error': str(e)
         }
+    
+    return {
+        'verified': record.get('status') == 'Active',
+        'status': record.get('status'),
+        'license_type': record.get('license_type'),
+        'expiration_date': record.get('expiration_date'),
+        'disciplinary_actions': record.get('disciplinary_actions')
+    }
 
 def verify_identity_documents(id_document_path, live_photo_path):
     """Verify identity using document and live photo comparison"""
@@ -72,6 +118,86 @@ def verify_identity_documents(id_document_path, live_photo_path):
     
     return {'verified': False, 'error': 'Missing documents'}
 
+def requested_lead_fields():
+    """Lead fields asked for with ?view=compact or ?fields=a,b - None means all"""
+    if request.args.get('view') == 'compact':
+        return PropertyLead.COMPACT_FIELDS
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return tuple(field.strip() for field in fields.split(',') if field.strip())
+
+def lead_loader_options(fields):
+    """Eager loads for the relationships the requested lead fields touch"""
+    # Lead views are per agent, and that agent is already in the session, so
+    # lead.agent resolves from the identity map without a query
+    if fields is None or 'property' in fields:
+        # The nested property includes its comparable sales
+        return [selectinload(PropertyLead.property).selectinload(Property.comparables)]
+    if 'property_address' in fields:
+        return [selectinload(PropertyLead.property)]
+    return []
+
+def encode_lead_cursor(lead):
+    """Opaque ?cursor= value for the page after `lead`"""
+    position = f'{lead.created_at.isoformat()}|{lead.id}'
+    return base64.urlsafe_b64encode(position.encode()).decode().rstrip('=')
+
+def decode_lead_cursor(cursor):
+    """(created_at, id) of the last lead already returned; ValueError if malformed"""
+    try:
+        position = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, lead_id = position.split('|')
+        return datetime.fromisoformat(created_at), int(lead_id)
+    except ValueError as e:  # bad base64, text or timestamp
+        raise ValueError('Invalid cursor') from e
+
+def requested_page_size():
+    """?limit=, capped at LEADS_MAX_PAGE_SIZE"""
+    return max(1, min(int(request.args.get('limit', LEADS_PAGE_SIZE)), LEADS_MAX_PAGE_SIZE))
+
+def leads_newest_first(agent_id, status=None):
+    """An agent's leads query in (created_at, id) descending order - the ix_property_leads_agent_created_id order"""
+    query = PropertyLead.query.filter_by(agent_id=agent_id)
+    if status:
+        query = query.filter_by(status=status)
+    return query.order_by(PropertyLead.created_at.desc(), PropertyLead.id.desc())
+
+def csv_line(values):
+    line = io.StringIO()
+    csv.writer(line).writerow(values)
+    return line.getvalue()
+
+def export_lines(agent_id, status, export_format):
+    """An agent's leads as NDJSON or CSV lines, a chunk of rows at a time"""
+    query = select(*LEAD_EXPORT_COLUMNS).outerjoin(Property, Property.id == PropertyLead.property_id).where(
+        PropertyLead.agent_id == agent_id
+    )
+    if status:
+        query = query.where(PropertyLead.status == status)
+    query = query.order_by(PropertyLead.created_at.desc(), PropertyLead.id.desc())
+    
+    names = [column.key for column in LEAD_EXPORT_COLUMNS]
+    if export_format == 'csv':
+        yield csv_line(names)
+    
+    # Plain rows rather than ORM objects, read yield_per at a time (a server-side
+    # cursor where the driver has one), so memory stays flat however many leads there are
+    result = db.session.execute(query.execution_options(yield_per=LEADS_EXPORT_CHUNK_SIZE))
+    dumps = current_app.json.dumps
+    for rows in result.partitions():
+        if export_format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow([value.isoformat() if isinstance(value, datetime) else value for value in row])
+            yield buffer.getvalue()
+        else:
+            yield ''.join(dumps({
+                name: value.isoformat() if isinstance(value, datetime) else value
+                for name, value in zip(names, row)
+            }) + '\n' for row in rows)
+
 def calculate_subscription_fee(tier, service_areas_count):
     """Calculate monthly subscription fee based on tier and coverage"""
     base_fees = {
@@ -89,6 +215,16 @@ def calculate_subscription_fee(tier, service_areas_count):
     
     return base_fee
 
+def bounded_number(data, field, low, high, default=None):
+    """A numeric request field within [low, high], or `default` when absent; ValueError otherwise"""
+    value = data.get(field)
+    if value is None:
+        return default
+    if (isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value)
+            or not low <= value <= high):
+        raise ValueError(f'{field} must be a number from {low:g} to {high:g}')
+    return float(value)
+
 @agent_bp.route('/agents/register', methods=['POST'])
 def register_agent():
     """Register a new agent with verification"""
@@ -101,6 +237,17 @@ def register_agent():
             if not data.get(field):
                 return jsonify({'error': f'{field} is required'}), 400
         
+        # Location and reach feed the coverage index, so they must be sane
+        try:
+            latitude = bounded_number(data, 'latitude', -90, 90)
+            longitude = bounded_number(data, 'longitude', -180, 180)
+            service_radius_miles = bounded_number(data, 'service_radius_miles', 0, MAX_SERVICE_RADIUS_MILES,
+                                                  default=DEFAULT_SERVICE_RADIUS_MILES)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if service_radius_miles <= 0:
+            return jsonify({'error': 'service_radius_miles must be greater than 0'}), 400
+        
         # Check if agent already exists
         existing_agent = Agent.query.filter_by(email=data['email']).first()
         if existing_agent:
@@ -117,9 +264,23 @@ def register_agent():
             years_experience=data.get('years_experience', 0),
             specialties=json.dumps(data.get('specialties', [])),
             service_areas=json.dumps(data.get('service_areas', [])),
-            subscription_tier=data.get('subscription_tier', 'basic')
+            subscription_tier=data.get('subscription_tier', 'basic'),
+            latitude=latitude,
+            longitude=longitude,
+            service_radius_miles=service_radius_miles
         )
         
+        # Place the agent at their first service area when no point was given.
+        # Without a geocoder key the lookup would be a random Austin point,
+        # so the agent stays out of location matching as on a failed lookup.
+        if (agent.latitude is None or agent.longitude is None) and data.get('service_areas') and GEOCODER_API_KEY:
+            try:
+                location = geocode_address(str(data['service_areas'][0]))
+                agent.latitude = location['latitude']
+                agent.longitude = location['longitude']
+            except ProviderError:
+                pass  # stays out of location matching until a point is set
+        
         # Calculate subscription fee
         service_areas_count = len(data.get('service_areas', []))
         agent.monthly_fee = calculate_subscription_fee(
@@ -320,25 +481,51 @@ def get_agent_leads(agent_id):
         
         # Get query parameters
         status = request.args.get('status')
-        limit = int(request.args.get('limit', 50))
-        
-        # Build query
-        query = PropertyLead.query.filter_by(agent_id=agent_id)
-        
-        if status:
-            query = query.filter_by(status=status)
-        
-        leads = query.order_by(PropertyLead.created_at.desc()).limit(limit).all()
+        try:
+            limit = requested_page_size()
+            cursor = request.args.get('cursor')
+            after = decode_lead_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Keyset pagination: the page starts after the last lead of the previous one
+        query = leads_newest_first(agent_id, status)
+        if after:
+            query = query.filter(tuple_(PropertyLead.created_at, PropertyLead.id) < after)
+        
+        # One extra row tells whether there is a next page
+        fields = requested_lead_fields()
+        leads = query.options(*lead_loader_options(fields)).limit(limit + 1).all()
+        next_cursor = encode_lead_cursor(leads[limit - 1]) if len(leads) > limit else None
+        leads = leads[:limit]
         
         return jsonify({
-            'leads': [lead.to_dict() for lead in leads],
+            'leads': [lead.to_dict(fields) for lead in leads],
             'count': len(leads),
+            'next_cursor': next_cursor,
             'agent': agent.to_dict()
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@agent_bp.route('/agents/<int:agent_id>/leads/export', methods=['GET'])
+def export_agent_leads(agent_id):
+    """Stream all of an agent's leads, newest first, as NDJSON (default) or ?format=csv"""
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    
+    if db.session.get(Agent, agent_id) is None:
+        return jsonify({'error': 'Agent not found'}), 404
+    
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    response = current_app.response_class(
+        stream_with_context(export_lines(agent_id, request.args.get('status'), export_format)), mimetype=mimetype
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename=agent-{agent_id}-leads.{export_format}'
+    return response
+
 @agent_bp.route('/agents/<int:agent_id>/update-lead-status', methods=['POST'])
 def update_lead_status(agent_id):
     """Update lead status by agent"""
@@ -376,33 +563,41 @@ def update_lead_status(agent_id):
 
 @agent_bp.route('/agents/search', methods=['GET'])
 def search_agents():
-    """Search for verified agents"""
+    """Search verified agents by text, with filters, facet counts and pages"""
     try:
         # Get query parameters
+        text = request.args.get('q')
         state = request.args.get('state')
         city = request.args.get('city')
         specialty = request.args.get('specialty')
-        min_rating = float(request.args.get('min_rating', 0))
-        
-        # Build query for verified, active agents
-        query = Agent.query.filter(
-            Agent.subscription_active == True,
-            Agent.license_verified == True,
-            Agent.identity_verified == True,
-            Agent.rating >= min_rating
+        tier = request.args.get('tier')
+        # facets=false skips the facet counts, e.g. when fetching later pages
+        with_facets = request.args.get('facets', 'true').lower() not in ('0', 'false')
+        try:
+            min_rating = float(request.args.get('min_rating', 0))
+            page = max(1, int(request.args.get('page', 1)))
+            per_page = max(1, min(int(request.args.get('limit', SEARCH_PAGE_SIZE)), SEARCH_MAX_PAGE_SIZE))
+        except ValueError:
+            return jsonify({'error': 'min_rating, page and limit must be numbers'}), 400
+        
+        agents, scores, total, facets = search_agent_index(
+            text=text, state=state, city=city, specialty=specialty, tier=tier,
+            min_rating=min_rating, page=page, per_page=per_page, facets=with_facets
         )
         
-        if state:
-            query = query.filter_by(license_state=state)
-        
-        if specialty:
-            query = query.filter(Agent.specialties.contains(specialty))
-        
-        agents = query.order_by(Agent.rating.desc()).limit(20).all()
+        results = []
+        for agent, score in zip(agents, scores):
+            result = agent.to_dict()
+            result['score'] = score
+            results.append(result)
         
         return jsonify({
-            'agents': [agent.to_dict() for agent in agents],
-            'count': len(agents)
+            'agents': results,
+            'count': len(results),
+            'total': total,
+            'page': page,
+            'next_page': page + 1 if page * per_page < total else None,
+            'facets': facets
         })
         
     except Exception as e:
@@ -415,16 +610,14 @@ def get_agent_profile(agent_id):
         agent = Agent.query.get_or_404(agent_id)
         
         # Get recent leads and performance metrics
-        recent_leads = PropertyLead.query.filter_by(
-            agent_id=agent_id
-        ).order_by(PropertyLead.created_at.desc()).limit(10).all()
+        fields = requested_lead_fields()
+        recent_leads = leads_newest_first(agent_id).options(*lead_loader_options(fields)).limit(10).all()
         
-        # Calculate performance metrics
-        total_leads = PropertyLead.query.filter_by(agent_id=agent_id).count()
-        converted_leads = PropertyLead.query.filter_by(
-            agent_id=agent_id, 
-            status='converted'
-        ).count()
+        # Calculate performance metrics - both counts in one pass over the agent's leads
+        total_leads, converted_leads = db.session.query(
+            func.count(PropertyLead.id),
+            func.coalesce(func.sum(case((PropertyLead.status == 'converted', 1), else_=0)), 0)
+        ).filter(PropertyLead.agent_id == agent_id).one()
         
         conversion_rate = (converted_leads / total_leads * 100) if total_leads > 0 else 0
         
@@ -437,7 +630,7 @@ def get_agent_profile(agent_id):
                 'avg_response_time': '2.3 hours',  # Mock data
                 'client_satisfaction': agent.rating
             },
-            'recent_leads': [lead.to_dict() for lead in recent_leads]
+            'recent_leads': [lead.to_dict(fields) for lead in recent_leads]
         })
         
         return jsonify(profile)
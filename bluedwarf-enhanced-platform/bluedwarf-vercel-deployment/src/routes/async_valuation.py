@@ -0,0 +1,161 @@
+from flask import jsonify, request, current_app
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from src.models.property import Property, db
+from src.routes.property import (
+    GEOCODER_API_KEY, RENTCAST_API_KEY, ATTOM_API_KEY, PROVIDER_TIMEOUTS,
+    geocoder_client as sync_geocoder_client, rentcast_client as sync_rentcast_client,
+    attom_client as sync_attom_client,
+    normalize_address, mock_geocode_data, geocode_result, mock_rentcast_data, rentcast_result,
+    mock_attom_data, attom_params, attom_result, find_local_agents, is_fresh, is_servable_stale,
+    stored_valuation_response, providers_unavailable, apply_provider_data, valuation_response
+)
+from src.services.address import address_key
+from src.services.async_db import async_database_url, get_async_sessionmaker
+from src.services.http_client import get_async_client
+from src.services.instrumentation import span
+from src.services.popularity import request_counter
+from src.services.providers import async_fan_out
+from src.services.valuation_cache import get_cached_valuation, coalesced_valuation_async
+from functools import partial
+import asyncio
+import importlib.util
+import os
+
+# api/asgi.py serves POST /api/valuation from here when httpx and an async
+# database driver (aiosqlite, asyncpg) are installed: providers are awaited
+# together and the database is reached through an AsyncSession, so a
+# valuation waiting on I/O holds no thread. ASYNC_VALUATION=0 keeps the
+# WSGI view under ASGI servers too.
+ASYNC_VALUATION = os.getenv('ASYNC_VALUATION', '1').lower() not in ('0', 'false', 'no')
+
+def async_provider_client(client):
+    """Async twin of a sync provider client, with the same URL and credentials"""
+    return get_async_client(client.name, client.base_url, headers=client.headers, params=client.params)
+
+geocoder_client = async_provider_client(sync_geocoder_client)
+rentcast_client = async_provider_client(sync_rentcast_client)
+attom_client = async_provider_client(sync_attom_client)
+
+def async_valuation_available(app):
+    """True if the async path is enabled and its optional dependencies are installed"""
+    return (ASYNC_VALUATION
+            and importlib.util.find_spec('httpx') is not None
+            and async_database_url(app.config['SQLALCHEMY_DATABASE_URI']) is not None)
+
+async def geocode_address_async(address):
+    """Get latitude/longitude for address"""
+    if not GEOCODER_API_KEY:
+        return mock_geocode_data()
+    return geocode_result(await geocoder_client.get('/json', params={'address': address}))
+
+async def get_rentcast_data_async(address):
+    """Fetch property data from RentCast API"""
+    if not RENTCAST_API_KEY:
+        return mock_rentcast_data()
+    # The record, value and rent lookups are independent, so they go out together
+    records, value, rent = await asyncio.gather(
+        rentcast_client.get('/properties', params={'address': address, 'limit': 1}),
+        rentcast_client.get('/avm/value', params={'address': address, 'compCount': 5}),
+        rentcast_client.get('/avm/rent/long-term', params={'address': address})
+    )
+    return rentcast_result(records, value, rent)
+
+async def get_attom_data_async(address):
+    """Fetch property data from ATTOM Data API"""
+    if not ATTOM_API_KEY:
+        return mock_attom_data()
+    return attom_result(await attom_client.get('/property/expandedprofile', params=attom_params(address)))
+
+async def fetch_provider_data_async(address):
+    """Await geocoding, RentCast and ATTOM together for an address"""
+    return await async_fan_out({
+        'geocode': partial(geocode_address_async, address),
+        'rentcast': partial(get_rentcast_data_async, address),
+        'attom': partial(get_attom_data_async, address)
+    }, timeouts=PROVIDER_TIMEOUTS)
+
+def nearby_agents(session, property_record):
+    return find_local_agents(property_record.latitude, property_record.longitude, session=session)
+
+async def value_address_async(address, key):
+    """Value an address from the database or providers; returns (body, status)"""
+    session_factory = get_async_sessionmaker(current_app.config['SQLALCHEMY_DATABASE_URI'])
+    async with session_factory() as session:
+        with span('lookup'):
+            existing_property = await session.scalar(
+                select(Property).where(Property.address_key == key)
+                .options(selectinload(Property.comparables)).limit(1)
+            )
+        
+        if is_fresh(existing_property):
+            with span('agents'):
+                local_agents = await session.run_sync(nearby_agents, existing_property)
+            return stored_valuation_response(existing_property, local_agents)
+        
+        if is_servable_stale(existing_property):
+            with span('agents'):
+                local_agents = await session.run_sync(nearby_agents, existing_property)
+            return stored_valuation_response(existing_property, local_agents, stale=True)
+        
+        with span('providers'):
+            provider_results, provider_failures = await fetch_provider_data_async(address)
+        if not provider_results.get('rentcast') and not provider_results.get('attom'):
+            return providers_unavailable(provider_failures)
+        
+        property_record = existing_property or Property(
+            address=address, normalized_address=normalize_address(address), address_key=key
+        )
+        apply_provider_data(property_record, provider_results, provider_failures)
+        if not existing_property:
+            session.add(property_record)
+        
+        try:
+            with span('commit'):
+                await session.commit()
+        except IntegrityError:
+            # Another worker saved this address first - serve its fresh row
+            await session.rollback()
+            if existing_property:
+                raise
+            property_record = None
+        
+        if property_record is not None:
+            with span('agents'):
+                local_agents = await session.run_sync(nearby_agents, property_record)
+            return valuation_response(property_record, local_agents, provider_failures)
+    
+    return await value_address_async(address, key)
+
+async def get_instant_valuation_async():
+    """Get instant property valuation - async variant of property.get_instant_valuation"""
+    try:
+        data = request.json
+        address = data.get('address', '').strip()
+        
+        if not address:
+            return jsonify({'error': 'Address is required'}), 400
+        
+        key = address_key(address)
+        if request_counter.record(key):
+            # The counts go out through the sync engine, off the event loop
+            await asyncio.to_thread(request_counter.flush, db.engine)
+        
+        with span('cache'):
+            cached_body = get_cached_valuation(key)
+        if cached_body is not None:
+            return current_app.response_class(cached_body, mimetype='application/json')
+        
+        body, status = await coalesced_valuation_async(
+            key, partial(value_address_async, address, key)
+        )
+        return current_app.response_class(body, status=status, mimetype='application/json')
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# (method, path) -> coroutine view, served on the event loop by api/asgi.py
+ASYNC_ROUTES = {
+    ('POST', '/api/valuation'): get_instant_valuation_async
+}
@@ -0,0 +1,310 @@
+from flask import Blueprint, jsonify, request, current_app, stream_with_context
+from sqlalchemy import inspect, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from src.models.property import Property, db
+from src.routes.property import (
+    normalize_address, fetch_provider_data, find_local_agents, is_fresh, value_address, count_request,
+    stored_valuation_response, providers_unavailable, apply_provider_data, valuation_response
+)
+from src.services.address import address_key
+from src.services.valuation_cache import (
+    get_cached_valuation, coalesced_valuation, claim_valuation, settle_valuation
+)
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+import csv
+import io
+import os
+
+batch_bp = Blueprint('batch', __name__)
+
+# Batch valuation limits
+BATCH_MAX_ADDRESSES = int(os.getenv('BATCH_MAX_ADDRESSES', '10000'))
+# Addresses fetched from the providers at once, per batch request
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '8'))
+# New valuations written (and streamed) per bulk insert
+BATCH_WRITE_SIZE = int(os.getenv('BATCH_WRITE_SIZE', '100'))
+
+# CSV columns joined into an address when there is no "address" column
+CSV_ADDRESS_PARTS = ('street', 'city', 'state', 'zip')
+
+def read_batch_addresses():
+    """Addresses from a JSON list, {"addresses": [...]}, an uploaded CSV file or a text/csv body"""
+    upload = request.files.get('file')
+    if upload is not None:
+        return csv_addresses(upload.read().decode('utf-8-sig'))
+    if request.mimetype == 'text/csv':
+        return csv_addresses(request.get_data(as_text=True))
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('addresses')
+    if not isinstance(data, list):
+        raise ValueError('Send a JSON list of addresses, {"addresses": [...]}, or a CSV file')
+    addresses = []
+    for position, item in enumerate(data):
+        address = item.get('address') if isinstance(item, dict) else item
+        if address is None:
+            address = ''
+        if not isinstance(address, str):
+            raise ValueError(f'Address {position} is not a string')
+        addresses.append(address)
+    return addresses
+
+def csv_addresses(text):
+    """Addresses from CSV text
+
+    Uses an "address" column, or street/city/state/zip columns, when the
+    first row names them. Otherwise every row is one whole address, so an
+    unquoted "123 Main St, Austin, TX 78701" line still works.
+    """
+    rows = [row for row in csv.reader(io.StringIO(text)) if any(cell.strip() for cell in row)]
+    if not rows:
+        return []
+    header = [cell.strip().lower() for cell in rows[0]]
+    if 'address' in header:
+        column = header.index('address')
+        return [row[column] if column < len(row) else '' for row in rows[1:]]
+    columns = [header.index(name) for name in CSV_ADDRESS_PARTS if name in header]
+    if columns:
+        rows = [[row[column] for column in columns if column < len(row)] for row in rows[1:]]
+    return [', '.join(cell.strip() for cell in row if cell.strip()) for row in rows]
+
+def group_addresses(addresses):
+    """{address key: (first spelling, [input positions])} plus the positions of blank inputs"""
+    groups = {}
+    blank = []
+    for position, address in enumerate(addresses):
+        address = address.strip()
+        if not address:
+            blank.append(position)
+            continue
+        key = address_key(address)
+        if key in groups:
+            groups[key][1].append(position)
+        else:
+            groups[key] = (address, [position])
+    return groups, blank
+
+def result_line(inputs, address, body, status):
+    """One NDJSON line; `body` is the serialized /api/valuation response"""
+    if isinstance(body, bytes):
+        body = body.decode()  # as read back from Redis
+    prefix = current_app.json.dumps({'inputs': inputs, 'address': address, 'status': status})
+    return f'{prefix[:-1]}, "valuation": {body}}}\n'
+
+def error_line(inputs, address, status, error):
+    return current_app.json.dumps({'inputs': inputs, 'address': address, 'status': status, 'error': error}) + '\n'
+
+def claim_and_fetch(key, address):
+    """(claim, provider results, provider failures); all None if another request is valuing the address"""
+    claim = claim_valuation(key)
+    if claim is None:
+        return None, None, None
+    try:
+        return (claim,) + tuple(fetch_provider_data(address))
+    except Exception:
+        settle_valuation(claim)
+        raise
+
+def abandon_claim(future):
+    """Give up the claim behind a fetch whose result was never used"""
+    if not future.cancelled() and future.exception() is None and future.result()[0] is not None:
+        settle_valuation(future.result()[0])
+
+def valued_records(groups, stale):
+    """Claim and fetch provider data for addresses with bounded concurrency, yielding as each finishes
+
+    Yields (address key, claim, provider results, provider failures); the
+    caller settles each claim. Work not yet started is cancelled if the
+    client goes away, and claims it never saw are given up.
+    """
+    pool = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix='batch')
+    futures = {}
+    try:
+        futures = {pool.submit(claim_and_fetch, key, groups[key][0]): key for key in stale}
+        for future in as_completed(futures):
+            key = futures.pop(future)
+            yield (key,) + future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        for future in futures:
+            future.add_done_callback(abandon_claim)
+
+def rebuilt_record(record, saved):
+    """The row to write for a record after a rolled back flush
+
+    A new record becomes the row another request saved for its address, or
+    a fresh copy: the rollback left it transient. Stale rows stay as they
+    are, their unflushed changes discarded.
+    """
+    if inspect(record).persistent:
+        return record
+    return saved.get(record.address_key) or Property(
+        address=record.address, normalized_address=record.normalized_address, address_key=record.address_key
+    )
+
+def write_batch(pending, groups, claims):
+    """Bulk-insert new rows and update stale ones, then return their NDJSON lines
+
+    `pending` holds (record, provider results, provider failures). Each
+    address's (body, status) also settles its claim, answering requests
+    that waited on it.
+    """
+    new_keys = {record.address_key for record, _, _ in pending if record.id is None}
+    while True:
+        try:
+            db.session.add_all([record for record, _, _ in pending])
+            db.session.flush()
+            break
+        except IntegrityError:
+            # Another request saved some of these addresses first; the rows
+            # it wrote take the provider data already fetched for them
+            db.session.rollback()
+            saved = {
+                record.address_key: record
+                for record in db.session.scalars(
+                    select(Property).where(Property.address_key.in_(new_keys))
+                    .options(selectinload(Property.comparables))
+                )
+            }
+            if not saved:
+                raise
+            new_keys -= saved.keys()
+            pending = [
+                (rebuilt_record(record, saved), provider_results, provider_failures)
+                for record, provider_results, provider_failures in pending
+            ]
+            for record, provider_results, provider_failures in pending:
+                apply_provider_data(record, provider_results, provider_failures)
+
+    lines = []
+    results = []
+    for record, _, provider_failures in pending:
+        address, inputs = groups[record.address_key]
+        local_agents = find_local_agents(record.latitude, record.longitude)
+        body, status = valuation_response(record, local_agents, provider_failures)
+        results.append((record.address_key, (body, status)))
+        lines.append(result_line(inputs, address, body, status))
+    db.session.commit()
+    # Only once committed, so the requests let through find the row
+    for key, result in results:
+        settle_valuation(claims.pop(key), result)
+    return lines
+
+def generate_batch(total, groups, blank):
+    counts = {'addresses': total, 'unique': len(groups), 'cached': 0, 'valued': 0, 'failed': len(blank)}
+    if blank:
+        yield error_line(blank, '', 400, 'Address is required')
+
+    # Responses still in the in-process cache go out first
+    misses = []
+    for key, (address, inputs) in groups.items():
+        count_request(key)
+        cached_body = get_cached_valuation(key)
+        if cached_body is not None:
+            counts['cached'] += 1
+            yield result_line(inputs, address, cached_body, 200)
+        else:
+            misses.append(key)
+
+    # Then every stored property in one IN query; recent ones are served as they are
+    existing = {
+        record.address_key: record
+        for record in db.session.scalars(
+            select(Property).where(Property.address_key.in_(misses)).options(selectinload(Property.comparables))
+        )
+    } if misses else {}
+    stale = []
+    for key in misses:
+        record = existing.get(key)
+        if is_fresh(record):
+            address, inputs = groups[key]
+            body, status = stored_valuation_response(record, find_local_agents(record.latitude, record.longitude))
+            counts['cached'] += 1
+            yield result_line(inputs, address, body, status)
+        else:
+            stale.append(key)
+    # End the read transaction before the slow part; close() keeps the stale
+    # rows loaded (detached) so they can be updated without being reloaded
+    db.session.close()
+
+    # The rest go to the providers and are written back in bulk as they
+    # finish. Each is claimed first, like a single /api/valuation request, so
+    # concurrent requests for it wait for this batch instead of fetching too.
+    pending = []
+    claims = {}
+    followers = []
+    try:
+        for key, claim, provider_results, provider_failures in valued_records(groups, stale):
+            address, inputs = groups[key]
+            if claim is None:
+                followers.append(key)
+                continue
+            claims[key] = claim
+            if not provider_results.get('rentcast') and not provider_results.get('attom'):
+                body, status = providers_unavailable(provider_failures)
+                settle_valuation(claims.pop(key), (body, status))
+                counts['failed'] += 1
+                yield result_line(inputs, address, body, status)
+                continue
+            record = existing.get(key) or Property(
+                address=address, normalized_address=normalize_address(address), address_key=key
+            )
+            apply_provider_data(record, provider_results, provider_failures)
+            pending.append((record, provider_results, provider_failures))
+            if len(pending) >= BATCH_WRITE_SIZE:
+                counts['valued'] += len(pending)
+                yield ''.join(write_batch(pending, groups, claims))
+                pending = []
+        if pending:
+            counts['valued'] += len(pending)
+            yield ''.join(write_batch(pending, groups, claims))
+    finally:
+        # Claims not written (client gone, or an error): their waiters value the addresses themselves
+        for claim in claims.values():
+            settle_valuation(claim)
+
+    # Addresses another request was already valuing share its result. They
+    # are waited for only now, holding no claims, so two batches waiting on
+    # each other's addresses cannot stall until the locks expire.
+    for key in followers:
+        address, inputs = groups[key]
+        body, status = coalesced_valuation(key, partial(value_address, address, key))
+        counts['valued' if status == 200 else 'failed'] += 1
+        yield result_line(inputs, address, body, status)
+
+    yield current_app.json.dumps({'summary': counts}) + '\n'
+
+def stream_batch(total, groups, blank):
+    """generate_batch's lines, ending with an error line if it fails part way"""
+    try:
+        yield from generate_batch(total, groups, blank)
+    except Exception as e:
+        # The status line has gone out; the client learns of the failure here
+        db.session.rollback()
+        yield current_app.json.dumps({'status': 500, 'error': str(e)}) + '\n'
+
+@batch_bp.route('/valuation/batch', methods=['POST'])
+def batch_valuation():
+    """Value many addresses at once, streaming one NDJSON line per distinct address"""
+    try:
+        addresses = read_batch_addresses()
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not addresses:
+        return jsonify({'error': 'No addresses given'}), 400
+    if len(addresses) > BATCH_MAX_ADDRESSES:
+        return jsonify({'error': f'At most {BATCH_MAX_ADDRESSES} addresses per batch'}), 413
+
+    # Grouped before the response starts, so bad input is still a plain error
+    try:
+        groups, blank = group_addresses(addresses)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    return current_app.response_class(
+        stream_with_context(stream_batch(len(addresses), groups, blank)), mimetype='application/x-ndjson'
+    )
@@ -1,42 +1,135 @@
-from flask import Blueprint, jsonify, request
-from src.models.property import Property, Agent, PropertyLead, db
-import requests
-import json
-import re
-from datetime import datetime, timedelta
+from flask import Blueprint, jsonify, request, current_app
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from src.models.property import Property, Agent, PropertyLead, ComparableSale, db
+from src.services.providers import fan_out, gather_calls, PROVIDER_TIMEOUT
+from src.services.valuation import calculate_ai_valuation
+from src.services.address import canonicalize_address, address_key
+from src.services.agent_locator import find_agents_near
+from src.services.lead_quota import record_lead
+from src.services.payload_archive import archive_payloads, load_payloads
+from src.services.popularity import request_counter
+from src.services.http_client import get_client, all_client_stats, ProviderError
+from src.services.instrumentation import span
+from src.services.valuation_cache import (
+    valuation_cache, get_cached_valuation, cache_valuation, coalesced_valuation
+)
+from functools import partial
+import os
+from datetime import date, datetime, timedelta
 import random
 
 property_bp = Blueprint('property', __name__)
 
-# Mock API configuration (replace with real API keys)
-RENTCAST_API_KEY = "your_rentcast_api_key"
-ATTOM_API_KEY = "your_attom_api_key"
+# Provider API configuration - mock data is returned when a key is not set
+RENTCAST_API_KEY = os.getenv('RENTCAST_API_KEY')
+ATTOM_API_KEY = os.getenv('ATTOM_API_KEY')
+GEOCODER_API_KEY = os.getenv('GEOCODER_API_KEY')
+
+rentcast_client = get_client(
+    'rentcast',
+    os.getenv('RENTCAST_BASE_URL', 'https://api.rentcast.io/v1'),
+    headers={'X-Api-Key': RENTCAST_API_KEY or '', 'Accept': 'application/json'}
+)
+attom_client = get_client(
+    'attom',
+    os.getenv('ATTOM_BASE_URL', 'https://api.gateway.attomdata.com/propertyapi/v1.0.0'),
+    headers={'apikey': ATTOM_API_KEY or '', 'Accept': 'application/json'}
+)
+geocoder_client = get_client(
+    'geocoder',
+    os.getenv('GEOCODER_BASE_URL', 'https://maps.googleapis.com/maps/api/geocode'),
+    params={'key': GEOCODER_API_KEY or ''}
+)
+
+# Valuations younger than this are served without calling the providers
+VALUATION_MAX_AGE = timedelta(hours=24)
+# Stale-while-revalidate: for this long past VALUATION_MAX_AGE a stored
+# valuation is still served (marked stale) and left for the refresh worker
+# (src/refresh_worker.py) to update. 0 - the default, for deployments
+# without the worker - makes the requesting user wait for the providers.
+VALUATION_STALE_MAX_AGE = timedelta(hours=float(os.getenv('VALUATION_STALE_HOURS', '0')))
+
+# Per-provider timeouts (seconds) for the valuation fan-out
+PROVIDER_TIMEOUTS = {
+    'geocode': float(os.getenv('GEOCODE_TIMEOUT', PROVIDER_TIMEOUT)),
+    'rentcast': float(os.getenv('RENTCAST_TIMEOUT', PROVIDER_TIMEOUT)),
+    'attom': float(os.getenv('ATTOM_TIMEOUT', PROVIDER_TIMEOUT))
+}
 
 def normalize_address(address):
-    """Normalize address format for consistent lookup"""
-    # Remove extra spaces and standardize format
-    address = re.sub(r'\s+', ' ', address.strip())
-    # Add basic normalization logic
-    return address.title()
+    """Normalize address format for display"""
+    # Canonical USPS form; lookups use address_key(), which is shared by
+    # spellings of the same street, unit and ZIP ("123 main st., Austin TX
+    # 78701" and "123 Main Street, Austin, TX 78701"). An address without a
+    # ZIP gets a different key.
+    return canonicalize_address(address).canonical
 
 def geocode_address(address):
-    """Get latitude/longitude for address (mock implementation)"""
-    # In production, use Google Maps API or similar
-    # For demo, return mock coordinates
+    """Get latitude/longitude for address"""
+    if not GEOCODER_API_KEY:
+        return mock_geocode_data()
+    
+    return geocode_result(geocoder_client.get('/json', params={'address': address}))
+
+def mock_geocode_data():
+    """Mock Austin-area coordinates used when no geocoder is configured"""
     return {
         'latitude': 30.2672 + random.uniform(-0.1, 0.1),
         'longitude': -97.7431 + random.uniform(-0.1, 0.1)
     }
 
+def geocode_result(payload):
+    """Coordinates from a geocoder response"""
+    results = payload.get('results') or []
+    if not results:
+        raise ProviderError(f"geocoder returned {payload.get('status', 'no results')}")
+    location = results[0]['geometry']['location']
+    return {
+        'latitude': location['lat'],
+        'longitude': location['lng']
+    }
+
 def get_rentcast_data(address):
     """Fetch property data from RentCast API"""
-    # Mock implementation - replace with real API call
-    # url = f"https://api.rentcast.io/v1/properties/search"
-    # headers = {"X-Api-Key": RENTCAST_API_KEY}
-    # params = {"address": address}
-    # response = requests.get(url, headers=headers, params=params)
+    if not RENTCAST_API_KEY:
+        return mock_rentcast_data()
     
-    # Mock data for demonstration
+    # The record, value and rent lookups are independent, so they go out together
+    records, value, rent = gather_calls(
+        partial(rentcast_client.get, '/properties', params={'address': address, 'limit': 1}),
+        partial(rentcast_client.get, '/avm/value', params={'address': address, 'compCount': 5}),
+        partial(rentcast_client.get, '/avm/rent/long-term', params={'address': address})
+    )
+    return rentcast_result(records, value, rent)
+
+def rentcast_result(records, value, rent):
+    """Property payload from the RentCast record, value and rent responses"""
+    details = records[0] if records else {}
+    return {
+        "property": {
+            "bedrooms": details.get('bedrooms'),
+            "bathrooms": details.get('bathrooms'),
+            "squareFootage": details.get('squareFootage'),
+            "lotSize": details.get('lotSize'),
+            "yearBuilt": details.get('yearBuilt'),
+            "propertyType": details.get('propertyType'),
+            "rentEstimate": rent.get('rent'),
+            "valueEstimate": value.get('price')
+        },
+        "comparables": [
+            {
+                "address": comp.get('formattedAddress'),
+                "salePrice": comp.get('price'),
+                "saleDate": (comp.get('lastSeenDate') or comp.get('listedDate') or '')[:10],
+                "squareFootage": comp.get('squareFootage')
+            }
+            for comp in value.get('comparables', [])
+        ]
+    }
+
+def mock_rentcast_data():
+    """Mock RentCast payload used when no API key is configured"""
     return {
         "property": {
             "bedrooms": random.randint(2, 5),
@@ -66,7 +159,43 @@ def get_rentcast_data(address):
 
 def get_attom_data(address):
     """Fetch property data from ATTOM Data API"""
-    # Mock implementation - replace with real API call
+    if not ATTOM_API_KEY:
+        return mock_attom_data()
+    
+    return attom_result(attom_client.get('/property/expandedprofile', params=attom_params(address)))
+
+def attom_params(address):
+    """ATTOM wants the street line and the city/state line separately"""
+    street, _, locality = address.partition(',')
+    return {
+        'address1': street.strip(),
+        'address2': locality.strip()
+    }
+
+def attom_result(payload):
+    """Property payload from an ATTOM expanded profile response"""
+    records = payload.get('property') or []
+    if not records:
+        raise ProviderError('attom returned no property record')
+    record = records[0]
+    assessment = record.get('assessment', {})
+    sale = record.get('sale', {})
+    
+    return {
+        "property": {
+            "assessedValue": assessment.get('assessed', {}).get('assdttlvalue'),
+            "marketValue": assessment.get('market', {}).get('mktttlvalue'),
+            "taxAmount": assessment.get('tax', {}).get('taxamt'),
+            "lastSalePrice": sale.get('amount', {}).get('saleamt'),
+            "lastSaleDate": sale.get('saleTransDate')
+        },
+        # Neighborhood statistics come from ATTOM's community API, which is
+        # not part of the expanded profile
+        "neighborhood": {}
+    }
+
+def mock_attom_data():
+    """Mock ATTOM payload used when no API key is configured"""
     return {
         "property": {
             "assessedValue": random.randint(250000, 700000),
@@ -82,68 +211,213 @@ def get_attom_data(address):
         }
     }
 
-def calculate_ai_valuation(rentcast_data, attom_data, property_details):
-    """AI-powered valuation algorithm combining multiple data sources"""
+def fetch_provider_data(address, providers=None):
+    """Query geocoding, RentCast and ATTOM concurrently for an address"""
+    providers = providers or {
+        'geocode': geocode_address,
+        'rentcast': get_rentcast_data,
+        'attom': get_attom_data
+    }
+    return fan_out(
+        {name: partial(fn, address) for name, fn in providers.items()},
+        timeouts=PROVIDER_TIMEOUTS
+    )
+
+def remember_valuation(key, result, updated_at):
+    """Cache the finished response body until the property goes stale"""
+    fresh_for = (updated_at + VALUATION_MAX_AGE - datetime.utcnow()).total_seconds()
+    body = current_app.json.dumps(dict(result, cached=True))
+    cache_valuation(key, body, fresh_for)
+
+def find_local_agents(latitude, longitude, property_type="Single Family", session=None):
+    """Find verified agents in the area"""
+    session = session or db.session
+    if latitude is None or longitude is None:
+        # No location to match against - fall back to the best rated agents
+        agents = session.scalars(select(Agent).where(
+            Agent.subscription_active == True,
+            Agent.license_verified == True,
+            Agent.identity_verified == True
+        ).order_by(Agent.rating.desc()).limit(5)).all()
+        return [agent.to_dict() for agent in agents]
     
-    # Extract values from different sources
-    rentcast_value = rentcast_data.get('property', {}).get('valueEstimate', 0)
-    attom_market_value = attom_data.get('property', {}).get('marketValue', 0)
-    attom_assessed_value = attom_data.get('property', {}).get('assessedValue', 0)
+    # Agents whose service area covers the point, via the geohash cell index
+    return [
+        dict(agent.to_dict(), distance_miles=round(distance, 1))
+        for agent, distance in find_agents_near(latitude, longitude, limit=5, session=session)
+    ]
+
+def value_address(address, key):
+    """Value an address from the database or providers; returns (body, status)"""
+    # Check if we have recent data for this property
+    with span('lookup'):
+        existing_property = Property.query.filter_by(address_key=key).first()
     
-    # Weighted ensemble approach (simplified)
-    weights = {
-        'rentcast': 0.4,
-        'attom_market': 0.35,
-        'attom_assessed': 0.25
-    }
+    # If data is less than 24 hours old, return cached result
+    if is_fresh(existing_property):
+        with span('agents'):
+            local_agents = find_local_agents(existing_property.latitude, existing_property.longitude)
+        return stored_valuation_response(existing_property, local_agents)
     
-    # Calculate weighted average
-    weighted_value = (
-        rentcast_value * weights['rentcast'] +
-        attom_market_value * weights['attom_market'] +
-        attom_assessed_value * weights['attom_assessed']
-    )
+    # A little older is still served while the refresh worker catches up
+    if is_servable_stale(existing_property):
+        with span('agents'):
+            local_agents = find_local_agents(existing_property.latitude, existing_property.longitude)
+        return stored_valuation_response(existing_property, local_agents, stale=True)
     
-    # Apply property-specific adjustments
-    sqft = property_details.get('square_feet', 2000)
-    year_built = property_details.get('year_built', 2000)
+    # Fetch data from all sources at once; late or failed providers are dropped
+    with span('providers'):
+        provider_results, provider_failures = fetch_provider_data(address)
+    if not provider_results.get('rentcast') and not provider_results.get('attom'):
+        return providers_unavailable(provider_failures)
     
-    # Age adjustment
-    current_year = datetime.now().year
-    age = current_year - year_built
-    if age < 5:
-        age_multiplier = 1.05  # New construction premium
-    elif age < 15:
-        age_multiplier = 1.0
-    elif age < 30:
-        age_multiplier = 0.95
+    # Create or update property record
+    if existing_property:
+        property_record = existing_property
     else:
-        age_multiplier = 0.90
+        property_record = Property()
+        property_record.address = address
+        property_record.normalized_address = normalize_address(address)
+        property_record.address_key = key
+    apply_provider_data(property_record, provider_results, provider_failures)
     
-    final_value = int(weighted_value * age_multiplier)
+    if not existing_property:
+        db.session.add(property_record)
     
-    # Calculate confidence score based on data availability and consistency
-    values = [v for v in [rentcast_value, attom_market_value, attom_assessed_value] if v > 0]
-    if len(values) >= 2:
-        variance = max(values) - min(values)
-        avg_value = sum(values) / len(values)
-        confidence = max(0.7, 1.0 - (variance / avg_value))
-    else:
-        confidence = 0.6
+    try:
+        with span('commit'):
+            db.session.commit()
+    except IntegrityError:
+        # Another worker saved this address first - serve its fresh row
+        db.session.rollback()
+        if existing_property:
+            raise
+        return value_address(address, key)
     
-    return final_value, min(0.98, confidence)
+    # Get local agents
+    with span('agents'):
+        local_agents = find_local_agents(property_record.latitude, property_record.longitude)
+    return valuation_response(property_record, local_agents, provider_failures)
 
-def find_local_agents(latitude, longitude, property_type="Single Family"):
-    """Find verified agents in the area"""
-    # Query agents within service area
-    agents = Agent.query.filter(
-        Agent.subscription_active == True,
-        Agent.license_verified == True,
-        Agent.identity_verified == True
-    ).order_by(Agent.rating.desc()).limit(5).all()
+def is_fresh(property_record):
+    """True if a stored valuation is recent enough to serve without the providers"""
+    return bool(property_record) and property_record.updated_at > datetime.utcnow() - VALUATION_MAX_AGE
+
+def is_servable_stale(property_record):
+    """True if an expired valuation is inside the stale-while-revalidate window"""
+    return (bool(property_record) and property_record.estimated_value is not None and
+            property_record.updated_at > datetime.utcnow() - VALUATION_MAX_AGE - VALUATION_STALE_MAX_AGE)
+
+def stored_valuation_response(property_record, local_agents, stale=False):
+    """(body, status) for a valuation served from the database"""
+    result = property_record.to_dict()
+    result['cached'] = True
+    result['stale'] = stale
+    result['agents'] = local_agents
+    # Stale bodies are not cached, so the refreshed row is picked up at once
+    if not stale:
+        remember_valuation(property_record.address_key, result, property_record.updated_at)
+    return current_app.json.dumps(result), 200
+
+def count_request(key):
+    """Count a valuation request toward the address's refresh priority"""
+    if request_counter.record(key):
+        request_counter.flush(db.engine)
+
+def providers_unavailable(provider_failures):
+    """(body, status) when neither valuation provider answered"""
+    return current_app.json.dumps({
+        'error': 'Valuation providers unavailable',
+        'missing_sources': sorted(provider_failures)
+    }), 503
+
+def apply_provider_data(property_record, provider_results, provider_failures):
+    """Value a property from provider payloads and store the details on its record"""
+    geo_data = provider_results.get('geocode') or {}
+    rentcast_data = provider_results.get('rentcast') or {}
+    attom_data = provider_results.get('attom') or {}
     
-    # In production, filter by geographic proximity
-    return [agent.to_dict() for agent in agents]
+    # Extract property details
+    property_details = {
+        'bedrooms': rentcast_data.get('property', {}).get('bedrooms'),
+        'bathrooms': rentcast_data.get('property', {}).get('bathrooms'),
+        'square_feet': rentcast_data.get('property', {}).get('squareFootage'),
+        'lot_size': rentcast_data.get('property', {}).get('lotSize'),
+        'year_built': rentcast_data.get('property', {}).get('yearBuilt'),
+        'property_type': rentcast_data.get('property', {}).get('propertyType')
+    }
+    
+    # Calculate AI-powered valuation
+    with span('valuation'):
+        estimated_value, confidence_score = calculate_ai_valuation(
+            rentcast_data, attom_data, property_details,
+            missing_sources=provider_failures
+        )
+    
+    # Calculate additional metrics
+    estimated_rent = rentcast_data.get('property', {}).get('rentEstimate', 0)
+    price_per_sqft = estimated_value / property_details['square_feet'] if property_details['square_feet'] else 0
+    
+    # Update property data
+    property_record.latitude = geo_data.get('latitude', property_record.latitude)
+    property_record.longitude = geo_data.get('longitude', property_record.longitude)
+    property_record.bedrooms = property_details['bedrooms']
+    property_record.bathrooms = property_details['bathrooms']
+    property_record.square_feet = property_details['square_feet']
+    property_record.lot_size = property_details['lot_size']
+    property_record.year_built = property_details['year_built']
+    property_record.property_type = property_details['property_type']
+    property_record.estimated_value = estimated_value
+    property_record.confidence_score = confidence_score
+    property_record.estimated_rent = estimated_rent
+    property_record.price_per_sqft = price_per_sqft
+    store_provider_fields(property_record, rentcast_data, attom_data, provider_failures)
+    archive_payloads(property_record, {
+        name: provider_results[name] for name in ('rentcast', 'attom') if provider_results.get(name)
+    })
+    property_record.updated_at = datetime.utcnow()
+
+def sale_date(value):
+    """date from an ISO date or timestamp string, or None"""
+    try:
+        return date.fromisoformat((value or '')[:10])
+    except ValueError:
+        return None
+
+def store_provider_fields(property_record, rentcast_data, attom_data, provider_failures):
+    """Copy the provider fields we serve and re-score from into the record's columns"""
+    rentcast_property = rentcast_data.get('property') or {}
+    attom_property = attom_data.get('property') or {}
+    neighborhood = attom_data.get('neighborhood') or {}
+    property_record.rentcast_value = rentcast_property.get('valueEstimate')
+    property_record.market_value = attom_property.get('marketValue')
+    property_record.assessed_value = attom_property.get('assessedValue')
+    property_record.missing_sources = ','.join(sorted(provider_failures))
+    for key, column in Property.MARKET_TREND_FIELDS:
+        setattr(property_record, column, neighborhood.get(key))
+    property_record.comparables = [
+        ComparableSale(
+            position=position,
+            address=comp.get('address'),
+            sale_price=comp.get('salePrice'),
+            sale_date=sale_date(comp.get('saleDate')),
+            square_feet=comp.get('squareFootage')
+        )
+        for position, comp in enumerate(rentcast_data.get('comparables') or [])
+    ]
+
+def valuation_response(property_record, local_agents, provider_failures):
+    """(body, status) for a freshly computed valuation, cached for repeat lookups"""
+    result = property_record.to_dict()
+    result['agents'] = local_agents
+    result['cached'] = False
+    result['stale'] = False
+    result['partial'] = bool(provider_failures)
+    result['missing_sources'] = sorted(provider_failures)
+    
+    remember_valuation(property_record.address_key, result, property_record.updated_at)
+    
+    return current_app.json.dumps(result), 200
 
 @property_bp.route('/valuation', methods=['POST'])
 def get_instant_valuation():
@@ -155,92 +429,36 @@ def get_instant_valuation():
         if not address:
             return jsonify({'error': 'Address is required'}), 400
         
-        # Normalize address
-        normalized_address = normalize_address(address)
-        
-        # Check if we have recent data for this property
-        existing_property = Property.query.filter_by(
-            normalized_address=normalized_address
-        ).first()
-        
-        # If data is less than 24 hours old, return cached result
-        if existing_property and existing_property.updated_at > datetime.utcnow() - timedelta(hours=24):
-            result = existing_property.to_dict()
-            result['cached'] = True
-            result['agents'] = find_local_agents(existing_property.latitude, existing_property.longitude)
-            return jsonify(result)
+        # Every spelling of the address shares one key
+        key = address_key(address)
+        count_request(key)
         
-        # Get geocoding data
-        geo_data = geocode_address(address)
-        
-        # Fetch data from multiple sources
-        rentcast_data = get_rentcast_data(address)
-        attom_data = get_attom_data(address)
-        
-        # Extract property details
-        property_details = {
-            'bedrooms': rentcast_data.get('property', {}).get('bedrooms'),
-            'bathrooms': rentcast_data.get('property', {}).get('bathrooms'),
-            'square_feet': rentcast_data.get('property', {}).get('squareFootage'),
-            'lot_size': rentcast_data.get('property', {}).get('lotSize'),
-            'year_built': rentcast_data.get('property', {}).get('yearBuilt'),
-            'property_type': rentcast_data.get('property', {}).get('propertyType')
-        }
+        # Repeat lookups are answered from memory without touching the database
+        with span('cache'):
+            cached_body = get_cached_valuation(key)
+        if cached_body is not None:
+            return current_app.response_class(cached_body, mimetype='application/json')
         
-        # Calculate AI-powered valuation
-        estimated_value, confidence_score = calculate_ai_valuation(
-            rentcast_data, attom_data, property_details
+        # One request per address computes the valuation; concurrent
+        # requests for the same address wait for its result
+        body, status = coalesced_valuation(
+            key, partial(value_address, address, key)
         )
-        
-        # Calculate additional metrics
-        estimated_rent = rentcast_data.get('property', {}).get('rentEstimate', 0)
-        price_per_sqft = estimated_value / property_details['square_feet'] if property_details['square_feet'] else 0
-        
-        # Create or update property record
-        if existing_property:
-            property_record = existing_property
-        else:
-            property_record = Property()
-            property_record.address = address
-            property_record.normalized_address = normalized_address
-        
-        # Update property data
-        property_record.latitude = geo_data['latitude']
-        property_record.longitude = geo_data['longitude']
-        property_record.bedrooms = property_details['bedrooms']
-        property_record.bathrooms = property_details['bathrooms']
-        property_record.square_feet = property_details['square_feet']
-        property_record.lot_size = property_details['lot_size']
-        property_record.year_built = property_details['year_built']
-        property_record.property_type = property_details['property_type']
-        property_record.estimated_value = estimated_value
-        property_record.confidence_score = confidence_score
-        property_record.estimated_rent = estimated_rent
-        property_record.price_per_sqft = price_per_sqft
-        property_record.market_trends = json.dumps(attom_data.get('neighborhood', {}))
-        property_record.comparable_sales = json.dumps(rentcast_data.get('comparables', []))
-        property_record.rentcast_data = json.dumps(rentcast_data)
-        property_record.attom_data = json.dumps(attom_data)
-        property_record.updated_at = datetime.utcnow()
-        
-        if not existing_property:
-            db.session.add(property_record)
-        
-        db.session.commit()
-        
-        # Get local agents
-        local_agents = find_local_agents(geo_data['latitude'], geo_data['longitude'])
-        
-        # Prepare response
-        result = property_record.to_dict()
-        result['agents'] = local_agents
-        result['cached'] = False
-        
-        return jsonify(result)
+        return current_app.response_class(body, status=status, mimetype='application/json')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@property_bp.route('/valuation/cache-stats', methods=['GET'])
+def get_valuation_cache_stats():
+    """Hit/miss/eviction counters for the in-process valuation cache"""
+    return jsonify(valuation_cache.stats())
+
+@property_bp.route('/providers/stats', methods=['GET'])
+def get_provider_stats():
+    """Connection reuse and latency metrics for the provider clients"""
+    return jsonify({'providers': all_client_stats()})
+
 @property_bp.route('/agents/search', methods=['POST'])
 def search_agents():
     """Search for agents by location and criteria"""
@@ -290,6 +508,7 @@ def create_lead():
                     agent = Agent.query.get(best_agent_id)
                     if agent:
                         agent.leads_received += 1
+                        record_lead(agent.id)
                         db.session.commit()
         
         db.session.add(lead)
@@ -313,8 +532,8 @@ def get_market_trends(property_id):
             'price_per_sqft': property_record.price_per_sqft,
             'estimated_rent': property_record.estimated_rent,
             'rental_yield': (property_record.estimated_rent * 12 / property_record.estimated_value * 100) if property_record.estimated_value else 0,
-            'market_trends': property_record.market_trends,
-            'comparable_sales': property_record.comparable_sales,
+            'market_trends': property_record.market_trends(),
+            'comparable_sales': [comp.to_dict() for comp in property_record.comparables],
             'investment_analysis': {
                 'cap_rate': random.uniform(4.5, 7.2),
                 'cash_flow_potential': random.randint(-500, 1500),
@@ -343,3 +562,44 @@ def get_property_details(property_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+@property_bp.route('/properties/<int:property_id>/payloads', methods=['GET'])
+def get_property_payloads(property_id):
+    """Raw provider payloads behind a property's last valuation, from the archive"""
+    try:
+        Property.query.get_or_404(property_id)
+        return jsonify(load_payloads(property_id, db.session))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@property_bp.route('/comparable-sales', methods=['GET'])
+def search_comparable_sales():
+    """Comparable sales by sale date and price range, newest first"""
+    try:
+        sold_after = sale_date(request.args.get('sold_after'))
+        sold_before = sale_date(request.args.get('sold_before'))
+        min_price = request.args.get('min_price', type=int)
+        max_price = request.args.get('max_price', type=int)
+        limit = min(request.args.get('limit', 50, type=int), 500)
+        
+        query = select(ComparableSale)
+        if sold_after:
+            query = query.where(ComparableSale.sale_date >= sold_after)
+        if sold_before:
+            query = query.where(ComparableSale.sale_date <= sold_before)
+        if min_price is not None:
+            query = query.where(ComparableSale.sale_price >= min_price)
+        if max_price is not None:
+            query = query.where(ComparableSale.sale_price <= max_price)
+        comps = db.session.scalars(
+            query.order_by(ComparableSale.sale_date.desc(), ComparableSale.id.desc()).limit(limit)
+        ).all()
+        
+        return jsonify({
+            'comparable_sales': [dict(comp.to_dict(), property_id=comp.property_id) for comp in comps],
+            'count': len(comps)
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
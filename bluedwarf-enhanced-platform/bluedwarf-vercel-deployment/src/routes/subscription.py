@@ -1,14 +1,29 @@
 from flask import Blueprint, jsonify, request, current_app
+from sqlalchemy import case, func
 from src.models.property import Agent, PropertyLead, db
+from src.services.address import canonicalize_address, area_keys
+from src.services.agent_locator import agents_serving_areas
+from src.services.lead_quota import reserve_lead, monthly_lead_count
 import json
-import stripe
 from datetime import datetime, timedelta
 import os
 
 subscription_bp = Blueprint('subscription', __name__)
 
 # Stripe configuration (use environment variables in production)
-stripe.api_key = os.getenv('STRIPE_SECRET_KEY', 'sk_test_your_stripe_secret_key')
+STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY', 'sk_test_your_stripe_secret_key')
+# Stripe API endpoint - benchmarks point it at benchmarks/stub_stripe.py
+STRIPE_API_BASE = os.getenv('STRIPE_API_BASE', 'https://api.stripe.com')
+
+def get_stripe():
+    """Import and configure the Stripe SDK on first use, keeping it off cold start"""
+    import stripe
+    stripe.api_key = STRIPE_SECRET_KEY
+    stripe.api_base = STRIPE_API_BASE
+    return stripe
+
+# Market used when a property's address has no usable city, state or ZIP
+DEFAULT_MARKET_AREAS = area_keys('AUSTIN', 'TX', None)
 
 # Subscription tiers configuration
 SUBSCRIPTION_TIERS = {
@@ -55,6 +70,7 @@ SUBSCRIPTION_TIERS = {
 
 def create_stripe_customer(agent):
     """Create a Stripe customer for the agent"""
+    stripe = get_stripe()
     try:
         customer = stripe.Customer.create(
             email=agent.email,
@@ -71,6 +87,7 @@ def create_stripe_customer(agent):
 
 def create_stripe_subscription(customer_id, price_id):
     """Create a Stripe subscription"""
+    stripe = get_stripe()
     try:
         subscription = stripe.Subscription.create(
             customer=customer_id,
@@ -118,7 +135,7 @@ def create_payment_intent():
         # Create payment intent
         amount = SUBSCRIPTION_TIERS[tier]['price'] * 100  # Convert to cents
         
-        payment_intent = stripe.PaymentIntent.create(
+        payment_intent = get_stripe().PaymentIntent.create(
             amount=amount,
             currency='usd',
             customer=agent.stripe_customer_id,
@@ -148,13 +165,15 @@ def confirm_subscription_payment():
         agent_id = data.get('agent_id')
         
         # Retrieve payment intent from Stripe
-        payment_intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+        payment_intent = get_stripe().PaymentIntent.retrieve(payment_intent_id)
         
         if payment_intent.status != 'succeeded':
             return jsonify({'error': 'Payment not completed'}), 400
         
         agent = Agent.query.get_or_404(agent_id)
-        tier = payment_intent.metadata.get('subscription_tier', 'basic')
+        # StripeObject is not a dict in current SDKs - no .get()
+        metadata = payment_intent.metadata
+        tier = metadata['subscription_tier'] if 'subscription_tier' in metadata else 'basic'
         
         # Update agent subscription
         agent.subscription_tier = tier
@@ -205,7 +224,7 @@ def upgrade_subscription():
         prorated_amount = ((new_tier_price - current_tier_price) * days_remaining / 30) * 100
         
         # Create payment intent for upgrade
-        payment_intent = stripe.PaymentIntent.create(
+        payment_intent = get_stripe().PaymentIntent.create(
             amount=int(prorated_amount),
             currency='usd',
             customer=agent.stripe_customer_id,
@@ -279,20 +298,10 @@ def distribute_lead():
         from src.models.property import Property
         property_record = Property.query.get_or_404(property_id)
         
-        # Find qualified agents in the area
-        qualified_agents = Agent.query.filter(
-            Agent.subscription_active == True,
-            Agent.license_verified == True,
-            Agent.identity_verified == True
-        ).order_by(Agent.rating.desc()).all()
-        
-        # Filter agents by service area (simplified - in production, use geographic matching)
-        area_agents = []
-        for agent in qualified_agents:
-            service_areas = json.loads(agent.service_areas) if agent.service_areas else []
-            # Simplified matching - in production, use proper geographic matching
-            if any('TX' in area or 'Austin' in area for area in service_areas):
-                area_agents.append(agent)
+        # Find qualified agents serving the property's ZIP, city or state
+        location = canonicalize_address(property_record.normalized_address or property_record.address)
+        property_areas = area_keys(location.city, location.state, location.zip_code) or DEFAULT_MARKET_AREAS
+        area_agents = agents_serving_areas(property_areas, limit=3)
         
         if not area_agents:
             return jsonify({'error': 'No qualified agents found in the area'}), 404
@@ -300,17 +309,11 @@ def distribute_lead():
         # Lead distribution algorithm
         selected_agents = []
         
-        for agent in area_agents[:3]:  # Distribute to top 3 agents
-            # Check lead limits
+        for agent in area_agents:  # Distribute to top 3 agents
+            # Check lead limits - claims a slot in the agent's monthly counter
             tier_info = SUBSCRIPTION_TIERS[agent.subscription_tier]
-            if tier_info['lead_limit'] != -1:  # Not unlimited
-                monthly_leads = PropertyLead.query.filter(
-                    PropertyLead.agent_id == agent.id,
-                    PropertyLead.created_at >= datetime.utcnow().replace(day=1)
-                ).count()
-                
-                if monthly_leads >= tier_info['lead_limit']:
-                    continue  # Skip agent if lead limit reached
+            if not reserve_lead(agent.id, tier_info['lead_limit']):
+                continue  # Skip agent if lead limit reached
             
             # Create lead record
             lead = PropertyLead(
@@ -357,17 +360,13 @@ def get_lead_performance():
             # Agent-specific performance
             agent = Agent.query.get_or_404(agent_id)
             
-            # Calculate metrics
-            total_leads = PropertyLead.query.filter_by(agent_id=agent_id).count()
-            converted_leads = PropertyLead.query.filter_by(
-                agent_id=agent_id, 
-                status='converted'
-            ).count()
+            # Calculate metrics - both counts in one pass over the agent's leads
+            total_leads, converted_leads = db.session.query(
+                func.count(PropertyLead.id),
+                func.coalesce(func.sum(case((PropertyLead.status == 'converted', 1), else_=0)), 0)
+            ).filter(PropertyLead.agent_id == agent.id).one()
             
-            monthly_leads = PropertyLead.query.filter(
-                PropertyLead.agent_id == agent_id,
-                PropertyLead.created_at >= datetime.utcnow().replace(day=1)
-            ).count()
+            monthly_leads = monthly_lead_count(agent.id)
             
             conversion_rate = (converted_leads / total_leads * 100) if total_leads > 0 else 0
             
@@ -411,7 +410,7 @@ def get_billing_history():
             return jsonify({'billing_history': []})
         
         # Get billing history from Stripe
-        invoices = stripe.Invoice.list(
+        invoices = get_stripe().Invoice.list(
             customer=agent.stripe_customer_id,
             limit=12  # Last 12 invoices
         )
@@ -0,0 +1,376 @@
+from collections import namedtuple
+import hashlib
+import re
+
+# USPS Publication 28 street suffixes (common spellings -> standard abbreviation)
+STREET_SUFFIXES = {
+    'ALLEY': 'ALY', 'ALLEE': 'ALY', 'ALLY': 'ALY', 'ALY': 'ALY',
+    'ANNEX': 'ANX', 'ANEX': 'ANX', 'ANX': 'ANX',
+    'ARCADE': 'ARC', 'ARC': 'ARC',
+    'AVENUE': 'AVE', 'AVEN': 'AVE', 'AVENU': 'AVE', 'AVN': 'AVE', 'AVNUE': 'AVE', 'AV': 'AVE', 'AVE': 'AVE',
+    'BAYOU': 'BYU', 'BYU': 'BYU',
+    'BEACH': 'BCH', 'BCH': 'BCH',
+    'BEND': 'BND', 'BND': 'BND',
+    'BLUFF': 'BLF', 'BLF': 'BLF',
+    'BOULEVARD': 'BLVD', 'BOUL': 'BLVD', 'BOULV': 'BLVD', 'BLVD': 'BLVD',
+    'BRANCH': 'BR', 'BRNCH': 'BR', 'BR': 'BR',
+    'BRIDGE': 'BRG', 'BRDGE': 'BRG', 'BRG': 'BRG',
+    'BROOK': 'BRK', 'BRK': 'BRK',
+    'BYPASS': 'BYP', 'BYPA': 'BYP', 'BYPAS': 'BYP', 'BYPS': 'BYP', 'BYP': 'BYP',
+    'CAMP': 'CP', 'CMP': 'CP', 'CP': 'CP',
+    'CANYON': 'CYN', 'CANYN': 'CYN', 'CNYN': 'CYN', 'CYN': 'CYN',
+    'CAUSEWAY': 'CSWY', 'CAUSWA': 'CSWY', 'CSWY': 'CSWY',
+    'CENTER': 'CTR', 'CENTRE': 'CTR', 'CENT': 'CTR', 'CENTR': 'CTR', 'CNTER': 'CTR', 'CNTR': 'CTR', 'CEN': 'CTR', 'CTR': 'CTR',
+    'CIRCLE': 'CIR', 'CIRC': 'CIR', 'CIRCL': 'CIR', 'CRCL': 'CIR', 'CRCLE': 'CIR', 'CIR': 'CIR',
+    'CLIFF': 'CLF', 'CLF': 'CLF',
+    'CLUB': 'CLB', 'CLB': 'CLB',
+    'COMMON': 'CMN', 'CMN': 'CMN',
+    'CORNER': 'COR', 'COR': 'COR',
+    'COURSE': 'CRSE', 'CRSE': 'CRSE',
+    'COURT': 'CT', 'CRT': 'CT', 'CT': 'CT',
+    'COVE': 'CV', 'CV': 'CV',
+    'CREEK': 'CRK', 'CRK': 'CRK',
+    'CRESCENT': 'CRES', 'CRSENT': 'CRES', 'CRSNT': 'CRES', 'CRES': 'CRES',
+    'CROSSING': 'XING', 'CRSSNG': 'XING', 'XING': 'XING',
+    'DALE': 'DL', 'DL': 'DL',
+    'DAM': 'DM', 'DM': 'DM',
+    'DIVIDE': 'DV', 'DIV': 'DV', 'DVD': 'DV', 'DV': 'DV',
+    'DRIVE': 'DR', 'DRIV': 'DR', 'DRV': 'DR', 'DR': 'DR',
+    'ESTATE': 'EST', 'ESTATES': 'ESTS', 'EST': 'EST', 'ESTS': 'ESTS',
+    'EXPRESSWAY': 'EXPY', 'EXPR': 'EXPY', 'EXPRESS': 'EXPY', 'EXPW': 'EXPY', 'EXP': 'EXPY', 'EXPY': 'EXPY',
+    'EXTENSION': 'EXT', 'EXTN': 'EXT', 'EXTNSN': 'EXT', 'EXT': 'EXT',
+    'FALLS': 'FLS', 'FLS': 'FLS',
+    'FERRY': 'FRY', 'FRRY': 'FRY', 'FRY': 'FRY',
+    'FIELD': 'FLD', 'FIELDS': 'FLDS', 'FLD': 'FLD', 'FLDS': 'FLDS',
+    'FLAT': 'FLT', 'FLATS': 'FLTS', 'FLT': 'FLT', 'FLTS': 'FLTS',
+    'FOREST': 'FRST', 'FORESTS': 'FRST', 'FRST': 'FRST',
+    'FORK': 'FRK', 'FORKS': 'FRKS', 'FRK': 'FRK', 'FRKS': 'FRKS',
+    'FORT': 'FT', 'FRT': 'FT', 'FT': 'FT',
+    'FREEWAY': 'FWY', 'FREEWY': 'FWY', 'FRWAY': 'FWY', 'FRWY': 'FWY', 'FWY': 'FWY',
+    'GARDEN': 'GDN', 'GARDENS': 'GDNS', 'GARDN': 'GDN', 'GRDEN': 'GDN', 'GDN': 'GDN', 'GDNS': 'GDNS',
+    'GATEWAY': 'GTWY', 'GATEWY': 'GTWY', 'GATWAY': 'GTWY', 'GTWAY': 'GTWY', 'GTWY': 'GTWY',
+    'GLEN': 'GLN', 'GLN': 'GLN',
+    'GREEN': 'GRN', 'GRN': 'GRN',
+    'GROVE': 'GRV', 'GROV': 'GRV', 'GRV': 'GRV',
+    'HARBOR': 'HBR', 'HARB': 'HBR', 'HARBR': 'HBR', 'HRBOR': 'HBR', 'HBR': 'HBR',
+    'HAVEN': 'HVN', 'HVN': 'HVN',
+    'HEIGHTS': 'HTS', 'HT': 'HTS', 'HTS': 'HTS',
+    'HIGHWAY': 'HWY', 'HIGHWY': 'HWY', 'HIWAY': 'HWY', 'HIWY': 'HWY', 'HWAY': 'HWY', 'HWY': 'HWY',
+    'HILL': 'HL', 'HILLS': 'HLS', 'HL': 'HL', 'HLS': 'HLS',
+    'HOLLOW': 'HOLW', 'HLLW': 'HOLW', 'HOLLOWS': 'HOLW', 'HOLWS': 'HOLW', 'HOLW': 'HOLW',
+    'ISLAND': 'IS', 'ISLND': 'IS', 'IS': 'IS',
+    'JUNCTION': 'JCT', 'JCTION': 'JCT', 'JCTN': 'JCT', 'JUNCTN': 'JCT', 'JUNCTON': 'JCT', 'JCT': 'JCT',
+    'KNOLL': 'KNL', 'KNOL': 'KNL', 'KNL': 'KNL',
+    'LAKE': 'LK', 'LAKES': 'LKS', 'LK': 'LK', 'LKS': 'LKS',
+    'LANDING': 'LNDG', 'LNDNG': 'LNDG', 'LNDG': 'LNDG',
+    'LANE': 'LN', 'LN': 'LN',
+    'LOOP': 'LOOP', 'LOOPS': 'LOOP',
+    'MALL': 'MALL',
+    'MANOR': 'MNR', 'MNR': 'MNR',
+    'MEADOW': 'MDW', 'MEADOWS': 'MDWS', 'MDW': 'MDW', 'MDWS': 'MDWS', 'MEDOWS': 'MDWS',
+    'MILL': 'ML', 'ML': 'ML',
+    'MOTORWAY': 'MTWY', 'MTWY': 'MTWY',
+    'MOUNT': 'MT', 'MNT': 'MT', 'MT': 'MT',
+    'MOUNTAIN': 'MTN', 'MNTAIN': 'MTN', 'MNTN': 'MTN', 'MOUNTIN': 'MTN', 'MTIN': 'MTN', 'MTN': 'MTN',
+    'ORCHARD': 'ORCH', 'ORCHRD': 'ORCH', 'ORCH': 'ORCH',
+    'OVAL': 'OVAL', 'OVL': 'OVAL',
+    'OVERPASS': 'OPAS', 'OPAS': 'OPAS',
+    'PARK': 'PARK', 'PRK': 'PARK', 'PARKS': 'PARK',
+    'PARKWAY': 'PKWY', 'PARKWY': 'PKWY', 'PKWAY': 'PKWY', 'PKY': 'PKWY', 'PKWYS': 'PKWY', 'PKWY': 'PKWY',
+    'PASS': 'PASS',
+    'PATH': 'PATH', 'PATHS': 'PATH',
+    'PIKE': 'PIKE', 'PIKES': 'PIKE',
+    'PINE': 'PNE', 'PINES': 'PNES', 'PNE': 'PNE', 'PNES': 'PNES',
+    'PLACE': 'PL', 'PL': 'PL',
+    'PLAIN': 'PLN', 'PLAINS': 'PLNS', 'PLN': 'PLN', 'PLNS': 'PLNS',
+    'PLAZA': 'PLZ', 'PLZA': 'PLZ', 'PLZ': 'PLZ',
+    'POINT': 'PT', 'POINTS': 'PTS', 'PT': 'PT', 'PTS': 'PTS',
+    'PORT': 'PRT', 'PRT': 'PRT',
+    'PRAIRIE': 'PR', 'PRR': 'PR', 'PR': 'PR',
+    'RANCH': 'RNCH', 'RANCHES': 'RNCH', 'RNCHS': 'RNCH', 'RNCH': 'RNCH',
+    'RIDGE': 'RDG', 'RDGE': 'RDG', 'RDG': 'RDG', 'RIDGES': 'RDGS', 'RDGS': 'RDGS',
+    'RIVER': 'RIV', 'RVR': 'RIV', 'RIVR': 'RIV', 'RIV': 'RIV',
+    'ROAD': 'RD', 'RD': 'RD', 'ROADS': 'RDS', 'RDS': 'RDS',
+    'ROUTE': 'RTE', 'RTE': 'RTE',
+    'ROW': 'ROW',
+    'RUN': 'RUN',
+    'SHORE': 'SHR', 'SHOAR': 'SHR', 'SHR': 'SHR', 'SHORES': 'SHRS', 'SHRS': 'SHRS',
+    'SKYWAY': 'SKWY', 'SKWY': 'SKWY',
+    'SPRING': 'SPG', 'SPNG': 'SPG', 'SPRNG': 'SPG', 'SPG': 'SPG', 'SPRINGS': 'SPGS', 'SPGS': 'SPGS',
+    'SQUARE': 'SQ', 'SQR': 'SQ', 'SQRE': 'SQ', 'SQU': 'SQ', 'SQ': 'SQ',
+    'STATION': 'STA', 'STATN': 'STA', 'STN': 'STA', 'STA': 'STA',
+    'STREET': 'ST', 'STRT': 'ST', 'STR': 'ST', 'ST': 'ST',
+    'SUMMIT': 'SMT', 'SUMIT': 'SMT', 'SUMITT': 'SMT', 'SMT': 'SMT',
+    'TERRACE': 'TER', 'TERR': 'TER', 'TER': 'TER',
+    'TRACE': 'TRCE', 'TRACES': 'TRCE', 'TRCE': 'TRCE',
+    'TRAIL': 'TRL', 'TRAILS': 'TRL', 'TRLS': 'TRL', 'TRL': 'TRL',
+    'TUNNEL': 'TUNL', 'TUNEL': 'TUNL', 'TUNLS': 'TUNL', 'TUNNELS': 'TUNL', 'TUNNL': 'TUNL', 'TUNL': 'TUNL',
+    'TURNPIKE': 'TPKE', 'TRNPK': 'TPKE', 'TURNPK': 'TPKE', 'TPKE': 'TPKE',
+    'VALLEY': 'VLY', 'VALLY': 'VLY', 'VLLY': 'VLY', 'VLY': 'VLY',
+    'VIEW': 'VW', 'VW': 'VW', 'VIEWS': 'VWS', 'VWS': 'VWS',
+    'VILLAGE': 'VLG', 'VILL': 'VLG', 'VILLAG': 'VLG', 'VILLG': 'VLG', 'VLG': 'VLG',
+    'VISTA': 'VIS', 'VIST': 'VIS', 'VST': 'VIS', 'VSTA': 'VIS', 'VIS': 'VIS',
+    'WALK': 'WALK', 'WALKS': 'WALK',
+    'WAY': 'WAY', 'WY': 'WAY', 'WAYS': 'WAYS',
+    'WELL': 'WL', 'WELLS': 'WLS', 'WL': 'WL', 'WLS': 'WLS'
+}
+
+# Suffixes that are never street names themselves; "Lake", "Park" or "Hill"
+# may be either ("W Lake St", "Oak Park Ave")
+TERMINAL_SUFFIXES = {
+    'ALY', 'AVE', 'BLVD', 'CIR', 'CSWY', 'CT', 'DR', 'EXPY', 'FWY', 'HWY', 'LN',
+    'PKWY', 'PL', 'RD', 'ST', 'TER', 'TPKE', 'TRL', 'WAY', 'XING'
+}
+
+DIRECTIONALS = {
+    'NORTH': 'N', 'SOUTH': 'S', 'EAST': 'E', 'WEST': 'W',
+    'NORTHEAST': 'NE', 'NORTHWEST': 'NW', 'SOUTHEAST': 'SE', 'SOUTHWEST': 'SW',
+    'N': 'N', 'S': 'S', 'E': 'E', 'W': 'W',
+    'NE': 'NE', 'NW': 'NW', 'SE': 'SE', 'SW': 'SW'
+}
+
+# Secondary unit designators (USPS Publication 28, appendix C2)
+UNIT_DESIGNATORS = {
+    'APARTMENT': 'APT', 'APT': 'APT',
+    'BASEMENT': 'BSMT', 'BSMT': 'BSMT',
+    'BUILDING': 'BLDG', 'BLDG': 'BLDG',
+    'DEPARTMENT': 'DEPT', 'DEPT': 'DEPT',
+    'FLOOR': 'FL', 'FL': 'FL',
+    'FRONT': 'FRNT', 'FRNT': 'FRNT',
+    'HANGAR': 'HNGR', 'HNGR': 'HNGR',
+    'LOBBY': 'LBBY', 'LBBY': 'LBBY',
+    'LOT': 'LOT',
+    'LOWER': 'LOWR', 'LOWR': 'LOWR',
+    'OFFICE': 'OFC', 'OFC': 'OFC',
+    'PENTHOUSE': 'PH', 'PH': 'PH',
+    'PIER': 'PIER',
+    'REAR': 'REAR',
+    'ROOM': 'RM', 'RM': 'RM',
+    'SIDE': 'SIDE',
+    'SLIP': 'SLIP',
+    'SPACE': 'SPC', 'SPC': 'SPC',
+    'STOP': 'STOP',
+    'SUITE': 'STE', 'STE': 'STE',
+    'TRAILER': 'TRLR', 'TRLR': 'TRLR',
+    'UNIT': 'UNIT',
+    'UPPER': 'UPPR', 'UPPR': 'UPPR',
+    '#': '#'
+}
+
+# Designators that are complete without a trailing identifier
+UNIT_WITHOUT_ID = {'BSMT', 'FRNT', 'LBBY', 'LOWR', 'OFC', 'PH', 'REAR', 'SIDE', 'UPPR'}
+
+# Designators that are also common street names ("Front St", "Pier Ave") and
+# only count as a unit right after a street suffix or directional
+AMBIGUOUS_UNITS = UNIT_WITHOUT_ID | {'FL', 'LOT', 'PIER', 'SLIP', 'STOP'}
+
+STATE_NAMES = {
+    'ALABAMA': 'AL', 'ALASKA': 'AK', 'ARIZONA': 'AZ', 'ARKANSAS': 'AR', 'CALIFORNIA': 'CA',
+    'COLORADO': 'CO', 'CONNECTICUT': 'CT', 'DELAWARE': 'DE', 'DISTRICT OF COLUMBIA': 'DC',
+    'FLORIDA': 'FL', 'GEORGIA': 'GA', 'HAWAII': 'HI', 'IDAHO': 'ID', 'ILLINOIS': 'IL',
+    'INDIANA': 'IN', 'IOWA': 'IA', 'KANSAS': 'KS', 'KENTUCKY': 'KY', 'LOUISIANA': 'LA',
+    'MAINE': 'ME', 'MARYLAND': 'MD', 'MASSACHUSETTS': 'MA', 'MICHIGAN': 'MI', 'MINNESOTA': 'MN',
+    'MISSISSIPPI': 'MS', 'MISSOURI': 'MO', 'MONTANA': 'MT', 'NEBRASKA': 'NE', 'NEVADA': 'NV',
+    'NEW HAMPSHIRE': 'NH', 'NEW JERSEY': 'NJ', 'NEW MEXICO': 'NM', 'NEW YORK': 'NY',
+    'NORTH CAROLINA': 'NC', 'NORTH DAKOTA': 'ND', 'OHIO': 'OH', 'OKLAHOMA': 'OK', 'OREGON': 'OR',
+    'PENNSYLVANIA': 'PA', 'PUERTO RICO': 'PR', 'RHODE ISLAND': 'RI', 'SOUTH CAROLINA': 'SC',
+    'SOUTH DAKOTA': 'SD', 'TENNESSEE': 'TN', 'TEXAS': 'TX', 'UTAH': 'UT', 'VERMONT': 'VT',
+    'VIRGINIA': 'VA', 'WASHINGTON': 'WA', 'WEST VIRGINIA': 'WV', 'WISCONSIN': 'WI', 'WYOMING': 'WY'
+}
+STATE_CODES = set(STATE_NAMES.values())
+
+# Full state names indexed by their last token, longest name first
+_STATES_BY_LAST_TOKEN = {}
+for _name, _code in sorted(STATE_NAMES.items(), key=lambda item: -len(item[0].split())):
+    _tokens = tuple(_name.split())
+    _STATES_BY_LAST_TOKEN.setdefault(_tokens[-1], []).append((_tokens, _code))
+
+_TOKEN_RE = re.compile(r'#|[A-Z0-9]+(?:[-/][A-Z0-9]+)*')
+_ZIP_RE = re.compile(r'^(\d{5})(?:-?(\d{4}))?$')
+_COUNTRY_TOKENS = {'USA', 'US'}
+
+CanonicalAddress = namedtuple(
+    'CanonicalAddress',
+    ['street', 'unit', 'city', 'state', 'zip_code', 'zip4', 'canonical', 'key']
+)
+
+def _tokenize(address):
+    """Split an address into uppercase tokens per comma-separated segment"""
+    text = address.upper().replace('.', '').replace("'", '')
+    return [_TOKEN_RE.findall(segment) for segment in text.split(',')]
+
+def _take_state(tokens):
+    """Pop a trailing state code or full state name; returns the code or None"""
+    if tokens and tokens[-1] in STATE_CODES:
+        return tokens.pop()
+    for name_tokens, code in _STATES_BY_LAST_TOKEN.get(tokens[-1], ()) if tokens else ():
+        size = len(name_tokens)
+        if len(tokens) > size and tuple(tokens[-size:]) == name_tokens:
+            del tokens[-size:]
+            return code
+    return None
+
+def _split_unit(tokens):
+    """Split street tokens into (street tokens, canonical unit or None)"""
+    for index in range(2, len(tokens)):
+        designator = UNIT_DESIGNATORS.get(tokens[index])
+        if designator is None:
+            continue
+        previous = tokens[index - 1]
+        if designator in AMBIGUOUS_UNITS and previous not in STREET_SUFFIXES and previous not in DIRECTIONALS:
+            continue
+        rest = tokens[index + 1:]
+        if designator in UNIT_WITHOUT_ID and not rest:
+            return tokens[:index], designator
+        if rest:
+            return tokens[:index], f'{designator} {" ".join(rest)}'
+    return tokens, None
+
+def _canonical_street(tokens):
+    """Abbreviate directionals and suffix in the street line"""
+    if not tokens:
+        return ''
+    number = []
+    if tokens[0][0].isdigit():
+        number, tokens = tokens[:1], tokens[1:]
+
+    name = list(tokens)
+    post_directional = None
+    suffix = None
+
+    if len(name) > 1 and name[-1] in DIRECTIONALS and (name[-2] in STREET_SUFFIXES or len(name) > 2):
+        post_directional = DIRECTIONALS[name.pop()]
+    if len(name) > 1 and name[-1] in STREET_SUFFIXES:
+        suffix = STREET_SUFFIXES[name.pop()]
+    if len(name) > 1 and name[0] in DIRECTIONALS:
+        name[0] = DIRECTIONALS[name[0]]
+
+    parts = number + name
+    if suffix:
+        parts.append(suffix)
+    if post_directional:
+        parts.append(post_directional)
+    return ' '.join(parts)
+
+def _street_end(tokens):
+    """Index just past the street line in an address written without commas"""
+    for index in range(2, len(tokens)):
+        suffix = STREET_SUFFIXES.get(tokens[index])
+        if suffix is None:
+            continue
+        end = index + 1
+        if suffix not in TERMINAL_SUFFIXES and end < len(tokens) and tokens[end] in STREET_SUFFIXES:
+            continue
+        if end < len(tokens) and tokens[end] in DIRECTIONALS:
+            end += 1
+        if end < len(tokens) and tokens[end] in UNIT_DESIGNATORS:
+            end += 1
+            if end < len(tokens) and UNIT_DESIGNATORS[tokens[end - 1]] not in UNIT_WITHOUT_ID:
+                end += 1
+        return end
+    return len(tokens)
+
+def canonicalize_address(address):
+    """Parse a free-form US address into its canonical USPS-style form"""
+    segments = [tokens for tokens in _tokenize(address) if tokens]
+    if not segments:
+        return CanonicalAddress('', None, None, None, None, None, '', _hash_key(''))
+
+    # Units written as their own segment ("123 Main St, Apt 4, Austin") belong to the street
+    street_tokens = segments[0]
+    rest = []
+    for tokens in segments[1:]:
+        if not rest and tokens[0] in UNIT_DESIGNATORS:
+            street_tokens = street_tokens + tokens
+        else:
+            rest.extend(tokens)
+
+    if rest:
+        # A copy: rest still says whether the address had commas once the
+        # ZIP, state and country are popped off the locality
+        locality = list(rest)
+    else:
+        # No commas: locality is whatever follows the street line
+        locality = street_tokens
+
+    while locality and locality[-1] in _COUNTRY_TOKENS:
+        locality.pop()
+
+    zip_code = zip4 = None
+    if locality:
+        match = _ZIP_RE.match(locality[-1])
+        if match and (rest or len(locality) > 2):
+            locality.pop()
+            zip_code, zip4 = match.group(1), match.group(2)
+
+    state = None
+    if rest:
+        state = _take_state(locality)
+    elif len(locality) > 2 and (zip_code or any(t in STREET_SUFFIXES for t in locality[2:-1])):
+        # Without commas a trailing "CT" or "MT" may be the street suffix, so
+        # only read it as a state after a ZIP or an earlier suffix
+        state = _take_state(locality)
+
+    if not rest:
+        end = _street_end(locality)
+        street_tokens, locality = locality[:end], locality[end:]
+    city = ' '.join(locality) or None
+
+    street_tokens, unit = _split_unit(street_tokens)
+    street = _canonical_street(street_tokens)
+
+    line = f'{street} {unit}' if unit else street
+    locality = ' '.join(part for part in (state, zip_code) if part)
+    canonical = ', '.join(part for part in (line, city, locality) if part)
+
+    # ZIP+4 and the city are redundant once the 5-digit ZIP is known, so
+    # they are left out of the key
+    unit_id = unit.split(' ', 1)[-1] if unit else ''
+    if zip_code:
+        key_source = f'{street}|{unit_id}|{zip_code}'
+    else:
+        key_source = f'{street}|{unit_id}|{city or ""}|{state or ""}'
+
+    return CanonicalAddress(street, unit, city, state, zip_code, zip4, canonical, _hash_key(key_source))
+
+def _hash_key(text):
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+def address_key(address):
+    """Stable hash key for an address, identical for equivalent spellings"""
+    return canonicalize_address(address).key
+
+def service_area_key(area):
+    """Index key for an agent service area: ZIP:78701, CITY:AUSTIN TX, CITY:AUSTIN or STATE:TX"""
+    tokens = [token for segment in _tokenize(str(area)) for token in segment]
+    while tokens and tokens[-1] in _COUNTRY_TOKENS:
+        tokens.pop()
+    if not tokens:
+        return None
+
+    match = _ZIP_RE.match(tokens[-1])
+    if match:
+        return f'ZIP:{match.group(1)}'
+
+    name = ' '.join(tokens)
+    if name in STATE_NAMES:
+        return f'STATE:{STATE_NAMES[name]}'
+    if len(tokens) == 1 and name in STATE_CODES:
+        return f'STATE:{name}'
+
+    state = _take_state(tokens)
+    city = ' '.join(tokens)
+    return f'CITY:{city} {state}' if state else f'CITY:{city}'
+
+def area_keys(city, state, zip_code):
+    """Every service area key that covers a location, narrowest first"""
+    keys = []
+    if zip_code:
+        keys.append(f'ZIP:{zip_code}')
+    if city:
+        if state:
+            keys.append(f'CITY:{city} {state}')
+        keys.append(f'CITY:{city}')
+    if state:
+        keys.append(f'STATE:{state}')
+    return keys
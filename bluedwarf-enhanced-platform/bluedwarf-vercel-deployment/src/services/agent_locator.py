@@ -0,0 +1,135 @@
+from sqlalchemy import event, inspect, select
+from src.models.property import Agent, AgentCoverageCell, AgentServiceArea, db
+from src.services.address import service_area_key
+from src.services.geo import geohash_encode, cells_covering, haversine_miles
+import json
+
+# Geohash length for coverage cells - about 39 x 20 km, small next to a
+# typical service radius so most agents in a point's cell really serve it
+COVERAGE_PRECISION = 4
+DEFAULT_SERVICE_RADIUS_MILES = 25.0
+# Largest radius an agent may register; bounds the cells one agent covers
+MAX_SERVICE_RADIUS_MILES = 100.0
+
+# Candidates fetched per round trip while filtering by exact distance
+CANDIDATE_BATCH = 25
+
+def coverage_rows(agent):
+    """agent_coverage_cells rows for an agent's service circle"""
+    if agent.latitude is None or agent.longitude is None:
+        return []
+    radius = agent.service_radius_miles or DEFAULT_SERVICE_RADIUS_MILES
+    rating = agent.rating if agent.rating is not None else 5.0
+    return [
+        {'agent_id': agent.id, 'geohash': cell, 'rating': rating}
+        for cell in cells_covering(agent.latitude, agent.longitude, radius, COVERAGE_PRECISION)
+    ]
+
+def index_agent_coverage(connection, agent):
+    """Rewrite the coverage cells for one agent"""
+    table = AgentCoverageCell.__table__
+    connection.execute(table.delete().where(table.c.agent_id == agent.id))
+    rows = coverage_rows(agent)
+    if rows:
+        connection.execute(table.insert(), rows)
+
+def rebuild_coverage_index():
+    """Recompute every agent's coverage cells, e.g. after a backfill"""
+    connection = db.session.connection()
+    connection.execute(AgentCoverageCell.__table__.delete())
+    for agent in Agent.query.filter(Agent.latitude.isnot(None), Agent.longitude.isnot(None)).yield_per(1000):
+        rows = coverage_rows(agent)
+        if rows:
+            connection.execute(AgentCoverageCell.__table__.insert(), rows)
+    db.session.commit()
+
+def service_area_rows(agent):
+    """agent_service_areas rows for an agent's service_areas JSON"""
+    areas = json.loads(agent.service_areas) if agent.service_areas else []
+    keys = {service_area_key(area) for area in areas}
+    keys.discard(None)
+    return [{'agent_id': agent.id, 'area_key': key} for key in sorted(keys)]
+
+def index_agent_service_areas(connection, agent):
+    """Rewrite the service area keys for one agent"""
+    table = AgentServiceArea.__table__
+    connection.execute(table.delete().where(table.c.agent_id == agent.id))
+    rows = service_area_rows(agent)
+    if rows:
+        connection.execute(table.insert(), rows)
+
+def rebuild_service_area_index():
+    """Recompute agent_service_areas from every agent's service_areas JSON"""
+    connection = db.session.connection()
+    connection.execute(AgentServiceArea.__table__.delete())
+    for agent in Agent.query.filter(Agent.service_areas.isnot(None)).yield_per(1000):
+        rows = service_area_rows(agent)
+        if rows:
+            connection.execute(AgentServiceArea.__table__.insert(), rows)
+    db.session.commit()
+
+def agents_serving_areas(area_keys, limit=3):
+    """Best rated eligible agents serving any of the given area keys"""
+    serving = select(AgentServiceArea.agent_id).where(AgentServiceArea.area_key.in_(area_keys))
+    return Agent.query.filter(
+        Agent.id.in_(serving),
+        Agent.subscription_active == True,
+        Agent.license_verified == True,
+        Agent.identity_verified == True
+    ).order_by(Agent.rating.desc(), Agent.id).limit(limit).all()
+
+def find_agents_near(latitude, longitude, limit=5, session=None):
+    """Eligible agents whose service area covers a point, best rated first
+
+    `session` defaults to the app's scoped session; the async valuation path
+    passes the sync facade of its AsyncSession.
+    """
+    session = session or db.session
+    cell = geohash_encode(latitude, longitude, COVERAGE_PRECISION)
+    query = select(Agent).join(
+        AgentCoverageCell, AgentCoverageCell.agent_id == Agent.id
+    ).where(
+        AgentCoverageCell.geohash == cell,
+        Agent.subscription_active == True,
+        Agent.license_verified == True,
+        Agent.identity_verified == True
+    ).order_by(AgentCoverageCell.rating.desc(), Agent.id)
+
+    # A cell is coarser than any one circle, so check the exact distance and
+    # keep walking the cell in rating order until enough agents qualify
+    matches = []
+    offset = 0
+    while len(matches) < limit:
+        candidates = session.scalars(query.offset(offset).limit(CANDIDATE_BATCH)).all()
+        for agent in candidates:
+            distance = haversine_miles(latitude, longitude, agent.latitude, agent.longitude)
+            if distance <= (agent.service_radius_miles or DEFAULT_SERVICE_RADIUS_MILES):
+                matches.append((agent, distance))
+                if len(matches) == limit:
+                    break
+        if len(candidates) < CANDIDATE_BATCH:
+            break
+        offset += CANDIDATE_BATCH
+    return matches
+
+@event.listens_for(Agent, 'after_insert')
+def index_new_agent(mapper, connection, target):
+    """Index a newly registered agent's coverage circle and service areas"""
+    index_agent_coverage(connection, target)
+    index_agent_service_areas(connection, target)
+
+@event.listens_for(Agent, 'after_update')
+def reindex_agent(mapper, connection, target):
+    """Keep the indexes in step with location, radius, rating and service areas"""
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes()
+           for name in ('latitude', 'longitude', 'service_radius_miles', 'rating')):
+        index_agent_coverage(connection, target)
+    if state.attrs.service_areas.history.has_changes():
+        index_agent_service_areas(connection, target)
+
+@event.listens_for(Agent, 'before_delete')
+def unindex_agent(mapper, connection, target):
+    """Drop an agent's index rows before the agent, which they reference"""
+    for table in (AgentCoverageCell.__table__, AgentServiceArea.__table__):
+        connection.execute(table.delete().where(table.c.agent_id == target.id))
@@ -0,0 +1,204 @@
+from sqlalchemy import case, event, func, inspect, literal, null, select, union_all
+from sqlalchemy.orm import aliased
+from src.models.property import Agent, AgentSearchTerm, AgentServiceArea, AgentSpecialty, db
+from src.services.address import service_area_key, STATE_CODES
+import json
+import os
+import re
+import unicodedata
+
+# What a query word matching each field adds to an agent's score
+FIELD_WEIGHTS = {'name': 4, 'specialty': 3, 'area': 2, 'brokerage': 1}
+# A whole word match counts this many times a prefix match
+EXACT_MATCH_BONUS = 2
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = int(os.getenv('SEARCH_MAX_PAGE_SIZE', '100'))
+# Query words beyond this are ignored
+MAX_QUERY_WORDS = 8
+# Specialty facet values returned, most common first
+SPECIALTY_FACET_LIMIT = 20
+
+TERM_LENGTH = 80
+# Letters and digits of any script; underscores and punctuation split words
+WORD_RE = re.compile(r'[^\W_]+')
+
+def fold_accents(text):
+    """Casefold a text and strip its accents, so José and jose are the same word"""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+def search_words(text):
+    """Accent-folded lowercase words of a text, the unit the index stores"""
+    return [word[:TERM_LENGTH] for word in WORD_RE.findall(fold_accents(text or ''))]
+
+def specialty_key(specialty):
+    """A specialty as stored in agent_specialties: casefolded, single spaced"""
+    return ' '.join(str(specialty).casefold().split())[:TERM_LENGTH]
+
+def search_term_rows(agent):
+    """agent_search_terms rows for an agent's name, brokerage, specialties and service areas"""
+    specialties = json.loads(agent.specialties) if agent.specialties else []
+    areas = json.loads(agent.service_areas) if agent.service_areas else []
+    weights = {}
+    for field, texts in (('name', [agent.name]), ('brokerage', [agent.brokerage] if agent.brokerage else []),
+                         ('specialty', specialties), ('area', areas)):
+        for text in texts:
+            for word in search_words(str(text)):
+                weights[word] = max(weights.get(word, 0), FIELD_WEIGHTS[field])
+    return [{'agent_id': agent.id, 'term': term, 'weight': weight} for term, weight in sorted(weights.items())]
+
+def specialty_rows(agent):
+    """agent_specialties rows for an agent's specialties JSON"""
+    specialties = json.loads(agent.specialties) if agent.specialties else []
+    keys = {specialty_key(specialty) for specialty in specialties}
+    keys.discard('')
+    return [{'agent_id': agent.id, 'specialty': key} for key in sorted(keys)]
+
+def index_agent_search_terms(connection, agent):
+    """Rewrite the search terms and specialties for one agent"""
+    for table, rows in ((AgentSearchTerm.__table__, search_term_rows(agent)),
+                        (AgentSpecialty.__table__, specialty_rows(agent))):
+        connection.execute(table.delete().where(table.c.agent_id == agent.id))
+        if rows:
+            connection.execute(table.insert(), rows)
+
+def rebuild_search_index():
+    """Recompute agent_search_terms and agent_specialties from every agent's columns"""
+    connection = db.session.connection()
+    terms, specialties = [], []
+
+    def flush():
+        for table, rows in ((AgentSearchTerm.__table__, terms), (AgentSpecialty.__table__, specialties)):
+            if rows:
+                connection.execute(table.insert(), rows)
+                del rows[:]
+
+    connection.execute(AgentSearchTerm.__table__.delete())
+    connection.execute(AgentSpecialty.__table__.delete())
+    for agent in Agent.query.yield_per(1000):
+        terms.extend(search_term_rows(agent))
+        specialties.extend(specialty_rows(agent))
+        if len(terms) >= 10000:
+            flush()
+    flush()
+    db.session.commit()
+
+def city_area_keys(city, state=None):
+    """agent_service_areas keys of agents serving a city - in `state`, or in any state"""
+    key = service_area_key(city)
+    if not key or not key.startswith('CITY:'):
+        return [key] if key else []
+    states = [state.upper()] if state else sorted(STATE_CODES)
+    return [key] + [f'{key} {code}' for code in states]
+
+def prefix_match(word):
+    """Subquery of (agent_id, score) for agents with a word starting with `word`"""
+    # Every term in [word, word with its last letter bumped) starts with word
+    upper = word[:-1] + chr(ord(word[-1]) + 1)
+    bonus = case((AgentSearchTerm.term == word, EXACT_MATCH_BONUS), else_=1)
+    return select(AgentSearchTerm.agent_id, func.max(AgentSearchTerm.weight * bonus).label('score')).where(
+        AgentSearchTerm.term >= word, AgentSearchTerm.term < upper
+    ).group_by(AgentSearchTerm.agent_id).subquery()
+
+def search_agent_index(text=None, state=None, city=None, specialty=None, tier=None, min_rating=0.0,
+                       page=1, per_page=SEARCH_PAGE_SIZE, facets=True):
+    """Eligible agents matching a search: one ranked page, the total and facet counts
+
+    Every word of `text` must be a word of the agent's name, brokerage,
+    specialties or service areas; the last word may also be the start of
+    one, so partly typed queries work. Agents rank by the summed weights of
+    the fields their words matched in, then by rating. Returns (agents,
+    scores, total, facets); facets count the whole result set by state, tier
+    and specialty, or are None when `facets` is false.
+    """
+    words = search_words(text)[:MAX_QUERY_WORDS]
+    joins, scores = [], []
+    for word in words[:-1]:
+        term = aliased(AgentSearchTerm)
+        joins.append((term, (term.agent_id == Agent.id) & (term.term == word)))
+        scores.append(term.weight * EXACT_MATCH_BONUS)
+    if words:
+        match = prefix_match(words[-1])
+        joins.append((match, match.c.agent_id == Agent.id))
+        scores.append(match.c.score)
+    score = sum(scores[1:], scores[0]) if scores else None
+
+    conditions = [
+        Agent.subscription_active == True,
+        Agent.license_verified == True,
+        Agent.identity_verified == True,
+        Agent.rating >= min_rating
+    ]
+    if state:
+        conditions.append(Agent.license_state == state.upper())
+    if tier:
+        conditions.append(Agent.subscription_tier == tier.lower())
+    if specialty:
+        conditions.append(Agent.id.in_(
+            select(AgentSpecialty.agent_id).where(AgentSpecialty.specialty == specialty_key(specialty))))
+    if city:
+        conditions.append(Agent.id.in_(
+            select(AgentServiceArea.agent_id).where(AgentServiceArea.area_key.in_(city_area_keys(city, state)))))
+
+    def matching(*columns):
+        query = select(*columns).select_from(Agent)
+        for target, on in joins:
+            query = query.join(target, on)
+        return query.where(*conditions)
+
+    counts = None
+    if facets:
+        # One statement for every facet, so the matches are found once; the
+        # total is the sum of the state counts
+        matched = matching(Agent.id.label('agent_id'), Agent.license_state, Agent.subscription_tier).cte('matched')
+        by_state_tier = select(
+            literal('state'), matched.c.license_state, matched.c.subscription_tier, func.count()
+        ).group_by(matched.c.license_state, matched.c.subscription_tier)
+        by_specialty = select(literal('specialty'), AgentSpecialty.specialty, null(), func.count()).where(
+            AgentSpecialty.agent_id.in_(select(matched.c.agent_id))).group_by(AgentSpecialty.specialty)
+        states, tiers, specialties = {}, {}, {}
+        for facet, value, subscription_tier, count in db.session.execute(union_all(by_state_tier, by_specialty)):
+            if facet == 'specialty':
+                specialties[value] = count
+                continue
+            states[value] = states.get(value, 0) + count
+            if subscription_tier is not None:
+                tiers[subscription_tier] = tiers.get(subscription_tier, 0) + count
+        total = sum(states.values())
+        counts = {
+            'state': dict(sorted(states.items(), key=lambda item: (-item[1], item[0]))),
+            'tier': dict(sorted(tiers.items(), key=lambda item: (-item[1], item[0]))),
+            'specialty': dict(sorted(specialties.items(), key=lambda item: (-item[1], item[0]))[:SPECIALTY_FACET_LIMIT])
+        }
+    else:
+        total = db.session.execute(matching(func.count())).scalar()
+
+    agents, ranks = [], []
+    if total > (page - 1) * per_page:
+        ranked = matching(Agent, score.label('score')) if scores else matching(Agent)
+        order = [score.desc()] if scores else []
+        rows = db.session.execute(ranked.order_by(*order, Agent.rating.desc(), Agent.id).offset(
+            (page - 1) * per_page).limit(per_page)).all()
+        agents = [row[0] for row in rows]
+        ranks = [row[1] if scores else 0 for row in rows]
+    return agents, ranks, total, counts
+
+@event.listens_for(Agent, 'after_insert')
+def index_new_agent_terms(mapper, connection, target):
+    """Index a newly registered agent for search"""
+    index_agent_search_terms(connection, target)
+
+@event.listens_for(Agent, 'after_update')
+def reindex_agent_terms(mapper, connection, target):
+    """Keep the search terms and specialties in step with the searchable columns"""
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes()
+           for name in ('name', 'brokerage', 'specialties', 'service_areas')):
+        index_agent_search_terms(connection, target)
+
+@event.listens_for(Agent, 'before_delete')
+def unindex_agent_terms(mapper, connection, target):
+    """Drop an agent's search terms and specialties before the agent, which they reference"""
+    for table in (AgentSearchTerm.__table__, AgentSpecialty.__table__):
+        connection.execute(table.delete().where(table.c.agent_id == target.id))
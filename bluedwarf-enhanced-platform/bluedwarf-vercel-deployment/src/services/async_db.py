@@ -0,0 +1,37 @@
+from sqlalchemy.engine import make_url
+import importlib.util
+import threading
+
+# Async driver (SQLAlchemy dialect, module) for each backend the app runs on
+ASYNC_DRIVERS = {
+    'sqlite': ('sqlite+aiosqlite', 'aiosqlite'),
+    'postgresql': ('postgresql+asyncpg', 'asyncpg'),
+    'postgres': ('postgresql+asyncpg', 'asyncpg')
+}
+
+_sessionmakers = {}
+_sessionmakers_lock = threading.Lock()
+
+def async_database_url(database_url):
+    """database_url on its async driver, or None when that driver is not installed"""
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None or importlib.util.find_spec(driver[1]) is None:
+        return None
+    # SQLAlchemy's asyncio engine runs on greenlet, which it does not require
+    if importlib.util.find_spec('greenlet') is None:
+        return None
+    return url.set(drivername=driver[0])
+
+def get_async_sessionmaker(database_url):
+    """AsyncSession factory for a database, creating its engine on first use"""
+    maker = _sessionmakers.get(database_url)
+    if maker is None:
+        # sqlalchemy.ext.asyncio is only loaded by the async valuation path
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        with _sessionmakers_lock:
+            maker = _sessionmakers.get(database_url)
+            if maker is None:
+                engine = create_async_engine(async_database_url(database_url), pool_pre_ping=True)
+                maker = _sessionmakers[database_url] = async_sessionmaker(engine, expire_on_commit=False)
+    return maker
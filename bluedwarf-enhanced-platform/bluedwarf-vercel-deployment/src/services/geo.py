@@ -0,0 +1,77 @@
+import math
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LAT = 69.0
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+def geohash_encode(latitude, longitude, precision):
+    """Encode a point as a geohash string of the given length"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                value = (value << 1) | 1
+                lon_range[0] = mid
+            else:
+                value <<= 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                value = (value << 1) | 1
+                lat_range[0] = mid
+            else:
+                value <<= 1
+                lat_range[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+def geohash_cell_size(precision):
+    """(lat degrees, lon degrees) spanned by one geohash cell"""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = (5 * precision) // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+def cells_covering(latitude, longitude, radius_miles, precision):
+    """Geohash cells overlapping the bounding box of a circle"""
+    lat_delta = radius_miles / MILES_PER_DEGREE_LAT
+    lon_delta = radius_miles / (MILES_PER_DEGREE_LAT * max(0.01, math.cos(math.radians(latitude))))
+    cell_lat, cell_lon = geohash_cell_size(precision)
+
+    south = max(-90.0, latitude - lat_delta)
+    north = min(90.0, latitude + lat_delta)
+    west = max(-180.0, longitude - lon_delta)
+    east = min(180.0, longitude + lon_delta)
+
+    # Step through the box on cell-aligned rows and columns
+    cells = set()
+    lat = math.floor(south / cell_lat) * cell_lat + cell_lat / 2
+    while lat - cell_lat / 2 <= north:
+        lon = math.floor(west / cell_lon) * cell_lon + cell_lon / 2
+        while lon - cell_lon / 2 <= east:
+            cells.add(geohash_encode(max(-90.0, min(lat, 89.999999)),
+                                     max(-180.0, min(lon, 179.999999)), precision))
+            lon += cell_lon
+        lat += cell_lat
+    return cells
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in miles"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(a)))
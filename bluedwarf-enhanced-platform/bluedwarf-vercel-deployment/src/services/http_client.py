@@ -0,0 +1,349 @@
+from collections import deque
+import asyncio
+import os
+import random
+import threading
+import time
+
+# Connection pool and resilience defaults, overridable per provider
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '10'))
+HTTP_MAX_CONCURRENCY = int(os.getenv('HTTP_MAX_CONCURRENCY', '20'))
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', '3.0'))
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', '2'))
+HTTP_BACKOFF_BASE = float(os.getenv('HTTP_BACKOFF_BASE', '0.1'))
+HTTP_BACKOFF_MAX = float(os.getenv('HTTP_BACKOFF_MAX', '1.0'))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', '5'))
+BREAKER_RESET_TIMEOUT = float(os.getenv('BREAKER_RESET_TIMEOUT', '30.0'))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+class ProviderError(Exception):
+    """Raised when a provider request fails"""
+
+class CircuitOpenError(ProviderError):
+    """Raised when a provider's circuit breaker is rejecting calls"""
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a call may go through right now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Let exactly one probe through; others keep failing fast
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+class ProviderClient:
+    """Pooled keep-alive HTTP client for one upstream data provider"""
+
+    def __init__(self, name, base_url, headers=None, params=None, timeout=HTTP_TIMEOUT,
+                 pool_size=HTTP_POOL_SIZE, max_concurrency=HTTP_MAX_CONCURRENCY,
+                 retries=HTTP_RETRIES, backoff_base=HTTP_BACKOFF_BASE,
+                 backoff_max=HTTP_BACKOFF_MAX, breaker=None):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.headers = headers or {}
+        self.params = params or {}
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self.requests = 0
+        self.failures = 0
+        self.retried = 0
+        self.rejected = 0
+
+    @property
+    def session(self):
+        """Shared session with a bounded per-host connection pool"""
+        if self._session is None:
+            # requests is imported on first use so cold starts that never
+            # call a provider do not pay for it
+            import requests
+            from requests.adapters import HTTPAdapter
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=4,
+                        pool_maxsize=self.pool_size,
+                        pool_block=True,
+                        max_retries=0
+                    )
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    session.headers.update(self.headers)
+                    self._session = session
+        return self._session
+
+    def _backoff(self, attempt):
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def request(self, method, path, params=None, json=None):
+        """Send a request and return the decoded JSON body
+
+        Connection errors, timeouts and 429/5xx responses are retried with
+        jittered backoff. Other 4xx responses fail immediately and do not
+        count against the circuit breaker.
+        """
+        if not self.breaker.allow():
+            with self._stats_lock:
+                self.rejected += 1
+            raise CircuitOpenError(f'{self.name} circuit open')
+
+        from requests import RequestException
+        url = f'{self.base_url}/{path.lstrip("/")}'
+        query = dict(self.params, **(params or {}))
+        error = None
+
+        with self._semaphore:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    time.sleep(self._backoff(attempt - 1))
+                    with self._stats_lock:
+                        self.retried += 1
+
+                start = time.perf_counter()
+                try:
+                    response = self.session.request(
+                        method, url, params=query, json=json, timeout=self.timeout
+                    )
+                except RequestException as e:
+                    error = ProviderError(f'{self.name} request failed: {e}')
+                    self._record(start, ok=False)
+                    continue
+
+                if response.status_code in RETRYABLE_STATUS:
+                    response.close()
+                    error = ProviderError(f'{self.name} returned HTTP {response.status_code}')
+                    self._record(start, ok=False)
+                    continue
+
+                self._record(start, ok=response.ok)
+                self.breaker.record_success()
+                if not response.ok:
+                    raise ProviderError(f'{self.name} returned HTTP {response.status_code}')
+                return response.json()
+
+        self.breaker.record_failure()
+        raise error
+
+    def get(self, path, params=None):
+        return self.request('GET', path, params=params)
+
+    def _record(self, start, ok):
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._stats_lock:
+            self.requests += 1
+            if not ok:
+                self.failures += 1
+            self._latencies.append(elapsed)
+
+    def connections_opened(self):
+        """Number of TCP connections the pool has opened so far"""
+        if self._session is None:
+            return 0
+        total = 0
+        for adapter in set(self._session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    total += pool.num_connections
+        return total
+
+    def stats(self):
+        """Request, latency and connection reuse metrics for this client"""
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            requests_sent = self.requests
+            stats = {
+                'requests': requests_sent,
+                'failures': self.failures,
+                'retries': self.retried,
+                'rejected': self.rejected,
+                'breaker_state': self.breaker.state
+            }
+        connections = self.connections_opened()
+        stats['connections_opened'] = connections
+        stats['connection_reuse_rate'] = (
+            round(1 - connections / requests_sent, 4) if requests_sent else 0.0
+        )
+        if latencies:
+            stats['latency_ms'] = {
+                'p50': round(latencies[len(latencies) // 2], 3),
+                'p99': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3),
+                'max': round(latencies[-1], 3)
+            }
+        return stats
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+class AsyncProviderClient(ProviderClient):
+    """ProviderClient for asyncio code, on a pooled httpx.AsyncClient
+
+    Same retries, backoff, circuit breaker and metrics, but waiting on a
+    provider yields to the event loop instead of holding a thread. The
+    client belongs to the event loop it is first used on - one per worker
+    process under an ASGI server.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._async_semaphore = None
+
+    @property
+    def session(self):
+        """Shared httpx client with a bounded keep-alive pool"""
+        if self._session is None:
+            # httpx is optional - only the async valuation path needs it
+            import httpx
+            self._session = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.pool_size,
+                                    max_keepalive_connections=self.pool_size)
+            )
+            self._async_semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def request(self, method, path, params=None, json=None):
+        """Send a request and return the decoded JSON body (see ProviderClient.request)"""
+        if not self.breaker.allow():
+            with self._stats_lock:
+                self.rejected += 1
+            raise CircuitOpenError(f'{self.name} circuit open')
+
+        import httpx
+        session = self.session
+        url = f'{self.base_url}/{path.lstrip("/")}'
+        query = dict(self.params, **(params or {}))
+        error = None
+
+        settled = False
+        try:
+            async with self._async_semaphore:
+                for attempt in range(self.retries + 1):
+                    if attempt:
+                        await asyncio.sleep(self._backoff(attempt - 1))
+                        with self._stats_lock:
+                            self.retried += 1
+
+                    start = time.perf_counter()
+                    try:
+                        response = await session.request(method, url, params=query, json=json)
+                    except httpx.HTTPError as e:
+                        error = ProviderError(f'{self.name} request failed: {e}')
+                        self._record(start, ok=False)
+                        continue
+
+                    if response.status_code in RETRYABLE_STATUS:
+                        error = ProviderError(f'{self.name} returned HTTP {response.status_code}')
+                        self._record(start, ok=False)
+                        continue
+
+                    self._record(start, ok=response.is_success)
+                    self.breaker.record_success()
+                    settled = True
+                    if not response.is_success:
+                        raise ProviderError(f'{self.name} returned HTTP {response.status_code}')
+                    return response.json()
+        except BaseException:
+            # Cancelled - async_fan_out's timeout is shorter than the retries
+            # can take - or failed before the breaker heard how the call went.
+            # A half-open probe left unsettled would reject every later call.
+            if not settled:
+                self.breaker.record_failure()
+            raise
+
+        self.breaker.record_failure()
+        raise error
+
+    async def get(self, path, params=None):
+        return await self.request('GET', path, params=params)
+
+    def connections_opened(self):
+        # httpx does not count the connections its pool has opened
+        return 0
+
+    def stats(self):
+        stats = super().stats()
+        del stats['connections_opened'], stats['connection_reuse_rate']
+        return stats
+
+    async def aclose(self):
+        if self._session is not None:
+            await self._session.aclose()
+            self._session = None
+
+_clients = {}
+_async_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(name, base_url, **options):
+    """Return the process-wide client for a provider, creating it on first use"""
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = ProviderClient(name, base_url, **options)
+                _clients[name] = client
+    return client
+
+def get_async_client(name, base_url, **options):
+    """Return the process-wide async client for a provider, creating it on first use"""
+    client = _async_clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _async_clients.get(name)
+            if client is None:
+                client = AsyncProviderClient(name, base_url, **options)
+                _async_clients[name] = client
+    return client
+
+def all_client_stats():
+    """Metrics for every provider client created in this process"""
+    stats = {name: client.stats() for name, client in list(_clients.items())}
+    stats.update({f'{name}_async': client.stats() for name, client in list(_async_clients.items())})
+    return stats
@@ -0,0 +1,266 @@
+from bisect import bisect_left
+from collections import deque
+from flask import Response, has_request_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import hmac
+import os
+import threading
+import time
+
+# Named spans, SQL statement counts and timings per request, sent back in a
+# Server-Timing header and aggregated per route for Prometheus at /metrics.
+# INSTRUMENTATION=0 leaves the app unhooked.
+INSTRUMENTATION_ENABLED = os.getenv('INSTRUMENTATION', '1').lower() in ('1', 'true', 'yes')
+# Request latency histogram buckets, seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Requests recorded between updates of the /metrics counters
+METRICS_BATCH_SIZE = 256
+# Bearer token a scraper must send for /metrics; the admin token unless set.
+# With neither, /metrics answers 404 like the admin routes.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN') or os.getenv('ADMIN_TOKEN')
+
+# WSGI environ key holding the timings of the request being served. The
+# environ rather than a ContextVar of its own: setting one on every request
+# costs more than finding the timings the few times a span or statement
+# needs them, and a request that runs neither pays nothing.
+TIMINGS_ENVIRON_KEY = 'bluedwarf.timings'
+
+def current_timings():
+    """Timings of the request being served, or None outside one"""
+    if not has_request_context():
+        return None
+    return request.environ.get(TIMINGS_ENVIRON_KEY)
+
+class RequestTimings:
+    """Span durations and SQL statement count and time for one request"""
+    __slots__ = ('started', 'spans', 'sql_statements', 'sql_seconds')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+
+    def add(self, name, seconds):
+        # Repeated spans (e.g. several commits) add up
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def server_timing(self, total):
+        """Server-Timing header value, durations in milliseconds"""
+        # Built once per response, straight into one string
+        value = ''
+        for name, seconds in self.spans.items():
+            value += f'{name};dur={seconds * 1000:.2f}, '
+        if self.sql_statements:
+            value += f'db;dur={self.sql_seconds * 1000:.2f};desc="{self.sql_statements} queries", '
+        return f'{value}total;dur={total * 1000:.2f}'
+
+class Span:
+    __slots__ = ('name', 'timings', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.timings = current_timings()
+        if self.timings is not None:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.timings is not None:
+            self.timings.add(self.name, time.perf_counter() - self.started)
+        return False
+
+def span(name):
+    """Time a block as `name` in the current request; does nothing outside one"""
+    return Span(name)
+
+def label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class RouteStats:
+    """Counters for one (method, route)"""
+    __slots__ = ('latency', 'seconds', 'statuses', 'statements', 'sql_seconds', 'spans')
+
+    def __init__(self, buckets):
+        self.latency = [0] * (len(buckets) + 1)  # per bucket, then over the last one
+        self.seconds = 0.0
+        self.statuses = {}
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.spans = {}  # name -> [count, seconds]
+
+class MetricsRegistry:
+    """Per-route request metrics in Prometheus text format
+
+    Counters are per process; under gunicorn or uvicorn --workers each
+    worker serves its own /metrics.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS, batch_size=METRICS_BATCH_SIZE):
+        self.buckets = tuple(buckets)
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self.routes = {}
+
+    def observe(self, method, route, status, seconds, timings):
+        # Requests only append to a deque, which is thread-safe without the
+        # lock; they are folded into the counters a batch at a time, and
+        # before every render
+        self._pending.append((method, route, status, seconds, timings))
+        if len(self._pending) >= self.batch_size:
+            self.aggregate()
+
+    def aggregate(self):
+        """Fold pending observations into the per-route counters"""
+        with self._lock:
+            # Drained in place rather than swapped out, so an append racing
+            # the drain lands in the deque the next aggregate() reads
+            pending = self._pending
+            buckets = self.buckets
+            for _ in range(len(pending)):
+                method, route, status, seconds, timings = pending.popleft()
+                stats = self.routes.get((method, route))
+                if stats is None:
+                    stats = self.routes[(method, route)] = RouteStats(buckets)
+                stats.latency[bisect_left(buckets, seconds)] += 1
+                stats.seconds += seconds
+                stats.statuses[status] = stats.statuses.get(status, 0) + 1
+                stats.statements += timings.sql_statements
+                stats.sql_seconds += timings.sql_seconds
+                for name, span_seconds in timings.spans.items():
+                    totals = stats.spans.get(name)
+                    if totals is None:
+                        totals = stats.spans[name] = [0, 0.0]
+                    totals[0] += 1
+                    totals[1] += span_seconds
+
+    def render(self):
+        """Exposition text for every metric recorded so far"""
+        self.aggregate()
+        with self._lock:
+            routes = sorted(
+                (f'method="{method}",route="{label_value(route)}"', list(stats.latency), stats.seconds,
+                 dict(stats.statuses), stats.statements, stats.sql_seconds,
+                 {name: list(totals) for name, totals in stats.spans.items()})
+                for (method, route), stats in self.routes.items()
+            )
+
+        lines = [
+            '# HELP bluedwarf_http_requests_total Requests served, by route and status',
+            '# TYPE bluedwarf_http_requests_total counter'
+        ]
+        for labels, _, _, statuses, _, _, _ in routes:
+            for status, count in sorted(statuses.items()):
+                lines.append(f'bluedwarf_http_requests_total{{{labels},status="{status}"}} {count}')
+
+        lines += [
+            '# HELP bluedwarf_http_request_duration_seconds Time to the response headers, by route',
+            '# TYPE bluedwarf_http_request_duration_seconds histogram'
+        ]
+        for labels, latency, seconds, _, _, _, _ in routes:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), latency):
+                cumulative += count
+                lines.append(f'bluedwarf_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'bluedwarf_http_request_duration_seconds_sum{{{labels}}} {seconds:.6f}')
+            lines.append(f'bluedwarf_http_request_duration_seconds_count{{{labels}}} {cumulative}')
+
+        lines += [
+            '# HELP bluedwarf_db_statements_total SQL statements executed, by route',
+            '# TYPE bluedwarf_db_statements_total counter'
+        ]
+        for labels, _, _, _, statements, _, _ in routes:
+            lines.append(f'bluedwarf_db_statements_total{{{labels}}} {statements}')
+        lines += [
+            '# HELP bluedwarf_db_seconds_total Time spent in SQL statements, by route',
+            '# TYPE bluedwarf_db_seconds_total counter'
+        ]
+        for labels, _, _, _, _, sql_seconds, _ in routes:
+            lines.append(f'bluedwarf_db_seconds_total{{{labels}}} {sql_seconds:.6f}')
+
+        lines += [
+            '# HELP bluedwarf_span_seconds Time in named request stages, by route',
+            '# TYPE bluedwarf_span_seconds summary'
+        ]
+        for labels, _, _, _, _, _, spans in routes:
+            for name, (count, seconds) in sorted(spans.items()):
+                lines.append(f'bluedwarf_span_seconds_sum{{{labels},span="{label_value(name)}"}} {seconds:.6f}')
+                lines.append(f'bluedwarf_span_seconds_count{{{labels},span="{label_value(name)}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # The timings are found once per statement and kept on its context
+    if context is not None:
+        timings = current_timings()
+        if timings is not None:
+            context._instrumentation = (timings, time.perf_counter())
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timed = getattr(context, '_instrumentation', None)
+    if timed is not None:
+        timings, started = timed
+        timings.sql_statements += 1
+        timings.sql_seconds += time.perf_counter() - started
+
+class InstrumentationMiddleware:
+    """WSGI middleware timing each request into `registry` and a Server-Timing header
+
+    A middleware rather than before/after_request hooks: the header goes
+    straight onto the WSGI header list and no hook dispatch is paid per
+    request. api/asgi.py calls start() and finish() itself around
+    coroutine views, which bypass the WSGI app.
+    """
+
+    def __init__(self, wsgi_app, registry=metrics):
+        self.wsgi_app = wsgi_app
+        self.registry = registry
+
+    def __call__(self, environ, start_response):
+        timings = self.start(environ)
+
+        def timed_start_response(status, headers, exc_info=None):
+            # Flask's request object, with the matched url_rule, is still in the environ
+            rule = getattr(environ.get('werkzeug.request'), 'url_rule', None)
+            headers.append(('Server-Timing', self.finish(timings, environ['REQUEST_METHOD'], int(status[:3]), rule)))
+            return start_response(status, headers, exc_info)
+
+        return self.wsgi_app(environ, timed_start_response)
+
+    def start(self, environ):
+        """Start timing the request with this environ"""
+        timings = environ[TIMINGS_ENVIRON_KEY] = RequestTimings()
+        return timings
+
+    def finish(self, timings, method, status, rule):
+        """Record a finished request; returns its Server-Timing header value"""
+        # Streamed bodies (the batch NDJSON) are timed to their first byte
+        total = time.perf_counter() - timings.started
+        self.registry.observe(method, rule.rule if rule is not None else 'unmatched', status, total, timings)
+        return timings.server_timing(total)
+
+def init_app(app, registry=metrics):
+    """Time every request, add Server-Timing headers and serve `registry` at /metrics to METRICS_TOKEN"""
+    # On the Engine class, so the async engine's statements are counted too
+    if not event.contains(Engine, 'before_cursor_execute', before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+
+    middleware = InstrumentationMiddleware(app.wsgi_app, registry)
+    app.wsgi_app = middleware
+    app.extensions['instrumentation'] = middleware
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        if not METRICS_TOKEN:
+            return jsonify({'error': 'Not found'}), 404
+        supplied = request.headers.get('Authorization', '')
+        if not (supplied.startswith('Bearer ')
+                and hmac.compare_digest(supplied[len('Bearer '):].encode(), METRICS_TOKEN.encode())):
+            return jsonify({'error': 'Unauthorized'}), 401
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
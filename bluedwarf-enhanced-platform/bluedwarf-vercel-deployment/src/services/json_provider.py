@@ -0,0 +1,63 @@
+from flask.json.provider import DefaultJSONProvider
+import os
+
+try:
+    import orjson
+except ImportError:  # optional - responses use Flask's stdlib encoder
+    orjson = None
+
+# 'orjson' (used when installed) or 'stdlib' to keep Flask's own encoder
+JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'orjson').lower()
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask's JSON provider with orjson doing the encoding and decoding
+
+    Output matches DefaultJSONProvider - sorted keys, datetimes as HTTP
+    dates, non-string keys converted - except that non-ASCII text is sent
+    as UTF-8 rather than escaped. Anything orjson rejects, such as integers
+    over 64 bits or json.dumps-only arguments, goes through the stdlib
+    encoder instead.
+    """
+
+    ensure_ascii = False
+
+    def encode(self, obj, indent=False, sort_keys=None):
+        """obj as UTF-8 JSON bytes"""
+        # Datetimes are passed to DefaultJSONProvider.default, as Flask serializes them
+        sort_keys = self.sort_keys if sort_keys is None else sort_keys
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=option)
+        except TypeError:
+            return super().dumps(obj, indent=2 if indent else None, sort_keys=sort_keys,
+                                 separators=None if indent else (',', ':')).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        indent = kwargs.pop('indent', None)
+        sort_keys = kwargs.pop('sort_keys', None)
+        # orjson output is always compact, whatever separators are asked for
+        separators = kwargs.pop('separators', None)
+        if kwargs:
+            return super().dumps(obj, indent=indent, separators=separators,
+                                 sort_keys=self.sort_keys if sort_keys is None else sort_keys, **kwargs)
+        return self.encode(obj, indent=indent, sort_keys=sort_keys).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.encode(obj, indent=indent) + b'\n', mimetype=self.mimetype)
+
+def json_provider_class():
+    """The provider JSON_PROVIDER names, or Flask's default if orjson is not installed"""
+    if JSON_PROVIDER == 'orjson' and orjson is not None:
+        return OrjsonProvider
+    return DefaultJSONProvider
@@ -0,0 +1,76 @@
+from sqlalchemy import select
+from src.models.property import AgentLeadQuota, PropertyLead, db
+from datetime import datetime
+
+UNLIMITED = -1
+
+def current_period(now=None):
+    """Quota period key for a moment, e.g. 2025-06"""
+    return (now or datetime.utcnow()).strftime('%Y-%m')
+
+def period_bounds(period):
+    """[start, end) datetimes of a YYYY-MM period"""
+    start = datetime.strptime(period, '%Y-%m')
+    if start.month == 12:
+        return start, start.replace(year=start.year + 1, month=1)
+    return start, start.replace(month=start.month + 1)
+
+def _insert_ignoring_conflicts(table):
+    # Dialect modules are imported here, once a write needs them, to keep them off cold start
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert(table).on_conflict_do_nothing()
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+        return postgresql_insert(table).on_conflict_do_nothing()
+    return table.insert().prefix_with('IGNORE')
+
+def _stored_count(agent_id, period):
+    table = AgentLeadQuota.__table__
+    return db.session.execute(
+        select(table.c.lead_count).where(table.c.agent_id == agent_id, table.c.period == period)
+    ).scalar()
+
+def _count_leads(agent_id, period):
+    start, end = period_bounds(period)
+    return PropertyLead.query.filter(
+        PropertyLead.agent_id == agent_id,
+        PropertyLead.created_at >= start,
+        PropertyLead.created_at < end
+    ).count()
+
+def _ensure_counter(agent_id, period):
+    """Create the period's counter, seeded once from leads already recorded"""
+    if _stored_count(agent_id, period) is not None:
+        return
+    # Leads assigned before the counter existed still count toward the month
+    db.session.execute(
+        _insert_ignoring_conflicts(AgentLeadQuota.__table__).values(
+            agent_id=agent_id, period=period, lead_count=_count_leads(agent_id, period)
+        )
+    )
+
+def reserve_lead(agent_id, lead_limit, now=None):
+    """Claim one of an agent's lead slots for this month; False once the limit is reached"""
+    period = current_period(now)
+    _ensure_counter(agent_id, period)
+
+    # The limit is checked by the UPDATE itself, so concurrent reservations
+    # serialize on the row and can never push the count past the limit
+    table = AgentLeadQuota.__table__
+    statement = table.update().where(table.c.agent_id == agent_id, table.c.period == period)
+    if lead_limit != UNLIMITED:
+        statement = statement.where(table.c.lead_count < lead_limit)
+    result = db.session.execute(statement.values(lead_count=table.c.lead_count + 1))
+    return result.rowcount == 1
+
+def record_lead(agent_id, now=None):
+    """Count a lead assigned outside the quota check"""
+    reserve_lead(agent_id, UNLIMITED, now)
+
+def monthly_lead_count(agent_id, now=None):
+    """Leads assigned to an agent so far this month"""
+    period = current_period(now)
+    count = _stored_count(agent_id, period)
+    return count if count is not None else _count_leads(agent_id, period)
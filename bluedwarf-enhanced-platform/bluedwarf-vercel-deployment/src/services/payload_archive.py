@@ -0,0 +1,50 @@
+from sqlalchemy import delete, event, insert, select
+from src.models.property import Property, PropertyPayload
+from datetime import datetime
+import json
+import zlib
+
+# zlib level for archived payloads; they are written once per valuation and rarely read
+PAYLOAD_COMPRESSION_LEVEL = 6
+
+def compress_payload(data):
+    return zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'), PAYLOAD_COMPRESSION_LEVEL)
+
+def decompress_payload(blob):
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+def archive_payloads(property_record, payloads):
+    """Queue raw provider payloads ({provider: data}) to be archived when the property is flushed"""
+    # Written by the flush hooks below rather than through a relationship, so
+    # saving a valuation never loads the old archive rows
+    property_record._archived_payloads = {
+        provider: compress_payload(data) for provider, data in payloads.items()
+    }
+
+def load_payloads(property_id, session, providers=None):
+    """{provider: payload} archived for a property"""
+    query = select(PropertyPayload.provider, PropertyPayload.payload).where(PropertyPayload.property_id == property_id)
+    if providers:
+        query = query.where(PropertyPayload.provider.in_(providers))
+    return {provider: decompress_payload(blob) for provider, blob in session.execute(query)}
+
+def write_archived_payloads(connection, property_id, blobs, fetched_at=None):
+    """Replace a property's archived payloads for the given providers"""
+    table = PropertyPayload.__table__
+    connection.execute(delete(table).where(
+        table.c.property_id == property_id, table.c.provider.in_(list(blobs))
+    ))
+    connection.execute(insert(table), [
+        {'property_id': property_id, 'provider': provider, 'payload': blob,
+         'fetched_at': fetched_at or datetime.utcnow()}
+        for provider, blob in blobs.items()
+    ])
+
+@event.listens_for(Property, 'after_insert')
+@event.listens_for(Property, 'after_update')
+def flush_archived_payloads(mapper, connection, target):
+    """Write payloads queued by archive_payloads in the same transaction as the property"""
+    blobs = getattr(target, '_archived_payloads', None)
+    if blobs:
+        target._archived_payloads = None
+        write_archived_payloads(connection, target.id, blobs)
@@ -0,0 +1,71 @@
+from sqlalchemy import bindparam, func, update
+from src.models.property import Property
+from datetime import datetime
+import os
+import threading
+import time
+
+# Valuation requests are counted in memory and written to the properties
+# table in one statement every POPULARITY_FLUSH_SECONDS, or sooner once
+# POPULARITY_FLUSH_SIZE addresses are waiting. The refresh worker orders
+# stale properties by these counts.
+POPULARITY_FLUSH_SECONDS = float(os.getenv('POPULARITY_FLUSH_SECONDS', '30'))
+POPULARITY_FLUSH_SIZE = int(os.getenv('POPULARITY_FLUSH_SIZE', '500'))
+
+class RequestCounter:
+    """Per-address request counts, buffered in memory between flushes"""
+
+    def __init__(self, flush_seconds=POPULARITY_FLUSH_SECONDS, flush_size=POPULARITY_FLUSH_SIZE, clock=time.monotonic):
+        self.flush_seconds = flush_seconds
+        self.flush_size = flush_size
+        self.clock = clock
+        self._pending = {}
+        self._last_flush = clock()
+        self._lock = threading.Lock()
+
+    def record(self, address_key):
+        """Count one request; returns True when the caller should flush()"""
+        with self._lock:
+            hits, _ = self._pending.get(address_key, (0, None))
+            self._pending[address_key] = (hits + 1, datetime.utcnow())
+            return (len(self._pending) >= self.flush_size or
+                    self.clock() - self._last_flush >= self.flush_seconds)
+
+    def flush(self, engine):
+        """Add the buffered counts to their property rows; returns the addresses written
+
+        Never raises: popularity is advisory, so on a database error the
+        counts are kept for the next flush and 0 is returned.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = self.clock()
+        if not pending:
+            return 0
+
+        # updated_at is set to itself so its onupdate default does not make
+        # the valuation look fresh; addresses without a row yet match nothing.
+        # Rows from before the column existed hold NULL counts.
+        properties = Property.__table__
+        statement = update(properties).where(
+            properties.c.address_key == bindparam('key')
+        ).values(
+            request_count=func.coalesce(properties.c.request_count, 0) + bindparam('hits'),
+            last_requested_at=bindparam('seen'),
+            updated_at=properties.c.updated_at
+        )
+        try:
+            with engine.begin() as connection:
+                connection.execute(statement, [
+                    {'key': key, 'hits': hits, 'seen': seen}
+                    for key, (hits, seen) in pending.items()
+                ])
+        except Exception:
+            with self._lock:
+                for address, (hits, seen) in pending.items():
+                    current_hits, current_seen = self._pending.get(address, (0, seen))
+                    self._pending[address] = (hits + current_hits, max(seen, current_seen))
+            return 0
+        return len(pending)
+
+request_counter = RequestCounter()
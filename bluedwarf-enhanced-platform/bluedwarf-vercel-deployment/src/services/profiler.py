@@ -0,0 +1,163 @@
+from collections import Counter
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+# Opt-in sampling profiler. Nothing runs until a profile is started, either
+# through POST /api/admin/profile (src/routes/admin.py) or PROFILER_SECONDS,
+# which profiles each worker for that long from startup.
+PROFILER_SECONDS = float(os.getenv('PROFILER_SECONDS', '0'))
+# Time between samples
+PROFILER_INTERVAL = float(os.getenv('PROFILER_INTERVAL_MS', '10')) / 1000
+# Longest profile the admin route will start
+PROFILER_MAX_SECONDS = float(os.getenv('PROFILER_MAX_SECONDS', '120'))
+# GIL switch interval while a profile runs, so the sampler thread gets the GIL
+# promptly instead of only when a request blocks on I/O
+PROFILER_SWITCH_INTERVAL = float(os.getenv('PROFILER_SWITCH_INTERVAL_MS', '0.1')) / 1000
+# Finished profiles, <id>.collapsed - shared by the workers on a host
+PROFILER_OUTPUT_DIR = os.getenv('PROFILER_OUTPUT_DIR', os.path.join(tempfile.gettempdir(), 'bluedwarf-profiles'))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def frame_label(code):
+    """function (path:line) with the deployment root and site-packages trimmed"""
+    filename = code.co_filename
+    if filename.startswith(ROOT):
+        filename = filename[len(ROOT) + 1:]
+    elif 'site-packages' in filename:
+        filename = filename.split('site-packages', 1)[1].lstrip(os.sep)
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+class SamplingProfiler:
+    """Samples every thread's Python stack on a timer into collapsed-stack counts
+
+    A background thread reads sys._current_frames() every `interval`
+    seconds; no signal handlers or trace hooks are installed, so the
+    profiled code runs unchanged. The sampler can only look while it holds
+    the GIL, which a busy thread hands over at I/O or after the switch
+    interval; the interval is lowered while sampling so that stacks are not
+    skewed towards blocking calls. With cpu_only, a thread is only sampled
+    if its CPU clock moved since the previous sample, leaving out workers
+    blocked on sockets, locks or provider calls - where the platform has
+    no per-thread CPU clocks every thread is sampled.
+    """
+
+    def __init__(self, interval=PROFILER_INTERVAL, cpu_only=True):
+        self.interval = interval
+        self.cpu_only = cpu_only and hasattr(time, 'pthread_getcpuclockid')
+        self.stacks = Counter()
+        self.samples = 0
+        self._labels = {}
+        self._cpu = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, seconds, on_finish=None):
+        """Sample for `seconds` on a daemon thread, then call on_finish(self)"""
+        def run():
+            switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(min(switch_interval, PROFILER_SWITCH_INTERVAL))
+            try:
+                deadline = time.monotonic() + seconds
+                while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+                    self.sample()
+            finally:
+                sys.setswitchinterval(switch_interval)
+            if on_finish is not None:
+                on_finish(self)
+
+        self._thread = threading.Thread(target=run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def sample(self):
+        own = threading.get_ident()
+        labels = self._labels
+        for ident, frame in sys._current_frames().items():
+            if ident == own or (self.cpu_only and not self._ran(ident)):
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[';'.join(stack)] += 1
+        self.samples += 1
+
+    def _ran(self, ident):
+        """True if the thread used CPU since it was last looked at"""
+        try:
+            cpu = time.clock_gettime(time.pthread_getcpuclockid(ident))
+        except (OSError, OverflowError):
+            return False
+        previous = self._cpu.get(ident)
+        self._cpu[ident] = cpu
+        return previous is not None and cpu > previous
+
+    def collapsed(self):
+        """Brendan Gregg's collapsed-stack format, as flamegraph.pl and speedscope read it"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+_active = None
+_active_lock = threading.Lock()
+
+def profile_path(profile_id, suffix='.collapsed'):
+    return os.path.join(PROFILER_OUTPUT_DIR, f'{profile_id}{suffix}')
+
+def start_profile(seconds, interval=PROFILER_INTERVAL):
+    """Profile this process for `seconds`; returns the profile id, or None if one is running"""
+    global _active
+    with _active_lock:
+        if _active is not None:
+            return None
+        profile_id = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        os.makedirs(PROFILER_OUTPUT_DIR, exist_ok=True)
+        # Marks the profile as running for workers that did not start it
+        open(profile_path(profile_id, '.running'), 'w').close()
+        _active = SamplingProfiler(interval)
+
+    def finish(profiler):
+        global _active
+        temporary = profile_path(profile_id, '.tmp')
+        try:
+            with open(temporary, 'w') as output:
+                output.write(profiler.collapsed())
+            os.replace(temporary, profile_path(profile_id))
+        finally:
+            # Even when the output could not be written, or the profile
+            # would show as running forever
+            for leftover in (temporary, profile_path(profile_id, '.running')):
+                try:
+                    os.remove(leftover)
+                except FileNotFoundError:
+                    pass
+            with _active_lock:
+                _active = None
+
+    _active.start(seconds, on_finish=finish)
+    return profile_id
+
+def profile_status(profile_id):
+    """'done', 'running' or None for an unknown profile id"""
+    if os.path.exists(profile_path(profile_id)):
+        return 'done'
+    if os.path.exists(profile_path(profile_id, '.running')):
+        return 'running'
+    return None
+
+def start_from_env():
+    """Start the PROFILER_SECONDS startup profile, if one is configured"""
+    if PROFILER_SECONDS > 0:
+        return start_profile(PROFILER_SECONDS)
+    return None
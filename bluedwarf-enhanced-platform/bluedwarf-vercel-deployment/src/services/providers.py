@@ -0,0 +1,119 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import asyncio
+import os
+import threading
+import time
+
+# Provider fan-out configuration (seconds)
+PROVIDER_TIMEOUT = float(os.getenv('PROVIDER_TIMEOUT', '4.0'))
+PROVIDER_DEADLINE = float(os.getenv('PROVIDER_DEADLINE', '6.0'))
+PROVIDER_MAX_WORKERS = int(os.getenv('PROVIDER_MAX_WORKERS', '32'))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    """Return the shared thread pool used for provider calls"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=PROVIDER_MAX_WORKERS,
+                    thread_name_prefix='provider'
+                )
+    return _executor
+
+def fan_out(calls, timeouts=None, deadline=None):
+    """Run provider calls concurrently and collect whatever finishes in time
+
+    `calls` maps a provider name to a zero-argument callable. Each provider is
+    given its own timeout (falling back to PROVIDER_TIMEOUT) and nothing is
+    waited on past the overall deadline. Returns a tuple of
+    (results, failures) where failures maps provider name to a reason.
+    """
+    timeouts = timeouts or {}
+    deadline = PROVIDER_DEADLINE if deadline is None else deadline
+
+    start = time.monotonic()
+    executor = get_executor()
+    futures = {executor.submit(fn): name for name, fn in calls.items()}
+    cutoffs = {
+        future: start + min(timeouts.get(name, PROVIDER_TIMEOUT), deadline)
+        for future, name in futures.items()
+    }
+
+    results = {}
+    failures = {}
+    pending = set(futures)
+
+    while pending:
+        now = time.monotonic()
+
+        # Drop providers that ran past their own timeout or the deadline
+        for future in [f for f in pending if cutoffs[f] <= now]:
+            pending.discard(future)
+            future.cancel()
+            failures[futures[future]] = 'timeout'
+
+        if not pending:
+            break
+
+        next_cutoff = min(cutoffs[f] for f in pending)
+        done, pending = wait(pending, timeout=next_cutoff - now, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                failures[name] = str(e) or e.__class__.__name__
+
+    return results, failures
+
+def gather_calls(*calls):
+    """Run zero-argument callables concurrently on the provider pool; returns their results in order
+
+    For the several requests one provider needs, from inside a fan_out
+    slot. The calling thread runs the first call itself, then runs any
+    call the pool has not started yet, so a full pool waiting on its own
+    submissions can't deadlock. The first exception is raised.
+    """
+    executor = get_executor()
+    futures = [executor.submit(fn) for fn in calls[1:]]
+    try:
+        results = [calls[0]()]
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+    for fn, future in zip(calls[1:], futures):
+        results.append(fn() if future.cancel() else future.result())
+    return results
+
+async def async_fan_out(calls, timeouts=None, deadline=None):
+    """fan_out for coroutines, with the same timeouts and (results, failures) shape
+
+    `calls` maps a provider name to a zero-argument coroutine function. All
+    of them are awaited together on the running event loop; a provider that
+    runs past its timeout is cancelled rather than left running on a thread.
+    """
+    timeouts = timeouts or {}
+    deadline = PROVIDER_DEADLINE if deadline is None else deadline
+
+    names = list(calls)
+    outcomes = await asyncio.gather(*(
+        asyncio.wait_for(calls[name](), min(timeouts.get(name, PROVIDER_TIMEOUT), deadline))
+        for name in names
+    ), return_exceptions=True)
+
+    results = {}
+    failures = {}
+    for name, outcome in zip(names, outcomes):
+        if isinstance(outcome, asyncio.TimeoutError):
+            failures[name] = 'timeout'
+        elif isinstance(outcome, Exception):
+            failures[name] = str(outcome) or outcome.__class__.__name__
+        else:
+            results[name] = outcome
+    return results, failures
@@ -0,0 +1,46 @@
+import threading
+import time
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts of up to `capacity`
+
+    A rate of 0 or less means no limit.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.waited = 0.0
+
+    def _reserve(self, tokens):
+        """Take `tokens` now, going into debt if short; returns seconds until they are covered"""
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            self.acquired += tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` may be spent; returns the seconds waited"""
+        if self.rate <= 0:
+            return 0.0
+        # Reserving first keeps waiting callers in arrival order
+        wait = self._reserve(tokens)
+        if wait:
+            self.sleep(wait)
+            with self._lock:
+                self.waited += wait
+        return wait
+
+    def stats(self):
+        with self._lock:
+            return {'rate': self.rate, 'capacity': self.capacity, 'acquired': self.acquired,
+                    'waited_seconds': round(self.waited, 3)}
@@ -0,0 +1,286 @@
+from urllib.parse import urlparse
+import asyncio
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+# Cache shared between app instances, e.g. sqlite:////tmp/bluedwarf-cache.db
+# or redis://localhost:6379/0. Unset means in-process caching only.
+SHARED_CACHE_URL = os.getenv('VALUATION_SHARED_CACHE_URL')
+
+# Deletes a lock only if it still holds the caller's token, in one round trip
+RELEASE_LOCK_SCRIPT = ("if redis.call('get', KEYS[1]) == ARGV[1] then "
+                       "return redis.call('del', KEYS[1]) else return 0 end")
+
+class SQLiteCacheBackend:
+    """Shared cache stored in a SQLite file, usable by several processes"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS cache_entries '
+                         '(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS cache_locks '
+                         '(key TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            'SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_with_ttl(self, key):
+        """(value, seconds until it expires) for a live entry, else None"""
+        now = time.time()
+        row = self._connect().execute(
+            'SELECT value, expires_at FROM cache_entries WHERE key = ? AND expires_at > ?', (key, now)
+        ).fetchone()
+        return (row[0], row[1] - now) if row else None
+
+    def set(self, key, value, ttl):
+        self._connect().execute(
+            'INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, value, time.time() + ttl)
+        )
+
+    def delete(self, key):
+        self._connect().execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+
+    def acquire_lock(self, key, ttl):
+        """Take a lock on key for ttl seconds; returns a token or None"""
+        token = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM cache_locks WHERE key = ? AND expires_at <= ?', (key, now))
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO cache_locks (key, token, expires_at) VALUES (?, ?, ?)',
+                (key, token, now + ttl)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return token if cursor.rowcount == 1 else None
+
+    def release_lock(self, key, token):
+        self._connect().execute('DELETE FROM cache_locks WHERE key = ? AND token = ?', (key, token))
+
+class RedisCacheBackend:
+    """Shared cache on any server speaking the Redis protocol (RESP)"""
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None, timeout=2.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @classmethod
+    def from_url(cls, url):
+        parsed = urlparse(url)
+        db = int(parsed.path.lstrip('/') or 0)
+        return cls(parsed.hostname or 'localhost', parsed.port or 6379, db, parsed.password)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = (sock, sock.makefile('rb'))
+            self._local.conn = conn
+            if self.password:
+                self._execute('AUTH', self.password)
+            if self.db:
+                self._execute('SELECT', self.db)
+        return conn
+
+    def _execute(self, *args):
+        return self._pipeline(args)[0]
+
+    def _pipeline(self, *commands):
+        """Send several commands in one write and return their replies"""
+        sock, reader = self._connection()
+        parts = []
+        for args in commands:
+            parts.append(b'*%d\r\n' % len(args))
+            for arg in args:
+                if isinstance(arg, str):
+                    arg = arg.encode()
+                elif not isinstance(arg, bytes):
+                    arg = str(arg).encode()
+                parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        try:
+            sock.sendall(b''.join(parts))
+            replies, error = [], None
+            for _ in commands:
+                # Every reply is read off the connection before an error is raised
+                try:
+                    replies.append(self._read_reply(reader))
+                except RuntimeError as e:
+                    replies.append(None)
+                    error = error or e
+        except (OSError, ConnectionError):
+            # Drop the broken connection so the next call reconnects
+            self._local.conn = None
+            sock.close()
+            raise
+        if error is not None:
+            raise error
+        return replies
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError('redis connection closed')
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode()
+        if kind == b'-':
+            raise RuntimeError(payload.decode())
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            return [self._read_reply(reader) for _ in range(int(payload))]
+        raise RuntimeError(f'unexpected redis reply {line!r}')
+
+    def get(self, key):
+        return self._execute('GET', key)
+
+    def get_with_ttl(self, key):
+        """(value, seconds until it expires) for a live entry, else None"""
+        value, ttl_ms = self._pipeline(('GET', key), ('PTTL', key))
+        if value is None:
+            return None
+        # PTTL is -1 for a key without an expiry; entries here always have one
+        return value, max(ttl_ms, 0) / 1000.0
+
+    def set(self, key, value, ttl):
+        self._execute('SET', key, value, 'PX', max(1, int(ttl * 1000)))
+
+    def delete(self, key):
+        self._execute('DEL', key)
+
+    def acquire_lock(self, key, ttl):
+        token = uuid.uuid4().hex
+        reply = self._execute('SET', f'lock:{key}', token, 'NX', 'PX', max(1, int(ttl * 1000)))
+        return token if reply == 'OK' else None
+
+    def release_lock(self, key, token):
+        # Only the holder deletes the lock; an expired lock taken over by
+        # another instance is left alone. The check and the delete run as
+        # one script, so the lock can't change hands between them.
+        self._execute('EVAL', RELEASE_LOCK_SCRIPT, 1, f'lock:{key}', token)
+
+def backend_from_url(url):
+    """Build a shared cache backend from a sqlite:/// or redis:// URL"""
+    if url.startswith('sqlite:///'):
+        return SQLiteCacheBackend(url[len('sqlite:///'):])
+    if url.startswith('redis://'):
+        return RedisCacheBackend.from_url(url)
+    raise ValueError(f'Unsupported shared cache URL: {url}')
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_shared_backend():
+    """Return the configured shared cache backend, or None"""
+    global _backend
+    if _backend is None and SHARED_CACHE_URL:
+        with _backend_lock:
+            if _backend is None:
+                _backend = backend_from_url(SHARED_CACHE_URL)
+    return _backend
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution"""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+            self.abandoned = False
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Run fn for key, or wait for the run already in progress"""
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = self._Call()
+            if leader:
+                break
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # A claim() given up without a result is run here instead
+            if not call.abandoned:
+                return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def claim(self, key):
+        """Lead the run for key, finished later by settle(); None if a run is in progress"""
+        with self._lock:
+            if key in self._calls:
+                return None
+            call = self._calls[key] = self._Call()
+            return call
+
+    def settle(self, key, call, result=None, abandoned=False):
+        """Finish a claimed run; waiters of an abandoned one run fn themselves"""
+        call.result = result
+        call.abandoned = abandoned
+        with self._lock:
+            del self._calls[key]
+        call.done.set()
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines sharing one event loop"""
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, fn):
+        """Await fn() for key, or the run already in progress"""
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        # A waiter that is cancelled (client gone) must not cancel the others
+        return await asyncio.shield(task)
@@ -0,0 +1,135 @@
+from collections import namedtuple
+from flask import request, send_file
+import hashlib
+import io
+import json
+import mimetypes
+import os
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+# Hashed file names never change content, so caches may keep them for a year
+IMMUTABLE_MAX_AGE = 31536000
+# Entry pages and unhashed names revalidate with their ETag
+REVALIDATE_MAX_AGE = int(os.getenv('STATIC_MAX_AGE', 0))
+
+# One servable body: bytes held in memory plus its strong ETag
+Body = namedtuple('Body', ['data', 'etag'])
+
+# A static file with its precompressed encodings and image-format alternates
+StaticAsset = namedtuple('StaticAsset', ['body', 'mimetype', 'immutable', 'encodings', 'alternates'])
+
+def _body(data):
+    return Body(data, hashlib.sha256(data).hexdigest()[:32])
+
+class AssetTable:
+    """In-memory path table for the static folder
+
+    Built once at import from dist/manifest.json (see src/build_assets.py),
+    or from the raw static folder when no build has been run, so serving a
+    request never touches the filesystem. `stale` lists the source files
+    added or changed since the build.
+    """
+
+    def __init__(self, static_folder):
+        self.entries = {}
+        self.built = False
+        self.stale = []
+        if static_folder is None or not os.path.isdir(static_folder):
+            return
+        manifest_path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            self._load_manifest(os.path.join(static_folder, DIST_DIR), manifest_path)
+            self.built = True
+            self.stale = self._stale_sources(static_folder, manifest_path)
+        else:
+            self._load_folder(static_folder)
+
+    def _stale_sources(self, static_folder, manifest_path):
+        with open(manifest_path) as f:
+            assets = json.load(f)['assets']
+        stale = []
+        for name in sorted(os.listdir(static_folder)):
+            if not os.path.isfile(os.path.join(static_folder, name)):
+                continue
+            # The same truncated sha256 src/build_assets.py records
+            source = hashlib.sha256(self._read(static_folder, name)).hexdigest()[:12]
+            if assets.get(name, {}).get('source') != source:
+                stale.append(name)
+        return stale
+
+    def _read(self, folder, name):
+        with open(os.path.join(folder, name), 'rb') as f:
+            return f.read()
+
+    def _load_manifest(self, dist_folder, manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        for name, entry in manifest['assets'].items():
+            asset = StaticAsset(
+                body=_body(self._read(dist_folder, entry['file'])),
+                mimetype=entry['type'],
+                immutable=entry.get('immutable', False),
+                encodings={encoding: _body(self._read(dist_folder, file_name))
+                           for encoding, file_name in entry.get('encodings', {}).items()},
+                alternates={mimetype: _body(self._read(dist_folder, file_name))
+                            for mimetype, file_name in entry.get('alternates', {}).items()}
+            )
+            self.entries[entry['file']] = asset
+            # The original name still works for old links, but only revalidates
+            self.entries[name] = asset._replace(immutable=False)
+
+    def _load_folder(self, static_folder):
+        for name in os.listdir(static_folder):
+            if os.path.isfile(os.path.join(static_folder, name)):
+                self.entries[name] = StaticAsset(
+                    body=_body(self._read(static_folder, name)),
+                    mimetype=mimetypes.guess_type(name)[0] or 'application/octet-stream',
+                    immutable=False,
+                    encodings={},
+                    alternates={}
+                )
+
+    def get(self, path):
+        return self.entries.get(path)
+
+    def respond(self, asset):
+        """Serve an asset with negotiation, conditional requests and Range support"""
+        body, mimetype, encoding, vary = asset.body, asset.mimetype, None, []
+
+        if asset.alternates:
+            vary.append('Accept')
+            # Only formats the client names outright - "*/*" is not a promise to decode AVIF
+            named = {value for value, quality in request.accept_mimetypes if quality > 0}
+            for alternate in ('image/avif', 'image/webp'):
+                if alternate in asset.alternates and alternate in named:
+                    body, mimetype = asset.alternates[alternate], alternate
+                    break
+
+        # Byte ranges are taken over the identity encoding
+        if asset.encodings:
+            vary.append('Accept-Encoding')
+            if 'Range' not in request.headers:
+                for candidate in ('br', 'gzip'):
+                    if candidate in asset.encodings and request.accept_encodings.quality(candidate) > 0:
+                        body, encoding = asset.encodings[candidate], candidate
+                        break
+
+        response = send_file(
+            io.BytesIO(body.data),
+            mimetype=mimetype,
+            etag=body.etag,
+            conditional=True,
+            max_age=IMMUTABLE_MAX_AGE if asset.immutable else REVALIDATE_MAX_AGE
+        )
+        response.cache_control.public = True
+        if asset.immutable:
+            response.cache_control.immutable = True
+        elif not REVALIDATE_MAX_AGE:
+            response.cache_control.no_cache = True
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if vary:
+            response.vary.update(vary)
+        return response
@@ -0,0 +1,152 @@
+from datetime import datetime
+
+# Weighted ensemble of the provider estimates
+VALUATION_WEIGHTS = {
+    'rentcast': 0.4,
+    'attom_market': 0.35,
+    'attom_assessed': 0.25
+}
+
+# (age below, multiplier) bands; anything older gets OLD_AGE_MULTIPLIER
+AGE_MULTIPLIERS = (
+    (5, 1.05),  # New construction premium
+    (15, 1.0),
+    (30, 0.95)
+)
+OLD_AGE_MULTIPLIER = 0.90
+DEFAULT_YEAR_BUILT = 2000
+
+# Confidence bounds
+MIN_AGREEMENT_CONFIDENCE = 0.7
+SINGLE_SOURCE_CONFIDENCE = 0.6
+MAX_CONFIDENCE = 0.98
+
+# Confidence lost for each provider missing from a valuation
+MISSING_SOURCE_PENALTIES = {
+    'geocode': 0.05,
+    'rentcast': 0.15,
+    'attom': 0.15
+}
+
+def calculate_ai_valuation(rentcast_data, attom_data, property_details, missing_sources=(), current_year=None):
+    """AI-powered valuation algorithm combining multiple data sources"""
+
+    # Extract values from different sources
+    rentcast_value = rentcast_data.get('property', {}).get('valueEstimate') or 0
+    attom_market_value = attom_data.get('property', {}).get('marketValue') or 0
+    attom_assessed_value = attom_data.get('property', {}).get('assessedValue') or 0
+
+    # Weighted ensemble approach (simplified)
+    weights = VALUATION_WEIGHTS
+
+    # Calculate weighted average
+    weighted_value = (
+        rentcast_value * weights['rentcast'] +
+        attom_market_value * weights['attom_market'] +
+        attom_assessed_value * weights['attom_assessed']
+    )
+
+    # Re-weight over the sources we actually have when a provider is missing
+    available_weight = (
+        (weights['rentcast'] if rentcast_value > 0 else 0) +
+        (weights['attom_market'] if attom_market_value > 0 else 0) +
+        (weights['attom_assessed'] if attom_assessed_value > 0 else 0)
+    )
+    if 0 < available_weight < 1:
+        weighted_value = weighted_value / available_weight
+
+    # Apply property-specific adjustments
+    year_built = property_details.get('year_built') or DEFAULT_YEAR_BUILT
+
+    # Age adjustment
+    current_year = current_year or datetime.now().year
+    age = current_year - year_built
+    age_multiplier = OLD_AGE_MULTIPLIER
+    for below, multiplier in AGE_MULTIPLIERS:
+        if age < below:
+            age_multiplier = multiplier
+            break
+
+    final_value = int(weighted_value * age_multiplier)
+
+    # Calculate confidence score based on data availability and consistency
+    values = [v for v in [rentcast_value, attom_market_value, attom_assessed_value] if v > 0]
+    if len(values) >= 2:
+        variance = max(values) - min(values)
+        avg_value = sum(values) / len(values)
+        confidence = max(MIN_AGREEMENT_CONFIDENCE, 1.0 - (variance / avg_value))
+    else:
+        confidence = SINGLE_SOURCE_CONFIDENCE
+
+    # Partial valuations are reported with lower confidence; summed in a
+    # fixed order so the vectorized engine reproduces it bit for bit
+    penalty = sum(MISSING_SOURCE_PENALTIES.get(source, 0.1) for source in sorted(missing_sources))
+
+    return final_value, max(0.0, min(MAX_CONFIDENCE, confidence) - penalty)
+
+def calculate_ai_valuations(rentcast_value, attom_market_value, attom_assessed_value, year_built,
+                            square_feet=None, missing=None, current_year=None):
+    """calculate_ai_valuation over whole columns at once
+
+    Takes equal-length array-likes; missing numbers may be NaN or None,
+    which count as 0 (values) or DEFAULT_YEAR_BUILT (year built), as in the
+    scalar function. `missing` maps a source name to a boolean array of
+    rows where that provider was missing. Returns a dict of arrays:
+    estimated_value (int64), confidence_score and, with square_feet,
+    price_per_sqft. Results are identical to calling the scalar function
+    row by row.
+    """
+    # Imported here so the request path never pays for numpy
+    try:
+        import numpy as np
+    except ImportError:  # optional - only batch re-scoring needs it
+        raise RuntimeError('The vectorized valuation engine needs numpy: pip install numpy')
+
+    def column(values, default):
+        array = np.asarray(values, dtype=np.float64)
+        return np.where(np.isnan(array) | (array == 0), default, array)
+
+    rentcast = column(rentcast_value, 0.0)
+    market = column(attom_market_value, 0.0)
+    assessed = column(attom_assessed_value, 0.0)
+    weights = VALUATION_WEIGHTS
+
+    # Same operations in the same order as the scalar function, so every
+    # intermediate rounds identically
+    weighted_value = rentcast * weights['rentcast'] + market * weights['attom_market'] + assessed * weights['attom_assessed']
+    has_rentcast, has_market, has_assessed = rentcast > 0, market > 0, assessed > 0
+    available_weight = (
+        np.where(has_rentcast, weights['rentcast'], 0.0) +
+        np.where(has_market, weights['attom_market'], 0.0) +
+        np.where(has_assessed, weights['attom_assessed'], 0.0)
+    )
+    reweight = (available_weight > 0) & (available_weight < 1)
+    weighted_value = np.where(reweight, weighted_value / np.where(reweight, available_weight, 1.0), weighted_value)
+
+    age = float(current_year or datetime.now().year) - column(year_built, float(DEFAULT_YEAR_BUILT))
+    age_multiplier = np.select([age < below for below, _ in AGE_MULTIPLIERS],
+                               [multiplier for _, multiplier in AGE_MULTIPLIERS], OLD_AGE_MULTIPLIER)
+    estimated_value = np.trunc(weighted_value * age_multiplier).astype(np.int64)
+
+    present = np.stack([has_rentcast, has_market, has_assessed])
+    stacked = np.stack([rentcast, market, assessed])
+    count = present.sum(axis=0)
+    agreeing = count >= 2
+    spread = (np.where(present, stacked, -np.inf).max(axis=0) -
+              np.where(present, stacked, np.inf).min(axis=0))
+    avg_value = np.where(present, stacked, 0.0).sum(axis=0) / np.maximum(count, 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        agreement = np.maximum(MIN_AGREEMENT_CONFIDENCE, 1.0 - (spread / avg_value))
+    confidence = np.where(agreeing, agreement, SINGLE_SOURCE_CONFIDENCE)
+
+    penalty = np.zeros(len(confidence))
+    for source in sorted(missing or {}):
+        penalty = penalty + np.where(np.asarray(missing[source], dtype=bool),
+                                     MISSING_SOURCE_PENALTIES.get(source, 0.1), 0.0)
+    confidence = np.maximum(0.0, np.minimum(MAX_CONFIDENCE, confidence) - penalty)
+
+    result = {'estimated_value': estimated_value, 'confidence_score': confidence}
+    if square_feet is not None:
+        sqft = column(square_feet, 0.0)
+        result['price_per_sqft'] = np.where(sqft != 0, estimated_value / np.where(sqft != 0, sqft, 1.0), 0.0)
+    return result
@@ -0,0 +1,209 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from src.models.property import Property
+from src.services.cache import TTLCache
+from src.services.shared_cache import get_shared_backend, SingleFlight, AsyncSingleFlight
+import asyncio
+import os
+import time
+
+# Finished /api/valuation responses keyed by address_key(). The TTL
+# also bounds how stale the embedded agent list can get.
+VALUATION_CACHE_SIZE = int(os.getenv('VALUATION_CACHE_SIZE', '2048'))
+VALUATION_CACHE_TTL = float(os.getenv('VALUATION_CACHE_TTL', '300'))
+
+# Shared (cross-instance) cache entry lifetime and compute lock settings
+SHARED_CACHE_TTL = float(os.getenv('VALUATION_SHARED_CACHE_TTL', '3600'))
+SHARED_LOCK_TTL = float(os.getenv('VALUATION_SHARED_LOCK_TTL', '15'))
+SHARED_POLL_INTERVAL = float(os.getenv('VALUATION_SHARED_POLL_INTERVAL', '0.05'))
+
+valuation_cache = TTLCache(maxsize=VALUATION_CACHE_SIZE, ttl=VALUATION_CACHE_TTL)
+_single_flight = SingleFlight()
+_async_single_flight = AsyncSingleFlight()
+# Shared backend writes made on the event loop run here, in order: one
+# thread, so a body is published before the compute lock guarding it is
+# released
+_loop_writes = ThreadPoolExecutor(max_workers=1, thread_name_prefix='shared-cache')
+
+def shared_key(address_key):
+    return f'valuation:{address_key}'
+
+def adopt_shared_body(address_key, entry):
+    """Cache a shared (body, seconds left) entry here, for no longer than it lives there"""
+    body, fresh_for = entry
+    valuation_cache.set(address_key, body, ttl=min(VALUATION_CACHE_TTL, fresh_for))
+    return body
+
+def get_cached_valuation(address_key):
+    """Return the serialized response body for an address, if cached"""
+    return valuation_cache.get(address_key)
+
+def cache_valuation(address_key, body, fresh_for):
+    """Cache a serialized response for at most `fresh_for` seconds"""
+    valuation_cache.set(address_key, body, ttl=min(VALUATION_CACHE_TTL, fresh_for))
+    backend = get_shared_backend()
+    if backend is not None and fresh_for > 0:
+        shared_write(backend.set, shared_key(address_key), body, min(SHARED_CACHE_TTL, fresh_for))
+
+def shared_write(write, *args):
+    """Call a shared backend write, queued off the event loop when called on one
+
+    Async views reach cache_valuation and the commit hook on the loop, where
+    a blocking Redis or SQLite call would stall every request it serves.
+    Returns the asyncio future of a queued write, else None.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        write(*args)
+        return None
+    return loop.run_in_executor(_loop_writes, write, *args)
+
+def coalesced_valuation(address_key, compute):
+    """Run compute() at most once per address across concurrent requests
+
+    Requests in this process that arrive while a valuation is running wait
+    for its result. With a shared backend configured, other instances do the
+    same through a lock in the backend and pick up the body it publishes.
+    `compute` returns a (body, status) tuple.
+    """
+    return _single_flight.do(address_key, lambda: _shared_compute(address_key, compute))
+
+async def coalesced_valuation_async(address_key, compute):
+    """Await compute() at most once per address across concurrent requests
+
+    The async counterpart of coalesced_valuation, for requests served on
+    this process's event loop. `compute` is a coroutine function returning
+    (body, status). The shared backend, whose clients block, is read and
+    locked from threads.
+    """
+    return await _async_single_flight.do(address_key, partial(_shared_compute_async, address_key, compute))
+
+def claim_valuation(address_key):
+    """Lead an address's valuation for a caller that finishes it with settle_valuation()
+
+    Requests arriving meanwhile wait for the settled (body, status), as they
+    do for coalesced_valuation. Returns None, claiming nothing, when another
+    request - in this process or, through the shared backend, another
+    instance - is already valuing the address.
+    """
+    call = _single_flight.claim(address_key)
+    if call is None:
+        return None
+    # It may have been valued since the caller last looked; the waiters'
+    # own coalesced_valuation then finds the result
+    if valuation_cache.get(address_key) is not None:
+        _single_flight.settle(address_key, call, abandoned=True)
+        return None
+    token = None
+    backend = get_shared_backend()
+    if backend is not None:
+        key = shared_key(address_key)
+        token = backend.acquire_lock(key, SHARED_LOCK_TTL)
+        if token is not None and backend.get(key) is not None:
+            backend.release_lock(key, token)
+            token = None
+        if token is None:
+            _single_flight.settle(address_key, call, abandoned=True)
+            return None
+    return address_key, call, token
+
+def settle_valuation(claim, result=None):
+    """Hand a claimed valuation's (body, status) to its waiters; without one they value it themselves"""
+    address_key, call, token = claim
+    if token is not None:
+        get_shared_backend().release_lock(shared_key(address_key), token)
+    _single_flight.settle(address_key, call, result, abandoned=result is None)
+
+def _shared_compute(address_key, compute):
+    backend = get_shared_backend()
+    if backend is None:
+        return compute()
+
+    key = shared_key(address_key)
+    while True:
+        entry = backend.get_with_ttl(key)
+        if entry is not None:
+            return adopt_shared_body(address_key, entry), 200
+
+        token = backend.acquire_lock(key, SHARED_LOCK_TTL)
+        if token is not None:
+            break
+
+        # Another instance is valuing this address; wait for its result or
+        # for its lock to expire
+        time.sleep(SHARED_POLL_INTERVAL)
+
+    try:
+        # It may have finished between our cache check and taking the lock
+        entry = backend.get_with_ttl(key)
+        if entry is not None:
+            return adopt_shared_body(address_key, entry), 200
+        return compute()
+    finally:
+        backend.release_lock(key, token)
+
+async def _shared_compute_async(address_key, compute):
+    backend = get_shared_backend()
+    if backend is None:
+        return await compute()
+
+    key = shared_key(address_key)
+    while True:
+        entry = await asyncio.to_thread(backend.get_with_ttl, key)
+        if entry is not None:
+            return adopt_shared_body(address_key, entry), 200
+
+        token = await asyncio.to_thread(backend.acquire_lock, key, SHARED_LOCK_TTL)
+        if token is not None:
+            break
+
+        await asyncio.sleep(SHARED_POLL_INTERVAL)
+
+    try:
+        entry = await asyncio.to_thread(backend.get_with_ttl, key)
+        if entry is not None:
+            return adopt_shared_body(address_key, entry), 200
+        return await compute()
+    finally:
+        # Behind the body compute() queued through shared_write, so other
+        # instances find it once they can take the lock
+        await asyncio.get_running_loop().run_in_executor(_loop_writes, backend.release_lock, key, token)
+
+# session.info key collecting the address keys of properties written in
+# the session's transaction; their cached responses are dropped at commit
+WRITTEN_ADDRESS_KEYS = 'valuation_cache.written_address_keys'
+
+@event.listens_for(Property, 'after_insert')
+@event.listens_for(Property, 'after_update')
+@event.listens_for(Property, 'after_delete')
+def note_written_property(mapper, connection, target):
+    """Remember a flushed property row, to drop its cached response at commit"""
+    session = object_session(target)
+    if target.address_key and session is not None:
+        session.info.setdefault(WRITTEN_ADDRESS_KEYS, set()).add(target.address_key)
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_committed_properties(session):
+    """Drop the cached responses of the property rows a commit wrote
+
+    At commit rather than flush: a reader caching the old row between the
+    flush and the commit would otherwise keep it for the full TTL.
+    """
+    address_keys = session.info.pop(WRITTEN_ADDRESS_KEYS, None)
+    if not address_keys:
+        return
+    backend = get_shared_backend()
+    for address_key in address_keys:
+        valuation_cache.invalidate(address_key)
+        if backend is not None:
+            shared_write(backend.delete, shared_key(address_key))
+
+@event.listens_for(Session, 'after_transaction_end')
+def forget_rolled_back_properties(session, transaction):
+    # Rows flushed in a rolled back transaction never changed the cached
+    # ones. Savepoints ending keep the keys for their enclosing transaction.
+    if transaction.parent is None:
+        session.info.pop(WRITTEN_ADDRESS_KEYS, None)
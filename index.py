@@ -1,7 +1,14 @@
 from flask import Flask, render_template_string, request, jsonify
+import gzip
+import hashlib
 import os
 import random
 
+try:
+    import brotli
+except ImportError:  # optional - pages are still served gzipped
+    brotli = None
+
 app = Flask(__name__)
 
 # HTML template for the enhanced BlueDwarf platform
@@ -488,9 +495,51 @@ HTML_TEMPLATE = """
 </html>
 """
 
+# The landing page has no template variables, so render it once at import
+# and keep the encoded variants ready for every request
+HOME_CACHE_CONTROL = os.getenv('HOME_CACHE_CONTROL', 'public, max-age=300, must-revalidate')
+
+def build_page_variants(html):
+    """Encoded bodies of a page keyed by content-coding, each with a strong ETag"""
+    body = html.encode('utf-8')
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    variants = {
+        'identity': (body, f'"{digest}"'),
+        'gzip': (gzip.compress(body, compresslevel=9, mtime=0), f'"{digest}-gz"')
+    }
+    if brotli is not None:
+        variants['br'] = (brotli.compress(body, quality=11), f'"{digest}-br"')
+    return variants
+
+with app.app_context():
+    HOME_PAGE = build_page_variants(render_template_string(HTML_TEMPLATE))
+
+def negotiate_encoding(variants):
+    """Best content-coding the client accepts among the prebuilt variants"""
+    accepted = request.accept_encodings
+    for encoding in ('br', 'gzip'):
+        if encoding in variants and accepted.quality(encoding) > 0:
+            return encoding
+    return 'identity'
+
+def serve_page(variants):
+    """Respond with a prebuilt page, or 304 when the client's copy is current"""
+    encoding = negotiate_encoding(variants)
+    body, etag = variants[encoding]
+    headers = {
+        'ETag': etag,
+        'Cache-Control': HOME_CACHE_CONTROL,
+        'Vary': 'Accept-Encoding'
+    }
+    if request.if_none_match.contains(etag.strip('"')) or request.if_none_match.star_tag:
+        return app.response_class(status=304, headers=headers)
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    return app.response_class(body, mimetype='text/html', headers=headers)
+
 @app.route('/')
 def home():
-    return render_template_string(HTML_TEMPLATE)
+    return serve_page(HOME_PAGE)
 
 @app.route('/api/valuation', methods=['POST'])
 def get_valuation():